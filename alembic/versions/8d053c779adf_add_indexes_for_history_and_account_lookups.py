@@ -0,0 +1,44 @@
+"""Add indexes for history and account lookups
+
+Revision ID: 8d053c779adf
+Revises: a1648c15abd7
+Create Date: 2026-10-18 13:10:42.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d053c779adf'
+down_revision: Union[str, Sequence[str], None] = 'a1648c15abd7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction and does not block writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transactions_from_account_id_timestamp_id', 'transactions',
+                        ['from_account_id', 'timestamp', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transactions_to_account_id_timestamp_id', 'transactions',
+                        ['to_account_id', 'timestamp', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('uq_accounts_user_id_name', 'accounts',
+                        ['user_id', 'name'], unique=True,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_accounts_user_id_name', table_name='accounts',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_to_account_id_timestamp_id', table_name='transactions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_from_account_id_timestamp_id', table_name='transactions',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,60 @@
+"""Add running balances to transactions
+
+Revision ID: b7d4f0c3e215
+Revises: e41b7c2d9a60
+Create Date: 2026-10-18 14:02:19.447308
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4f0c3e215'
+down_revision: Union[str, Sequence[str], None] = 'e41b7c2d9a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('from_balance_after', sa.Numeric(precision=18, scale=2), nullable=True))
+    op.add_column('transactions', sa.Column('to_balance_after', sa.Numeric(precision=18, scale=2), nullable=True))
+
+    # no balance may change while the history is replayed
+    op.execute("LOCK TABLE accounts, transactions IN EXCLUSIVE MODE")
+    # the running balance is anchored to the current balance: each entry gets the balance
+    # minus everything booked on the account after it, so the latest entry matches accounts.balance
+    op.execute("""
+        WITH entries AS (
+            SELECT id, from_account_id AS account_id, 'from' AS side, -amount AS delta, timestamp
+            FROM transactions WHERE from_account_id IS NOT NULL
+            UNION ALL
+            SELECT id, to_account_id, 'to', amount, timestamp FROM transactions
+        ),
+        ledger AS (
+            SELECT e.id, e.side,
+                   a.balance - COALESCE(SUM(e.delta) OVER (
+                       PARTITION BY e.account_id ORDER BY e.timestamp DESC, e.id DESC
+                       GROUPS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                   ), 0) AS balance_after
+            FROM entries e JOIN accounts a ON a.id = e.account_id
+        )
+        UPDATE transactions t
+        SET from_balance_after = l.from_balance_after, to_balance_after = l.to_balance_after
+        FROM (
+            SELECT id,
+                   MAX(balance_after) FILTER (WHERE side = 'from') AS from_balance_after,
+                   MAX(balance_after) FILTER (WHERE side = 'to') AS to_balance_after
+            FROM ledger GROUP BY id
+        ) l
+        WHERE l.id = t.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transactions', 'to_balance_after')
+    op.drop_column('transactions', 'from_balance_after')
@@ -0,0 +1,47 @@
+"""Store money as numeric(18, 2)
+
+Revision ID: e41b7c2d9a60
+Revises: 5c2e9b7a41d3
+Create Date: 2026-10-18 13:31:47.903215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b7c2d9a60'
+down_revision: Union[str, Sequence[str], None] = '5c2e9b7a41d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing float values are rounded to cents while the table is rewritten
+    op.alter_column('accounts', 'balance',
+               existing_type=sa.Float(),
+               type_=sa.Numeric(precision=18, scale=2),
+               existing_nullable=False,
+               postgresql_using="round(balance::numeric, 2)")
+    op.alter_column('transactions', 'amount',
+               existing_type=sa.Float(),
+               type_=sa.Numeric(precision=18, scale=2),
+               existing_nullable=False,
+               postgresql_using="round(amount::numeric, 2)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('transactions', 'amount',
+               existing_type=sa.Numeric(precision=18, scale=2),
+               type_=sa.Float(),
+               existing_nullable=False,
+               postgresql_using="amount::double precision")
+    op.alter_column('accounts', 'balance',
+               existing_type=sa.Numeric(precision=18, scale=2),
+               type_=sa.Float(),
+               existing_nullable=False,
+               postgresql_using="balance::double precision")
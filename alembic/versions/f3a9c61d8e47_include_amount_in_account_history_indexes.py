@@ -0,0 +1,43 @@
+"""Include amount in the account history indexes
+
+Revision ID: f3a9c61d8e47
+Revises: b7d4f0c3e215
+Create Date: 2026-10-18 14:37:52.630981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c61d8e47'
+down_revision: Union[str, Sequence[str], None] = 'b7d4f0c3e215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_transactions_from_account_id_timestamp_id': ['from_account_id', 'timestamp', 'id'],
+    'ix_transactions_to_account_id_timestamp_id': ['to_account_id', 'timestamp', 'id'],
+}
+
+
+def _rebuild(include: list[str]) -> None:
+    # the new index is built next to the old one and swapped by name, so history queries never lose their index
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(f'{name}_new', 'transactions', columns, unique=False,
+                            postgresql_include=include, postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name='transactions', postgresql_concurrently=True, if_exists=True)
+            op.execute(f'ALTER INDEX {name}_new RENAME TO {name}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild(include=['amount'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild(include=[])
@@ -1,22 +1,36 @@
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Literal
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
 
-from app.core.security import get_current_user, get_user_from_db
+from app.core.security import get_current_user
+from app.core.rate_limit import limit_by_principal, principal_identity, rate_limiters
 from app.db.database import get_db
-from app.api.schemas.users import UserOut
-from app.api.schemas.banking import UserAccount, TransferDataBalance, DepositeAccountBalance
+from app.core.redis import get_redis
+from app.api.schemas.users import Principal
+from app.api.schemas.banking import UserAccount, AccountBalanceAt, AccountAnalytics, TransferDataBalance, DepositeAccountBalance, BatchTransfer, BatchTransferResult
 from app.core.logging import logger
 from app.services.banking import (
     add_account_service,
     get_all_accounts_service,
     get_certain_account_service,
+    get_balance_at_service,
     transfer_money_service,
+    batch_transfer_service,
     delete_account_service,
     deposit_account_balance_service,
-    get_transaction_hisotry_service
+    get_transaction_hisotry_service,
+    stream_transaction_history_service,
+    encode_history_cursor,
+    get_account,
+    HISTORY_CACHE_SIZE
 )
+from app.services.idempotency import run_idempotent, request_fingerprint
+from app.services.analytics import get_account_analytics_service
+from app.services.statement import stream_statement_service, STATEMENT_FORMATS
 
 
 banking_router = APIRouter(prefix="/banking", tags=["Bank operations"], dependencies=[Depends(get_current_user)])
@@ -24,7 +38,7 @@ banking_router = APIRouter(prefix="/banking", tags=["Bank operations"], dependen
 @banking_router.post("/add/account")
 async def add_new_account(
     account_name: str,
-    user_data: Annotated[UserOut, Depends(get_current_user)],
+    user_data: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     logger.info("Конечная тока по созданию нового счета '%s'", account_name)
@@ -34,73 +48,190 @@ async def add_new_account(
 @banking_router.get('/account/{account_name}')
 async def get_certain_account(
     account_name: str,
-    user: Annotated[UserOut, Depends(get_current_user)],
+    user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ) -> UserAccount:
     logger.info("Конечная точка по возврату счета '%s'", account_name)
-    user = await get_user_from_db(user.username, session=db)
     return await get_certain_account_service(account_name=account_name, session=db, user_id=user.id)
 
+@banking_router.get('/account/{account_name}/balance')
+async def get_account_balance_at(
+    account_name: str,
+    at: datetime,
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+) -> AccountBalanceAt:
+    logger.info("Конечная точка по возврату баланса счета '%s' на момент %s", account_name, at.isoformat())
+    return await get_balance_at_service(account_name=account_name, at=at, session=db, user_id=user.id)
+
+@banking_router.get('/account/{account_name}/statement')
+async def get_account_statement(
+    account_name: str,
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    start: datetime | None = None,
+    end: datetime | None = None,
+    output_format: Annotated[Literal["csv", "parquet", "arrow"], Query(alias="format")] = "csv"
+) -> StreamingResponse:
+    logger.info("Конечная точка по выгрузке выписки счета '%s' в формате '%s'", account_name, output_format)
+    account = await get_account(acc_name=account_name, session=db, user_id=user.id)
+    return StreamingResponse(
+        stream_statement_service(account_id=account.id, output_format=output_format, start=start, end=end),
+        media_type=STATEMENT_FORMATS[output_format],
+        headers={"Content-Disposition": f'attachment; filename="{account_name}-statement.{output_format}"'}
+    )
+
+@banking_router.get('/account/{account_name}/analytics')
+async def get_account_analytics(
+    account_name: str,
+    start: datetime,
+    end: datetime,
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    granularity: Literal["day", "month"] = "day"
+) -> AccountAnalytics:
+    logger.info("Конечная точка по аналитике счета '%s' с разбивкой по '%s'", account_name, granularity)
+    return await get_account_analytics_service(
+        account_name=account_name,
+        start=start,
+        end=end,
+        granularity=granularity,
+        session=db,
+        user_id=user.id,
+        redis=redis
+    )
+
 @banking_router.get('/accounts')
 async def get_all_accounts(
-    user_data: Annotated[UserOut, Depends(get_current_user)],
+    user_data: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ) -> dict:
     logger.info("Конечная точка по возврату всех счетов")
-    res = await get_all_accounts_service(username=user_data.username, session=db)
+    res = await get_all_accounts_service(user_id=user_data.id, session=db)
     return {"username": user_data.username, "Accounts": res}
 
-@banking_router.post('/change/transfer')
+@banking_router.post('/change/transfer', dependencies=[Depends(limit_by_principal("transfer"))])
 async def transfer_money(
     transfer_data: TransferDataBalance,
-    user: Annotated[UserOut, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None
 ) -> dict:
     logger.info("Конечная точка по переведу средств между счетами '%s' и '%s'", transfer_data.account_name, transfer_data.transfer_account_name)
-    user = await get_user_from_db(user.username, session=db)
-    await transfer_money_service(
-        account_name=transfer_data.account_name,
-        amount=transfer_data.amount,
+    return await run_idempotent(
+        key=idempotency_key,
+        user_id=user.id,
+        fingerprint=request_fingerprint("transfer", transfer_data),
+        response_body={"message": "The money was successfully transferred"},
+        session=db,
+        redis=redis,
+        operation=lambda: transfer_money_service(
+            account_name=transfer_data.account_name,
+            amount=transfer_data.amount,
+            session=db,
+            user_id=user.id,
+            transfer_account_name=transfer_data.transfer_account_name,
+            transfer_username=transfer_data.transfer_username,
+            redis=redis
+        )
+    )
+
+@banking_router.post('/change/transfer/batch')
+async def batch_transfer_money(
+    batch: BatchTransfer,
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> BatchTransferResult:
+    logger.info("Конечная точка пакетного перевода средств (%d операций)", len(batch.transfers))
+    # every transfer in the batch spends a token, otherwise batches would multiply the per-user limit
+    await rate_limiters["transfer"].check(principal_identity(user), redis, cost=len(batch.transfers))
+    return await batch_transfer_service(
+        transfers=batch.transfers,
+        mode=batch.mode,
         session=db,
         user_id=user.id,
-        transfer_account_name=transfer_data.transfer_account_name,
-        transfer_username=transfer_data.transfer_username,
+        redis=redis
     )
-    return {"message": "The money was successfully transferred"}
 
-@banking_router.post("/change/deposit")
+@banking_router.post("/change/deposit", dependencies=[Depends(limit_by_principal("deposit"))])
 async def deposit_account_balance(
     deposit_account_data: DepositeAccountBalance,
-    user: Annotated[UserOut, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None
 ):
     logger.info("Конечная точка по пополнению счета '%s' на %d средств", deposit_account_data.account_name, deposit_account_data.amount)
-    user = await get_user_from_db(user.username, session=db)
-    await deposit_account_balance_service(
-        account_name=deposit_account_data.account_name,
-        amount=deposit_account_data.amount,
+    return await run_idempotent(
+        key=idempotency_key,
+        user_id=user.id,
+        fingerprint=request_fingerprint("deposit", deposit_account_data),
+        response_body={"message": "Account has been successfully replenished"},
         session=db,
-        user_id=user.id
+        redis=redis,
+        operation=lambda: deposit_account_balance_service(
+            account_name=deposit_account_data.account_name,
+            amount=deposit_account_data.amount,
+            session=db,
+            user_id=user.id,
+            redis=redis
+        )
     )
-    return {"message": "Account has been successfully replenished"}
 
 @banking_router.get("/transaction/history/{account_name}")
 async def get_transaction_history(
     account_name: str,
-    user: Annotated[UserOut, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    response: Response,
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    limit: Annotated[int, Query(ge=1, le=100)] = HISTORY_CACHE_SIZE,
+    before: str | None = None,
+    after: str | None = None
 ):
-    logger.info("Конечная точка по получению списка последних 10 транзакций счета '%s' пользователя '%s'", account_name, user.username)
-    result = await get_transaction_hisotry_service(user_data=user, account_name=account_name, session=db)
+    logger.info("Конечная точка по получению списка последних %d транзакций счета '%s' пользователя '%s'", limit, account_name, user.username)
+    result = await get_transaction_hisotry_service(
+        user_data=user,
+        account_name=account_name,
+        session=db,
+        redis=redis,
+        limit=limit,
+        before=before,
+        after=after
+    )
+    if result:
+        next_cursor = encode_history_cursor(result[0]) if len(result) == limit else None
+        prev_cursor = encode_history_cursor(result[-1])
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if prev_cursor:
+            response.headers["X-Prev-Cursor"] = prev_cursor
     return result
 
+@banking_router.get("/transaction/history/{account_name}/export")
+async def export_transaction_history(
+    account_name: str,
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+) -> StreamingResponse:
+    logger.info("Конечная точка по выгрузке всей истории транзакций счета '%s' пользователя '%s'", account_name, user.username)
+    account = await get_account(acc_name=account_name, session=db, user_id=user.id)
+    return StreamingResponse(
+        stream_transaction_history_service(account_id=account.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{account_name}-history.ndjson"'}
+    )
+
 @banking_router.delete('/delete')
 async def delete_account(
     account_name: str,
-    user: Annotated[UserOut, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ):
     logger.info("Конечная точка для удаления счета '%s' пользователя '%s'", account_name, user.username)
-    user = await get_user_from_db(user.username, session=db)
-    await delete_account_service(account_name=account_name, session=db, user_id=user.id)
+    await delete_account_service(account_name=account_name, session=db, user_id=user.id, redis=redis)
     return {"message": "The bank account was successfully deleted"}
\ No newline at end of file
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response, status
+
+from app.services.health import readiness_probe
+
+health_router = APIRouter(tags=["Health"])
+
+@health_router.get("/health")
+async def health() -> dict:
+    return {"status": "ok"}
+
+@health_router.get("/ready")
+async def ready(response: Response) -> dict:
+    result = await readiness_probe.check()
+    if result["status"] != "ok":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
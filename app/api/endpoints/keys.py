@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+
+from app.core.jwt_keys import key_ring
+
+keys_router = APIRouter(tags=["Keys"])
+
+@keys_router.get("/.well-known/jwks.json")
+async def jwks(response: Response) -> dict:
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return key_ring.jwks()
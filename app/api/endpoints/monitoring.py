@@ -0,0 +1,51 @@
+import hmac
+import ipaddress
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+
+from app.core.config import settings
+from app.core.hashing import password_pool
+from app.core.logging import logger
+from app.core.metrics import render_metrics
+from app.core.rate_limit import client_address, parse_trusted_proxies, rate_limiters
+from app.db.database import engine
+
+MONITORING_ALLOWED_NETWORKS = parse_trusted_proxies(settings.MONITORING_ALLOWED_NETWORKS)
+MONITORING_TOKEN = settings.MONITORING_TOKEN.encode() if settings.MONITORING_TOKEN else None
+
+def _allowed_address(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in MONITORING_ALLOWED_NETWORKS)
+
+async def require_internal_access(request: Request) -> None:
+    # behind a trusted proxy this is the forwarded client, so public traffic does not pass as the proxy's own address
+    host = client_address(request)
+    if _allowed_address(host):
+        return
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if MONITORING_TOKEN is not None and scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), MONITORING_TOKEN):
+        return
+    logger.warning("Отклонен доступ к мониторингу с адреса '%s'", host)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+monitoring_router = APIRouter(tags=["Monitoring"], dependencies=[Depends(require_internal_access)])
+
+@monitoring_router.get("/monitoring/password-hashing")
+async def password_hashing_stats() -> dict:
+    return password_pool.stats()
+
+@monitoring_router.get("/monitoring/db-pool")
+async def db_pool_stats() -> dict:
+    return engine.pool.stats()
+
+@monitoring_router.get("/monitoring/rate-limits")
+async def rate_limit_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in rate_limiters.items()}
+
+@monitoring_router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
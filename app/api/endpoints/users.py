@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.rate_limit import limit_by_client
 from app.core.security import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.db.database import get_db
 from app.api.schemas.users import Token, SignUp, EmailVerificationRequest
@@ -14,7 +15,7 @@ from app.core.logging import logger
 
 user_router = APIRouter(prefix="/users", tags=["User"])
 
-@user_router.post('/login')
+@user_router.post('/login', dependencies=[Depends(limit_by_client("login"))])
 async def login(user_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: Annotated[AsyncSession, Depends(get_db)]) -> Token:
     logger.info("Авторизация пользователя '%s'", user_data.username)
     user = await authenticate_user(user_data.username, user_data.password, db)
@@ -22,7 +23,7 @@ async def login(user_data: Annotated[OAuth2PasswordRequestForm, Depends()], db:
     logger.info("Возврат JWT токена пользователю '%s'", user_data.username)
     return Token(access_token=access_token, token_type="Bearer")
 
-@user_router.post("/register")
+@user_router.post("/register", dependencies=[Depends(limit_by_client("register"))])
 async def sign_up_user(user_data: SignUp, db: Annotated[AsyncSession, Depends(get_db)]):
     logger.info("Регистрация пользователя '%s' с почтой '%s'", user_data.username, user_data.email)
     await sign_up_user_services(user_data=user_data, session=db)
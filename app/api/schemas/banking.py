@@ -1,22 +1,71 @@
 from datetime import datetime
+from decimal import Decimal
+from typing import Annotated, List, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, PlainSerializer
+
+Money = Annotated[
+    Decimal,
+    Field(max_digits=18, decimal_places=2),
+    # a JSON number would be parsed as a binary float by most clients
+    PlainSerializer(lambda amount: f"{amount:.2f}", return_type=str, when_used="json")
+]
 
 class UserAccount(BaseModel):
     account_name: str
-    balance: float
+    balance: Money
     created_at: datetime
 
+class AccountBalanceAt(BaseModel):
+    account_name: str
+    balance: Money
+    at: datetime
+
 class DepositeAccountBalance(BaseModel):
     account_name: str
-    amount: float
+    amount: Money
 
 class TransferDataBalance(BaseModel):
     account_name: str
-    amount: float
+    amount: Money
     transfer_username: str | None = None
     transfer_account_name: str
 
+class BatchTransfer(BaseModel):
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    transfers: List[TransferDataBalance] = Field(min_length=1)
+
+class BatchTransferItemResult(BaseModel):
+    index: int
+    status: Literal["ok", "failed", "skipped"]
+    detail: str | None = None
+
+class BatchTransferResult(BaseModel):
+    mode: Literal["atomic", "best_effort"]
+    succeeded: int
+    failed: int
+    results: List[BatchTransferItemResult]
+
+class AnalyticsBucket(BaseModel):
+    period: datetime
+    inflow: Money
+    inflow_count: int
+    outflow: Money
+    outflow_count: int
+
+class AccountAnalytics(BaseModel):
+    account_name: str
+    start: datetime
+    end: datetime
+    granularity: Literal["day", "month"]
+    inflow: Money
+    inflow_count: int
+    outflow: Money
+    outflow_count: int
+    buckets: List[AnalyticsBucket]
+
 class TransactionHistory(BaseModel):
     description: str
-    amount: str
\ No newline at end of file
+    amount: str
+    id: int | None = None
+    timestamp: datetime | None = None
\ No newline at end of file
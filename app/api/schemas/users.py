@@ -16,6 +16,9 @@ class UserOut(BaseModel):
     last_name: str
     username: str
 
+class Principal(UserOut):
+    id: int
+
 class EmailVerificationRequest(BaseModel):
     email: str
     code: int
\ No newline at end of file
@@ -5,5 +5,11 @@ celery_app = Celery(
     "celery_app",
     broker=settings.REDIS_BROKER_URL,
     backend=settings.REDIS_BACKEND_URL,
-    include=["app.tasks.email_task"]
-)
\ No newline at end of file
+    include=["app.tasks.email_task", "app.tasks.outbox_task"]
+)
+celery_app.conf.beat_schedule = {
+    "relay-outbox": {
+        "task": "app.tasks.outbox_task.relay_outbox",
+        "schedule": settings.OUTBOX_RELAY_INTERVAL,
+    },
+}
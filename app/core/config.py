@@ -10,12 +10,63 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASS: str
     DB_NAME: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
     SECRET_KEY: str
     ALGORITHM: str
+    JWT_PRIVATE_KEY_FILE: str | None = None
+    JWT_PUBLIC_KEY_FILES: str = ""
     EMAIL_HOST: str
     EMAIL_PASSWORD: str
+    SMTP_HOST: str = "smtp.yandex.ru"
+    SMTP_PORT: int = 587
+    SMTP_USE_TLS: bool = True
+    SMTP_AUTH: bool = True
+    SMTP_TIMEOUT: float = 10.0
+    SMTP_POOL_SIZE: int = 2
+    SMTP_IDLE_TIMEOUT: float = 30.0
+    SMTP_BATCH_SIZE: int = 50
     REDIS_BROKER_URL: str
     REDIS_BACKEND_URL: str
+    REDIS_CACHE_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    PRINCIPAL_CACHE_TTL: float = 30.0
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_USE_REDIS: bool = False
+    PRINCIPAL_CACHE_REDIS_TTL: int = 300
+    HISTORY_CACHE_TTL: int = 86400
+    IDEMPOTENCY_KEY_TTL: int = 86400
+    ANALYTICS_CACHE_TTL: int = 3600
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_RELAY_INTERVAL: float = 10.0
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN: str = "10/60"
+    RATE_LIMIT_REGISTER: str = "5/3600"
+    RATE_LIMIT_TRANSFER: str = "30/60"
+    RATE_LIMIT_DEPOSIT: str = "30/60"
+    RATE_LIMIT_FALLBACK_SIZE: int = 10000
+    RATE_LIMIT_TRUSTED_PROXIES: str = ""
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_TOKEN: str | None = None
+    PROFILING_INTERVAL: float = 0.001
+    PROFILING_DIR: str = "/minibanking/logs/profiles"
+    MONITORING_ALLOWED_NETWORKS: str = "127.0.0.1/32,::1/128"
+    MONITORING_TOKEN: str | None = None
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    HEALTH_CACHE_TTL: float = 5.0
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    LOG_FILE: str | None = "/minibanking/logs/app.log"
+    LOG_DEBUG_SAMPLE_RATE: float = 0.1
 
     @property
     def ASYNC_DATABASE_URL(self):
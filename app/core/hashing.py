@@ -0,0 +1,111 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import observe_operation, stats_collector
+
+pwd = CryptContext(schemes=['bcrypt'], deprecated="auto")
+
+def _hash_password(password: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    hashed = pwd.hash(password)
+    return hashed, time.perf_counter() - start
+
+def _verify_password(user_password: str, hash_password: str) -> tuple[bool, float]:
+    start = time.perf_counter()
+    is_valid = pwd.verify(user_password, hash_password)
+    return is_valid, time.perf_counter() - start
+
+class PasswordHashingPool:
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self._in_flight - self.max_workers, 0)
+
+    def start(self) -> None:
+        if self._executor is None:
+            logger.info("Запуск пула хеширования паролей: %d процессов, очередь %d", self.max_workers, self.max_queue)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            logger.info("Остановка пула хеширования паролей")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            logger.warning("Очередь хеширования паролей переполнена (%d задач)", self._in_flight)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Try again later.",
+                headers={"Retry-After": "1"}
+            )
+        self.start()
+        self._in_flight += 1
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        start = time.perf_counter()
+        try:
+            result, run_seconds = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+        wait_seconds = max(time.perf_counter() - start - run_seconds, 0.0)
+        self.completed += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        self.run_seconds_total += run_seconds
+        logger.debug("Хеширование заняло %.3f с, ожидание в очереди %.3f с", run_seconds, wait_seconds)
+        return result
+
+    async def hash(self, password: str) -> str:
+        with observe_operation("password_hash"):
+            return await self._run(_hash_password, password)
+
+    async def verify(self, user_password: str, hash_password: str) -> bool:
+        with observe_operation("password_verify"):
+            return await self._run(_verify_password, user_password, hash_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.wait_seconds_total / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.wait_seconds_max,
+            "avg_run_seconds": self.run_seconds_total / self.completed if self.completed else 0.0,
+        }
+
+password_pool = PasswordHashingPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE
+)
+stats_collector.register("password_hashing", password_pool.stats)
@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import json
+from typing import Sequence
+
+import jwt
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jwt.algorithms import get_default_algorithms
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# members of the public JWK that take part in the RFC 7638 thumbprint
+THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "OKP": ("crv", "kty", "x"), "EC": ("crv", "kty", "x", "y")}
+
+def jwk_thumbprint(jwk: dict) -> str:
+    canonical = json.dumps({name: jwk[name] for name in THUMBPRINT_MEMBERS[jwk["kty"]]}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+
+class KeyRing:
+    def __init__(self, algorithm: str, secret: str | None = None, private_key_pem: bytes | None = None, public_key_pems: Sequence[bytes] = ()):
+        algorithms = get_default_algorithms()
+        if algorithm not in algorithms or algorithm == "none":
+            raise ValueError(f"Unsupported JWT algorithm '{algorithm}'")
+        self.algorithm = algorithm
+        self.symmetric = algorithm.startswith("HS")
+        self.kid: str | None = None
+        # verification keys are parsed once and looked up by kid instead of being re-read from PEM on every decode
+        self._verification_keys = {}
+        self._jwks: list[dict] = []
+        if self.symmetric:
+            self._signing_key = secret
+            return
+        if private_key_pem is None:
+            raise ValueError(f"JWT algorithm '{algorithm}' requires a private key")
+        self._signing_key = load_pem_private_key(private_key_pem, password=None)
+        public_keys = [self._signing_key.public_key(), *(load_pem_public_key(pem) for pem in public_key_pems)]
+        for public_key in public_keys:
+            jwk = algorithms[algorithm].to_jwk(public_key, as_dict=True)
+            kid = jwk_thumbprint(jwk)
+            self._verification_keys[kid] = public_key
+            self._jwks.append({**jwk, "kid": kid, "use": "sig", "alg": algorithm})
+        self.kid = self._jwks[0]["kid"]
+
+    def encode(self, payload: dict) -> str:
+        headers = {"kid": self.kid} if self.kid is not None else None
+        return jwt.encode(payload=payload, key=self._signing_key, algorithm=self.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        if self.symmetric:
+            return jwt.decode(jwt=token, key=self._signing_key, algorithms=[self.algorithm])
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._verification_keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown key id '{kid}'")
+        return jwt.decode(jwt=token, key=key, algorithms=[self.algorithm])
+
+    def jwks(self) -> dict:
+        return {"keys": self._jwks}
+
+def _read_key(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def load_key_ring() -> KeyRing:
+    private_key_pem = _read_key(settings.JWT_PRIVATE_KEY_FILE) if settings.JWT_PRIVATE_KEY_FILE else None
+    public_key_pems = [_read_key(path.strip()) for path in settings.JWT_PUBLIC_KEY_FILES.split(",") if path.strip()]
+    key_ring = KeyRing(
+        algorithm=settings.ALGORITHM,
+        secret=settings.SECRET_KEY,
+        private_key_pem=private_key_pem,
+        public_key_pems=public_key_pems
+    )
+    if key_ring.kid is not None:
+        logger.info("Подпись JWT алгоритмом %s, ключ '%s', ключей проверки: %d", key_ring.algorithm, key_ring.kid, len(key_ring.jwks()["keys"]))
+    return key_ring
+
+key_ring = load_key_ring()
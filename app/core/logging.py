@@ -1,20 +1,72 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
-def setup_logging():
-    formatter = logging.Formatter(
-        "[%(asctime)s] #%(levelname)-8s %(filename)s: %(lineno)d - %(name)s - %(message)s"
-    )
+from app.core.config import settings
 
+TEXT_FORMAT = "[%(asctime)s] #%(levelname)-8s %(filename)s: %(lineno)d - %(name)s - %(message)s"
 
+_listener: QueueListener | None = None
 
-    stdout_handler = logging.StreamHandler(sys.stdout)
-    file_handler = logging.FileHandler("/minibanking/logs/app.log", encoding="utf-8")
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class DebugSampler(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
+def setup_logging(
+    level: str = settings.LOG_LEVEL,
+    json_output: bool = settings.LOG_JSON,
+    log_file: str | None = settings.LOG_FILE,
+    debug_sample_rate: float = settings.LOG_DEBUG_SAMPLE_RATE,
+    use_queue: bool = True
+):
+    global _listener
+    formatter = JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT)
+
+    stdout_handler = logging.StreamHandler(sys.stdout)
     stdout_handler.setFormatter(formatter)
-    file_handler.setFormatter(formatter)
-    stdout_handler.setLevel(logging.DEBUG)
-    file_handler.setLevel(logging.INFO)
+    handlers = [stdout_handler]
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        file_handler.setLevel(logging.INFO)
+        handlers.append(file_handler)
 
     logging.getLogger("passlib").setLevel(logging.WARNING)
     logging.getLogger("aiosqlite").setLevel(logging.WARNING)
@@ -23,12 +75,26 @@ def setup_logging():
     logging.getLogger("asyncio").setLevel(logging.WARNING)
     logging.getLogger("python_multipart.multipart").setLevel(logging.WARNING)
 
-
+    stop_logging()
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(stdout_handler)
-    root_logger.addHandler(file_handler)
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+    root_logger.setLevel(level.upper())
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(DebugSampler(debug_sample_rate))
+        root_logger.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            handler.addFilter(DebugSampler(debug_sample_rate))
+            root_logger.addHandler(handler)
 
     return root_logger
 
-logger = setup_logging()
\ No newline at end of file
+logger = setup_logging()
+atexit.register(stop_logging)
@@ -0,0 +1,123 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.profiling import add_span
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"])
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Database statement latency", ["statement"], buckets=FAST_BUCKETS)
+REDIS_COMMAND_SECONDS = Histogram("redis_command_duration_seconds", "Redis command latency", ["command"], buckets=FAST_BUCKETS)
+OPERATION_SECONDS = Histogram("operation_duration_seconds", "Latency of expensive steps inside a request", ["operation"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def statement_label(statement: str) -> str:
+    # compiled SQL strings repeat, so the parse is done once per distinct statement
+    words = statement.split(None, 1)
+    if not words:
+        return "UNKNOWN"
+    table = _TABLE_PATTERN.search(statement)
+    return f"{words[0].upper()} {table.group(1)}" if table else words[0].upper()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.labels(statement=statement_label(statement)).observe(elapsed)
+    add_span("db", elapsed)
+
+def _handle_error(context) -> None:
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+@contextmanager
+def observe_operation(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        OPERATION_SECONDS.labels(operation=operation).observe(elapsed)
+        add_span(operation, elapsed)
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+class StatsCollector:
+    def __init__(self):
+        self._sources: list[tuple[str, dict[str, str], Callable[[], dict]]] = []
+
+    def register(self, source: str, stats: Callable[[], dict], **labels: str) -> None:
+        self._sources.append((source, labels, stats))
+
+    def collect(self):
+        families: dict[str, GaugeMetricFamily] = {}
+        for source, labels, stats in self._sources:
+            for key, value in stats().items():
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{source}_{key}"
+                family = families.get(name)
+                if family is None:
+                    family = families[name] = GaugeMetricFamily(name, f"{source} {key}", labels=list(labels))
+                family.add_metric(list(labels.values()), float(value))
+        return list(families.values())
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    # every gunicorn worker writes its samples to the shared directory; pool gauges are those of the serving worker
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    registry.register(stats_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=route.path if route is not None else "unmatched",
+                status=str(status_code)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.api.schemas.users import Principal
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.redis import get_redis
+from app.db.models import User
+
+class PrincipalCache:
+    def __init__(self, ttl: float, maxsize: int, use_redis: bool, redis_ttl: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        self._entries: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+
+    @staticmethod
+    def _redis_key(username: str) -> str:
+        return f"principal:{username}"
+
+    def _get_local(self, username: str) -> Principal | None:
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._entries[username]
+            return None
+        self._entries.move_to_end(username)
+        return principal
+
+    def _set_local(self, principal: Principal) -> None:
+        self._entries[principal.username] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(principal.username)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, username: str, redis: Redis) -> Principal | None:
+        principal = self._get_local(username)
+        if principal is not None or not self.use_redis:
+            return principal
+        try:
+            cached = await redis.get(self._redis_key(username))
+        except RedisError as e:
+            logger.warning("Не удалось прочитать пользователя '%s' из кеша Redis: %s", username, e)
+            return None
+        if cached is None:
+            return None
+        principal = Principal.model_validate_json(cached)
+        self._set_local(principal)
+        return principal
+
+    async def set(self, principal: Principal, redis: Redis) -> None:
+        self._set_local(principal)
+        if not self.use_redis:
+            return
+        try:
+            await redis.set(self._redis_key(principal.username), principal.model_dump_json(), ex=self.redis_ttl)
+        except RedisError as e:
+            logger.warning("Не удалось сохранить пользователя '%s' в кеш Redis: %s", principal.username, e)
+
+    def invalidate_local(self, username: str) -> None:
+        self._entries.pop(username, None)
+
+    async def invalidate(self, username: str, redis: Redis) -> None:
+        logger.debug("Сброс кеша пользователя '%s'", username)
+        self.invalidate_local(username)
+        if not self.use_redis:
+            return
+        try:
+            await redis.delete(self._redis_key(username))
+        except RedisError as e:
+            logger.warning("Не удалось удалить пользователя '%s' из кеша Redis: %s", username, e)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    use_redis=settings.PRINCIPAL_CACHE_USE_REDIS,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL
+)
+
+_background_tasks: set[asyncio.Task] = set()
+
+async def _invalidate_in_redis(usernames: set[str]) -> None:
+    redis = await get_redis()
+    for username in usernames:
+        await principal_cache.invalidate(username, redis)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_principal_stale(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    stale = session.info.setdefault("stale_principals", set())
+    stale.add(target.username)
+    stale.update(inspect(target).attrs.username.history.deleted)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_stale_principals(session: Session) -> None:
+    usernames = session.info.pop("stale_principals", None)
+    if not usernames:
+        return
+    for username in usernames:
+        principal_cache.invalidate_local(username)
+    if not principal_cache.use_redis:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_invalidate_in_redis(usernames))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_principals(session: Session) -> None:
+    session.info.pop("stale_principals", None)
@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import hmac
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+
+import fastapi.routing
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from pyinstrument.session import Session
+
+from app.core.logging import logger
+
+_spans: ContextVar[dict[str, float] | None] = ContextVar("profiling_spans", default=None)
+
+def add_span(kind: str, seconds: float) -> None:
+    spans = _spans.get()
+    if spans is not None:
+        spans[kind] = spans.get(kind, 0.0) + seconds
+
+def server_timing(spans: dict[str, float], total: float) -> str:
+    return ", ".join(f"{kind};dur={seconds * 1000:.2f}" for kind, seconds in [*spans.items(), ("total", total)])
+
+def instrument_serialization() -> None:
+    serialize_response = fastapi.routing.serialize_response
+    if getattr(serialize_response, "profiled", False):
+        return
+
+    @functools.wraps(serialize_response)
+    async def profiled_serialize_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await serialize_response(*args, **kwargs)
+        finally:
+            add_span("serialization", time.perf_counter() - start)
+
+    profiled_serialize_response.profiled = True
+    fastapi.routing.serialize_response = profiled_serialize_response
+
+class ProfilingMiddleware:
+    def __init__(self, app, directory: str, sample_rate: float, header: str, token: str | None, interval: float):
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+        self.token = token.encode() if token else None
+        self.interval = interval
+
+    def _should_profile(self, scope) -> bool:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == self.header:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        spans: dict[str, float] = {}
+        spans_token = _spans.set(spans)
+        status_code = 500
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = server_timing(spans, time.perf_counter() - start)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            total = time.perf_counter() - start
+            _spans.reset(spans_token)
+            route = scope.get("route")
+            path = route.path if route is not None else scope["path"]
+            filename = f"{time.time_ns()}-{scope['method']}-{re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or 'root'}.speedscope.json"
+            logger.info(
+                "Профиль запроса %s %s (%d): %.1f мс [%s] -> %s",
+                scope["method"], path, status_code, total * 1000, server_timing(spans, total), filename
+            )
+            await asyncio.get_running_loop().run_in_executor(None, self._write, filename, session)
+
+    def _write(self, filename: str, session: Session) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, filename), "w") as f:
+                f.write(SpeedscopeRenderer().render(session))
+        except OSError as e:
+            logger.warning("Не удалось сохранить профиль запроса '%s': %s", filename, e)
@@ -0,0 +1,188 @@
+import hashlib
+import ipaddress
+import math
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Annotated, Callable
+
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, RedisError
+
+from app.api.schemas.users import Principal
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import stats_collector
+from app.core.redis import get_redis
+from app.core.security import get_current_user
+
+# sliding window log: the check and the insert run atomically on the server clock
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call("TIME")
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[4])
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - window)
+local count = redis.call("ZCARD", KEYS[1])
+if count + cost <= limit then
+    for i = 1, cost do
+        redis.call("ZADD", KEYS[1], now, ARGV[3] .. ":" .. i)
+    end
+    redis.call("PEXPIRE", KEYS[1], window)
+    return 0
+end
+-- the request fits once enough of the oldest hits have left the window
+local index = count + cost - limit - 1
+local oldest = redis.call("ZRANGE", KEYS[1], index, index, "WITHSCORES")
+return tonumber(oldest[2]) + window - now
+"""
+SLIDING_WINDOW_SHA = hashlib.sha1(SLIDING_WINDOW_SCRIPT.encode()).hexdigest()
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    limit, _, window = rate.partition("/")
+    try:
+        limit, window = int(limit), float(window)
+    except ValueError:
+        raise ValueError(f"Invalid rate limit '{rate}', expected '<requests>/<seconds>'") from None
+    if limit < 1 or window <= 0:
+        raise ValueError(f"Invalid rate limit '{rate}', expected '<requests>/<seconds>'")
+    return limit, window
+
+class RateLimiter:
+    def __init__(self, name: str, rate: str, fallback_size: int, enabled: bool = True):
+        self.name = name
+        self.limit, self.window = parse_rate(rate)
+        self.fallback_size = fallback_size
+        self.enabled = enabled
+        self._local: OrderedDict[str, deque[float]] = OrderedDict()
+        self.allowed = 0
+        self.blocked = 0
+        self.fallback_checks = 0
+
+    def _redis_key(self, identity: str) -> str:
+        return f"ratelimit:{self.name}:{identity}"
+
+    async def _hit_redis(self, identity: str, redis: Redis, cost: int) -> float:
+        args = (self._redis_key(identity), self.limit, int(self.window * 1000), uuid.uuid4().hex, cost)
+        try:
+            retry_after_ms = await redis.evalsha(SLIDING_WINDOW_SHA, 1, *args)
+        except NoScriptError:
+            retry_after_ms = await redis.eval(SLIDING_WINDOW_SCRIPT, 1, *args)
+        return int(retry_after_ms) / 1000
+
+    def _hit_local(self, identity: str, cost: int) -> float:
+        now = time.monotonic()
+        hits = self._local.get(identity)
+        if hits is None:
+            hits = self._local[identity] = deque()
+        self._local.move_to_end(identity)
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if len(hits) + cost > self.limit:
+            return hits[len(hits) + cost - self.limit - 1] + self.window - now
+        hits.extend([now] * cost)
+        while len(self._local) > self.fallback_size:
+            self._local.popitem(last=False)
+        return 0.0
+
+    async def hit(self, identity: str, redis: Redis, cost: int = 1) -> float:
+        try:
+            retry_after = await self._hit_redis(identity, redis, cost)
+        except RedisError as e:
+            logger.warning("Redis недоступен, ограничение '%s' проверяется в памяти процесса: %s", self.name, e)
+            self.fallback_checks += 1
+            retry_after = self._hit_local(identity, cost)
+        if retry_after > 0:
+            self.blocked += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    async def check(self, identity: str, redis: Redis, cost: int = 1) -> None:
+        if not self.enabled:
+            return
+        if cost > self.limit:
+            self.blocked += 1
+            logger.warning("Запрос стоимостью %d превышает лимит '%s' для '%s'", cost, self.name, identity)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Request exceeds the rate limit of {self.limit} per {self.window:g} seconds"
+            )
+        retry_after = await self.hit(identity, redis, cost)
+        if retry_after > 0:
+            logger.warning("Превышен лимит запросов '%s' для '%s'", self.name, identity)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "window_seconds": self.window,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "fallback_checks": self.fallback_checks,
+            "fallback_keys": len(self._local)
+        }
+
+def _limiter(name: str, rate: str) -> RateLimiter:
+    return RateLimiter(name=name, rate=rate, fallback_size=settings.RATE_LIMIT_FALLBACK_SIZE, enabled=settings.RATE_LIMIT_ENABLED)
+
+rate_limiters = {
+    "login": _limiter("login", settings.RATE_LIMIT_LOGIN),
+    "register": _limiter("register", settings.RATE_LIMIT_REGISTER),
+    "transfer": _limiter("transfer", settings.RATE_LIMIT_TRANSFER),
+    "deposit": _limiter("deposit", settings.RATE_LIMIT_DEPOSIT)
+}
+for name, limiter in rate_limiters.items():
+    stats_collector.register("rate_limit", limiter.stats, limiter=name)
+
+def parse_trusted_proxies(proxies: str) -> list[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+    return [ipaddress.ip_network(proxy.strip()) for proxy in proxies.split(",") if proxy.strip()]
+
+TRUSTED_PROXIES = parse_trusted_proxies(settings.RATE_LIMIT_TRUSTED_PROXIES)
+
+def _is_trusted(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+def client_address(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    if not _is_trusted(host):
+        return host
+    # walk the chain from the closest hop, the first address not added by one of our proxies is the client
+    forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _is_trusted(hop):
+            return hop
+    return forwarded[0] if forwarded else host
+
+def client_identity(request: Request) -> str:
+    return f"ip:{client_address(request)}"
+
+def principal_identity(user: Principal) -> str:
+    return f"user:{user.id}"
+
+def limit_by_client(name: str) -> Callable:
+    limiter = rate_limiters[name]
+
+    async def dependency(request: Request, redis: Annotated[Redis, Depends(get_redis)]) -> None:
+        await limiter.check(client_identity(request), redis)
+
+    return dependency
+
+def limit_by_principal(name: str) -> Callable:
+    limiter = rate_limiters[name]
+
+    async def dependency(user: Annotated[Principal, Depends(get_current_user)], redis: Annotated[Redis, Depends(get_redis)]) -> None:
+        await limiter.check(principal_identity(user), redis)
+
+    return dependency
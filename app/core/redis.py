@@ -1,4 +1,57 @@
-from redis import Redis
+import time
 
-def get_redis():
-    return Redis(host="localhost", port=6379)
+from redis.asyncio import ConnectionPool, Redis
+from redis.asyncio.client import Pipeline
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import REDIS_COMMAND_SECONDS
+from app.core.profiling import add_span
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error=raise_on_error)
+        finally:
+            elapsed = time.perf_counter() - start
+            REDIS_COMMAND_SECONDS.labels(command="PIPELINE").observe(elapsed)
+            add_span("redis", elapsed)
+
+class InstrumentedRedis(Redis):
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - start
+            REDIS_COMMAND_SECONDS.labels(command=str(args[0]).upper()).observe(elapsed)
+            add_span("redis", elapsed)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+redis_pool: ConnectionPool | None = None
+
+def init_redis_pool() -> ConnectionPool:
+    global redis_pool
+    if redis_pool is None:
+        logger.info("Создание пула соединений Redis (max_connections=%d)", settings.REDIS_MAX_CONNECTIONS)
+        redis_pool = ConnectionPool.from_url(
+            settings.REDIS_CACHE_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+    return redis_pool
+
+async def close_redis_pool() -> None:
+    global redis_pool
+    if redis_pool is not None:
+        logger.info("Закрытие пула соединений Redis")
+        await redis_pool.aclose()
+        redis_pool = None
+
+async def get_redis() -> Redis:
+    return InstrumentedRedis(connection_pool=init_redis_pool())
@@ -6,20 +6,20 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from passlib.context import CryptContext
+from redis.asyncio import Redis
 
-from app.api.schemas.users import UserOut
+from app.api.schemas.users import Principal
 from app.db.database import get_db
 from app.db.models import User
-from app.core.config import settings
+from app.core.hashing import password_pool
+from app.core.jwt_keys import key_ring
+from app.core.principal_cache import principal_cache
+from app.core.redis import get_redis
 from app.core.logging import logger
+from app.core.metrics import observe_operation
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
-SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = settings.ALGORITHM
-
-pwd = CryptContext(schemes=['bcrypt'], deprecated="auto")
 
 async def get_user_from_db(username: str, session: AsyncSession) -> User:
     logger.info("Получение пользователя из БД")
@@ -34,18 +34,18 @@ async def get_user_from_db(username: str, session: AsyncSession) -> User:
     logger.debug("Возврат экземпляр User пользователя '%s'", username)
     return user
 
-def get_hashed_password(password: str):
+async def get_hashed_password(password: str) -> str:
     logger.info("Хеширование пароля")
-    return pwd.hash(password)
+    return await password_pool.hash(password)
 
-def verify_password(user_password: str, hash_password: str):
+async def verify_password(user_password: str, hash_password: str) -> bool:
     logger.info("Сравнение введенного пароля с хешем")
-    return pwd.verify(user_password, hash_password)
+    return await password_pool.verify(user_password, hash_password)
 
 async def authenticate_user(username: str, password: str, session: AsyncSession) -> User:
     logger.info("Аутентификация пользователя")
     user = await get_user_from_db(username, session)
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         logger.warning("Некорректное имя '%s' или пароль", username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,14 +70,19 @@ async def create_access_token(data: dict, expire_time: timedelta | None = None)
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     logger.debug("Генерируем JWT токен")
-    access_token = jwt.encode(payload=to_encode, key=SECRET_KEY, algorithm=ALGORITHM)
+    access_token = key_ring.encode(to_encode)
     return access_token
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Annotated[AsyncSession, Depends(get_db)]) -> UserOut:
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> Principal:
     try:
         logger.info("Аутентификация пользователя через JWT токен")
         logger.debug("Получение полезной нагрузки")
-        payload = jwt.decode(jwt=token, key=SECRET_KEY, algorithms=[ALGORITHM])
+        with observe_operation("jwt_decode"):
+            payload = key_ring.decode(token)
         username = payload.get('sub')
         if not username:
             logger.warning("Не найден username токена")
@@ -85,13 +90,18 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: An
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
-        user = await get_user_from_db(username, db)
+        principal = await principal_cache.get(username, redis)
+        if principal is None:
+            user = await get_user_from_db(username, db)
+            principal = Principal(
+                id=user.id,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                username=user.username
+            )
+            await principal_cache.set(principal, redis)
         logger.info("Успешная аутентификация пользователя '%s'", username)
-        return UserOut(
-            first_name=user.first_name,
-            last_name=user.last_name,
-            username=user.username
-        )
+        return principal
     except jwt.exceptions.InvalidTokenError:
         logger.warning("JWT токен некорректен")
         raise HTTPException(
@@ -0,0 +1,136 @@
+import os
+import queue
+import smtplib
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.config import settings
+from app.core.logging import logger
+
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+class SMTPPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_tls: bool,
+        username: str | None,
+        password: str | None,
+        size: int,
+        timeout: float,
+        idle_timeout: float
+    ):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._idle: queue.LifoQueue[tuple[smtplib.SMTP, float]] = queue.LifoQueue(maxsize=size)
+        self._pid = os.getpid()
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        logger.debug("Подключение к SMTP серверу %s:%s", self.host, self.port)
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                logger.debug("Аутентификация на SMTP сервере")
+                server.login(self.username, self.password)
+        except BaseException:
+            self._close(server)
+            raise
+        self.connects += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - released_at < self.idle_timeout:
+                return server
+            # the server may have dropped a connection that sat idle for a while
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            server.close()
+
+    def _checkin(self, server: smtplib.SMTP) -> None:
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._close(server)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        server = self._checkout()
+        try:
+            yield server
+        except RECONNECT_ERRORS:
+            server.close()
+            raise
+        except BaseException:
+            self._checkin(server)
+            raise
+        self._checkin(server)
+
+    def send(self, from_addr: str, to_addr: str, message: str) -> None:
+        for attempt in (1, 2):
+            try:
+                with self.connection() as server:
+                    server.sendmail(from_addr, to_addr, message)
+                return
+            except RECONNECT_ERRORS as e:
+                if attempt == 2:
+                    raise
+                logger.warning("SMTP соединение разорвано (%s), переподключение", e)
+
+    def close(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+_pool: SMTPPool | None = None
+
+def get_smtp_pool() -> SMTPPool:
+    global _pool
+    # connections must not be shared with a forked worker child
+    if _pool is None or _pool._pid != os.getpid():
+        logger.info("Создание пула SMTP соединений %s:%s (size=%d)", settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_POOL_SIZE)
+        _pool = SMTPPool(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            use_tls=settings.SMTP_USE_TLS,
+            username=settings.EMAIL_HOST if settings.SMTP_AUTH else None,
+            password=settings.EMAIL_PASSWORD if settings.SMTP_AUTH else None,
+            size=settings.SMTP_POOL_SIZE,
+            timeout=settings.SMTP_TIMEOUT,
+            idle_timeout=settings.SMTP_IDLE_TIMEOUT
+        )
+    return _pool
+
+def close_smtp_pool() -> None:
+    global _pool
+    if _pool is not None and _pool._pid == os.getpid():
+        logger.info("Закрытие пула SMTP соединений")
+        _pool.close()
+    _pool = None
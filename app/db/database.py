@@ -1,11 +1,40 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine, stats_collector
+from app.db.pool import InstrumentedAsyncPool
 
-engine = create_async_engine(url=settings.ASYNC_DATABASE_URL)
+engine = create_async_engine(
+    url=settings.ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+    }
+)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+instrument_engine(engine.sync_engine)
+stats_collector.register("db_pool", engine.pool.stats)
 
 async def get_db():
     async with async_session_maker() as session:
         yield session
 
+@asynccontextmanager
+async def task_session() -> AsyncIterator[AsyncSession]:
+    # every Celery task runs in its own event loop, so pooled asyncpg connections cannot be reused between runs
+    task_engine = create_async_engine(settings.ASYNC_DATABASE_URL, poolclass=NullPool)
+    try:
+        async with async_sessionmaker(task_engine, class_=AsyncSession)() as session:
+            yield session
+    finally:
+        await task_engine.dispose()
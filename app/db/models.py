@@ -1,8 +1,9 @@
 from datetime import datetime, timezone
+from decimal import Decimal
 from typing import List
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Boolean, ForeignKey, String, Integer, DateTime, Float
+from sqlalchemy import JSON, Boolean, ForeignKey, String, Integer, DateTime, Numeric, Index
 
 
 class Base(DeclarativeBase):
@@ -26,12 +27,15 @@ class User(Base):
 
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (
+        Index("uq_accounts_user_id_name", "user_id", "name", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(50), default="first_account", nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    balance: Mapped[float] = mapped_column(Float, default=0, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     user: Mapped["User"] = relationship("User", back_populates="accounts")
     outgoing_transactions: Mapped[List["Transaction"]] = relationship(
@@ -49,15 +53,45 @@ class Account(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Postgres walks these backwards for ORDER BY timestamp DESC, id DESC
+        # amount is included so that per-account aggregations are answered by index-only scans
+        Index("ix_transactions_from_account_id_timestamp_id", "from_account_id", "timestamp", "id", postgresql_include=["amount"]),
+        Index("ix_transactions_to_account_id_timestamp_id", "to_account_id", "timestamp", "id", postgresql_include=["amount"]),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     from_account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), nullable=True)
     to_account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), nullable=False)
-    amount: Mapped[float] = mapped_column(Float, nullable=False)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.now(timezone.utc))
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    from_balance_after: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=True)
+    to_balance_after: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=True)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
     description: Mapped[str] = mapped_column(String(150), nullable=False)
 
     user: Mapped["User"] = relationship("User", back_populates="transactions")
     from_account: Mapped["Account"] = relationship("Account", foreign_keys=[from_account_id], back_populates="outgoing_transactions")
-    to_account: Mapped["Account"] = relationship("Account", foreign_keys=[to_account_id], back_populates="incoming_transactions")
\ No newline at end of file
+    to_account: Mapped["Account"] = relationship("Account", foreign_keys=[to_account_id], back_populates="incoming_transactions")
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task: Mapped[str] = mapped_column(String(255), nullable=False)
+    args: Mapped[list] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("uq_idempotency_keys_user_id_key", "user_id", "key", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    response_status: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_body: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
@@ -0,0 +1,53 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.logging import logger
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.overflow_connections = 0
+        self.max_checked_out = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            logger.warning("Истекло время ожидания соединения из пула БД (занято %d)", self.checkedout())
+            raise
+        wait_seconds = time.perf_counter() - start
+        self.checkouts += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        self.max_checked_out = max(self.max_checked_out, self.checkedout())
+        return connection
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()
+        if created and self._overflow > 0:
+            self.overflow_connections += 1
+            logger.debug("Открыто соединение сверх размера пула БД (%d из %d)", self._overflow, self._max_overflow)
+        return created
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_checked_out": self.max_checked_out,
+            "checkouts": self.checkouts,
+            "overflow_connections": self.overflow_connections,
+            "timeouts": self.timeouts,
+            "avg_wait_seconds": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+            "max_wait_seconds": self.wait_seconds_max,
+        }
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import Select, func, literal_column, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas.banking import AccountAnalytics, AnalyticsBucket
+from app.core.logging import logger
+from app.core.metrics import record_cache
+from app.db.models import Transaction
+from app.services.banking import get_account
+from app.services.ledger import to_naive_utc
+from app.services.redis_service import get_history_version, get_account_analytics_redis, save_account_analytics
+
+ANALYTICS_GRANULARITIES = ("day", "month")
+ANALYTICS_MAX_DAILY_RANGE = timedelta(days=366)
+
+def analytics_query(account_id: int, start: datetime, end: datetime, granularity: str) -> Select:
+    incoming = (
+        select(Transaction.timestamp, Transaction.amount, literal_column("true").label("incoming"))
+        .where(Transaction.to_account_id == account_id, Transaction.timestamp >= start, Transaction.timestamp < end)
+    )
+    outgoing = (
+        select(Transaction.timestamp, Transaction.amount, literal_column("false").label("incoming"))
+        .where(Transaction.from_account_id == account_id, Transaction.timestamp >= start, Transaction.timestamp < end)
+    )
+    entries = union_all(incoming, outgoing).subquery()
+    # inlined instead of bound so that the SELECT and GROUP BY expressions are identical for Postgres
+    period = func.date_trunc(literal_column(f"'{granularity}'"), entries.c.timestamp).label("period")
+    return (
+        select(
+            period,
+            func.coalesce(func.sum(entries.c.amount).filter(entries.c.incoming), 0).label("inflow"),
+            func.count().filter(entries.c.incoming).label("inflow_count"),
+            func.coalesce(func.sum(entries.c.amount).filter(~entries.c.incoming), 0).label("outflow"),
+            func.count().filter(~entries.c.incoming).label("outflow_count")
+        )
+        .group_by(period)
+        .order_by(period)
+    )
+
+async def get_account_analytics_service(
+    account_name: str,
+    start: datetime,
+    end: datetime,
+    granularity: str,
+    session: AsyncSession,
+    user_id: int,
+    redis: Redis
+) -> AccountAnalytics:
+    if granularity not in ANALYTICS_GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Granularity has to be one of {', '.join(ANALYTICS_GRANULARITIES)}"
+        )
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if start >= end:
+        logger.warning("Некорректный период аналитики: %s - %s", start.isoformat(), end.isoformat())
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Analytics start must be earlier than end"
+        )
+    if granularity == "day" and end - start > ANALYTICS_MAX_DAILY_RANGE:
+        logger.warning("Слишком длинный период для дневной аналитики: %s - %s", start.isoformat(), end.isoformat())
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Daily analytics are limited to {ANALYTICS_MAX_DAILY_RANGE.days} days, use monthly granularity"
+        )
+
+    account = await get_account(acc_name=account_name, session=session, user_id=user_id)
+    version = None
+    try:
+        version = await get_history_version(user_id=user_id, acc_name=account.name, redis=redis)
+        cached = await get_account_analytics_redis(account.id, version, granularity, start, end, redis=redis)
+        record_cache("analytics", hit=cached is not None)
+        if cached is not None:
+            logger.info("Возврат аналитики счета '%s' из кеша", account_name)
+            return cached
+    except RedisError as e:
+        logger.warning("Redis недоступен, аналитика счета '%s' считается без кеша: %s", account_name, e)
+
+    logger.debug("Подсчет аналитики счета '%s' за %s - %s по '%s'", account_name, start.isoformat(), end.isoformat(), granularity)
+    rows = (await session.execute(analytics_query(account.id, start, end, granularity))).all()
+    buckets = [
+        AnalyticsBucket(
+            period=row.period,
+            inflow=row.inflow,
+            inflow_count=row.inflow_count,
+            outflow=row.outflow,
+            outflow_count=row.outflow_count
+        )
+        for row in rows
+    ]
+    analytics = AccountAnalytics(
+        account_name=account.name,
+        start=start,
+        end=end,
+        granularity=granularity,
+        inflow=sum((b.inflow for b in buckets), Decimal(0)),
+        inflow_count=sum(b.inflow_count for b in buckets),
+        outflow=sum((b.outflow for b in buckets), Decimal(0)),
+        outflow_count=sum(b.outflow_count for b in buckets),
+        buckets=buckets
+    )
+    try:
+        await save_account_analytics(account.id, version, analytics, redis=redis)
+    except RedisError as e:
+        logger.warning("Не удалось сохранить аналитику счета '%s' в Redis: %s", account_name, e)
+    logger.info("Возврат аналитики счета '%s': %d периодов", account_name, len(buckets))
+    return analytics
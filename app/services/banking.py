@@ -1,19 +1,56 @@
-from typing import List
+import asyncio
+import base64
+import random
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Set, Tuple, TypeVar
 import logging
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Integer, Row, Select, and_, case, cast, insert, literal, select, update, or_, tuple_
+from sqlalchemy.exc import DBAPIError
+from redis.asyncio import Redis
 
+from app.core.metrics import record_cache
+from app.db.database import async_session_maker
 from app.db.models import User, Account, Transaction
-from app.api.schemas.banking import UserAccount, TransactionHistory
-from app.api.schemas.users import UserOut
-from app.core.security import get_user_from_db
-from app.services.redis_service import save_transaction, check_user_cache_transaction, get_transaction_history_redis
+from app.api.schemas.banking import (
+    UserAccount,
+    AccountBalanceAt,
+    TransactionHistory,
+    TransferDataBalance,
+    BatchTransferItemResult,
+    BatchTransferResult
+)
+from app.api.schemas.users import Principal
+from app.services.ledger import get_balance_at
+from app.services.redis_service import (
+    HISTORY_CACHE_SIZE,
+    queue_transaction_history,
+    save_transactions_bulk,
+    get_history_version,
+    check_user_cache_transaction,
+    get_transaction_history_redis,
+    acquire_history_rebuild_lock,
+    release_history_rebuild_lock,
+    wait_for_transaction_history,
+    invalidate_transaction_history,
+    to_transaction_history
+)
 # from app.core.logging import logger
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+TRANSACTION_MAX_ATTEMPTS = 3
+TRANSACTION_RETRY_BACKOFF = 0.05
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+HISTORY_EXPORT_BATCH_SIZE = 500
+
+BATCH_TRANSFER_MAX_ITEMS = 500
+
 async def add_account_service(account_name: str, username: str, session: AsyncSession):
     if len(account_name) < 1:
         logger.warning("Попытка создания счета с пустым именем")
@@ -61,25 +98,98 @@ async def get_certain_account_service(account_name: str, session: AsyncSession,
     logger.info("Возврат счета '%s' пользователю", account_name)
     return UserAccount(account_name=account.name, balance=account.balance, created_at=account.created_at)
 
-async def get_all_accounts_service(username: str, session: AsyncSession) -> List[UserAccount]:
-    query_user = await session.execute(select(User).where(User.username == username).options(selectinload(User.accounts)))
-    user = query_user.scalar()
+async def get_balance_at_service(account_name: str, at: datetime, session: AsyncSession, user_id: int) -> AccountBalanceAt:
+    account = await get_account(acc_name=account_name, session=session, user_id=user_id)
+    balance = await get_balance_at(session, account_id=account.id, at=at)
+    logger.info("Возврат баланса счета '%s' на момент %s", account_name, at.isoformat())
+    return AccountBalanceAt(account_name=account.name, balance=balance, at=at)
+
+async def get_all_accounts_service(user_id: int, session: AsyncSession) -> List[UserAccount]:
+    logger.debug("Поиск всех счетов пользователя '%s'", user_id)
+    query_accounts = await session.execute(select(Account).where(Account.user_id == user_id))
     accounts = []
-    logger.debug("Поиск всех счетов пользователя '%s'", username)
-    for acc in user.accounts:
+    for acc in query_accounts.scalars().all():
         accounts.append(UserAccount(
             account_name=acc.name,
             balance=acc.balance,
             created_at=acc.created_at
         ))
-    logger.info("Возврат всех счетов для пользователя '%s'", username)
+    logger.info("Возврат всех счетов для пользователя '%s'", user_id)
     return accounts
 
+async def _run_transaction(session: AsyncSession, operation: Callable[[], Awaitable[T]]) -> T:
+    for attempt in range(1, TRANSACTION_MAX_ATTEMPTS + 1):
+        try:
+            result = await operation()
+            await session.commit()
+            return result
+        except HTTPException:
+            await session.rollback()
+            raise
+        except DBAPIError as e:
+            await session.rollback()
+            sqlstate = getattr(e.orig, "sqlstate", None)
+            if sqlstate not in RETRYABLE_SQLSTATES or attempt == TRANSACTION_MAX_ATTEMPTS:
+                raise
+            logger.warning("Конфликт транзакции (SQLSTATE %s), повторная попытка %d из %d", sqlstate, attempt + 1, TRANSACTION_MAX_ATTEMPTS)
+            await asyncio.sleep(random.uniform(0, TRANSACTION_RETRY_BACKOFF * attempt))
+
+def transfer_accounts_query(user_id: int, account_name: str, transfer_account_name: str, transfer_username: str | None = None) -> Select:
+    transfer_owner = literal(user_id, Integer)
+    if transfer_username is not None:
+        # the recipient is resolved by an init plan, so both sides are still probed through uq_accounts_user_id_name
+        transfer_owner = select(User.id).where(User.username == transfer_username).scalar_subquery()
+    return (
+        select(Account, transfer_owner.label("transfer_owner_id"))
+        .where(or_(
+            and_(Account.user_id == user_id, Account.name == account_name),
+            and_(Account.user_id == transfer_owner, Account.name == transfer_account_name)
+        ))
+        .order_by(Account.id)
+        .with_for_update(of=Account)
+        .execution_options(populate_existing=True)
+    )
+
+async def _lock_transfer_accounts(
+    session: AsyncSession,
+    user_id: int,
+    account_name: str,
+    transfer_account_name: str,
+    transfer_username: str | None = None
+) -> Tuple[Account, Account]:
+    logger.debug("Поиск и блокировка счетов '%s' и '%s' для перевода", account_name, transfer_account_name)
+    query_accounts = await session.execute(transfer_accounts_query(user_id, account_name, transfer_account_name, transfer_username))
+    rows = query_accounts.all()
+    accounts = {(acc.user_id, acc.name): acc for acc, _ in rows}
+    account = accounts.get((user_id, account_name))
+    if account is None:
+        logger.warning("Пользователь '%s' пытается перевести средства с несуществующего счета '%s'", user_id, account_name)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid account name"
+        )
+    transfer_owner_id = rows[0].transfer_owner_id
+    if transfer_owner_id is None:
+        logger.warning("Пользователь '%s' не существует", transfer_username)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User wasn't found."
+        )
+    transfer_account = accounts.get((transfer_owner_id, transfer_account_name))
+    if transfer_account is None:
+        logger.warning("Пользователь '%s' пытается перевести средства на несуществующий счет '%s'", user_id, transfer_account_name)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid account name"
+        )
+    return account, transfer_account
+
 async def deposit_account_balance_service(
     account_name: str,
-    amount: float,
+    amount: Decimal,
     session: AsyncSession,
-    user_id: int
+    user_id: int,
+    redis: Redis
 ) -> None:
     logger.info("Пополнение счета '%s' на сумму %.2f", account_name, amount)
     if amount <= 0:
@@ -88,27 +198,44 @@ async def deposit_account_balance_service(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Amount must be greater than zero"
         )
-    account = await get_account(acc_name=account_name, session=session, user_id=user_id)
-    history_transaction = Transaction(
-        from_account=None,
-        to_account=account,
-        amount=amount,
-        description=f"Пополнение счета {account_name}",
-        user_id=user_id
-    )
-    logger.debug("Сохранение транзакции в кеш и БД")
-    save_transaction(history_transaction=history_transaction, acc_name=account_name)
-    session.add(history_transaction)
-    account.balance += amount
+
+    async def deposit():
+        query_account = await session.execute(
+            update(Account)
+            .where(Account.name == account_name, Account.user_id == user_id)
+            .values(balance=Account.balance + amount)
+            .returning(Account.id, Account.balance)
+        )
+        updated_account = query_account.one_or_none()
+        if updated_account is None:
+            logger.warning("Пользователь '%s' пытается пополнить несуществующий счет '%s'", user_id, account_name)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid account name"
+            )
+        account_id = updated_account.id
+        history_transaction = Transaction(
+            from_account_id=None,
+            to_account_id=account_id,
+            amount=amount,
+            to_balance_after=updated_account.balance,
+            description=f"Пополнение счета {account_name}",
+            user_id=user_id
+        )
+        logger.debug("Сохранение транзакции в БД")
+        session.add(history_transaction)
+        queue_transaction_history(session, redis, history_transaction, user_id=user_id, acc_name=account_name, account_id=account_id)
+
+    await _run_transaction(session, deposit)
     logger.info("Успешное пополнение счета '%s' на %.2f", account_name, amount)
-    await session.commit()
 
 async def transfer_money_service(
     account_name: str,
-    amount: float,
+    amount: Decimal,
     session: AsyncSession,
     user_id: int,
     transfer_account_name: str,
+    redis: Redis,
     transfer_username: str | None = None,
 ) -> None:
     logger.info("Перевод средств со счета '%s' на '%s'", account_name, transfer_account_name)
@@ -120,63 +247,272 @@ async def transfer_money_service(
             detail="Amount must be greater than zero"
         )
 
-    account = await get_account(acc_name=account_name, session=session, user_id=user_id)
-    if amount > account.balance:
-        logger.warning("Введенная сумма превышает баланс пользователя. Запрошено %.2f, доступно %.2f", amount, account.balance)
+    async def transfer():
+        account, transfer_account = await _lock_transfer_accounts(session, user_id, account_name, transfer_account_name, transfer_username)
+        if amount > account.balance:
+            logger.warning("Введенная сумма превышает баланс пользователя. Запрошено %.2f, доступно %.2f", amount, account.balance)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="There are insufficient funds in the account"
+            )
+
+        account.balance -= amount
+        transfer_account.balance += amount
+        history_transaction = Transaction(
+            from_account=account,
+            to_account=transfer_account,
+            amount=amount,
+            from_balance_after=account.balance,
+            to_balance_after=transfer_account.balance,
+            description=f"Перевод со счета {account_name} на {transfer_account_name}",
+            user_id=user_id
+        )
+        logger.debug("Сохранение транзакции в БД")
+        session.add(history_transaction)
+        for acc in (account, transfer_account):
+            queue_transaction_history(session, redis, history_transaction, user_id=acc.user_id, acc_name=acc.name, account_id=acc.id)
+
+    await _run_transaction(session, transfer)
+    logger.info("Успешный перевод %.2f со счета '%s' на '%s'", amount, account_name, transfer_account_name)
+
+async def _resolve_recipients(session: AsyncSession, usernames: Set[str]) -> Dict[str, int]:
+    if not usernames:
+        return {}
+    logger.debug("Поиск %d получателей пакетного перевода", len(usernames))
+    query_users = await session.execute(select(User.id, User.username).where(User.username.in_(sorted(usernames))))
+    return {row.username: row.id for row in query_users.all()}
+
+async def _lock_accounts_by_name(session: AsyncSession, keys: Set[Tuple[int, str]]) -> Dict[Tuple[int, str], Row]:
+    logger.debug("Блокировка %d счетов пакетного перевода", len(keys))
+    query_accounts = await session.execute(
+        select(Account.id, Account.user_id, Account.name, Account.balance)
+        .where(tuple_(Account.user_id, Account.name).in_(sorted(keys)))
+        .order_by(Account.id)
+        .with_for_update()
+    )
+    return {(acc.user_id, acc.name): acc for acc in query_accounts.all()}
+
+async def batch_transfer_service(
+    transfers: List[TransferDataBalance],
+    mode: str,
+    session: AsyncSession,
+    user_id: int,
+    redis: Redis
+) -> BatchTransferResult:
+    logger.info("Пакетный перевод средств: %d операций, режим '%s'", len(transfers), mode)
+    if len(transfers) > BATCH_TRANSFER_MAX_ITEMS:
+        logger.warning("Слишком большой пакет переводов: %d операций", len(transfers))
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can contain at most {BATCH_TRANSFER_MAX_ITEMS} transfers"
+        )
+
+    async def batch_transfer() -> BatchTransferResult:
+        recipients = await _resolve_recipients(session, {t.transfer_username for t in transfers if t.transfer_username is not None})
+        owners = [user_id if t.transfer_username is None else recipients.get(t.transfer_username) for t in transfers]
+        keys = {(user_id, t.account_name) for t in transfers}
+        keys.update((owner, t.transfer_account_name) for owner, t in zip(owners, transfers) if owner is not None)
+        accounts = await _lock_accounts_by_name(session, keys)
+
+        balances = {acc.id: acc.balance for acc in accounts.values()}
+        deltas: Dict[int, Decimal] = {}
+        applied = []
+        results = []
+        for index, (transfer, owner) in enumerate(zip(transfers, owners)):
+            account = accounts.get((user_id, transfer.account_name))
+            transfer_account = accounts.get((owner, transfer.transfer_account_name))
+            detail = None
+            if transfer.amount <= 0:
+                detail = "Amount must be greater than zero"
+            elif owner is None:
+                detail = "User wasn't found."
+            elif account is None or transfer_account is None:
+                detail = "Invalid account name"
+            elif transfer.amount > balances[account.id]:
+                detail = "There are insufficient funds in the account"
+            if detail is not None:
+                logger.warning("Операция %d пакетного перевода отклонена: %s", index, detail)
+                results.append(BatchTransferItemResult(index=index, status="failed", detail=detail))
+                continue
+            balances[account.id] -= transfer.amount
+            balances[transfer_account.id] += transfer.amount
+            deltas[account.id] = deltas.get(account.id, Decimal(0)) - transfer.amount
+            deltas[transfer_account.id] = deltas.get(transfer_account.id, Decimal(0)) + transfer.amount
+            applied.append((transfer, account, transfer_account, balances[account.id], balances[transfer_account.id]))
+            results.append(BatchTransferItemResult(index=index, status="ok"))
+
+        failed = len(results) - len(applied)
+        if failed and mode == "atomic":
+            for result in results:
+                if result.status == "ok":
+                    result.status = "skipped"
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=BatchTransferResult(mode=mode, succeeded=0, failed=failed, results=results).model_dump()
+            )
+
+        if applied:
+            await session.execute(
+                update(Account)
+                .where(Account.id.in_(sorted(deltas)))
+                .values(balance=Account.balance + case(
+                    {account_id: cast(delta, Account.balance.type) for account_id, delta in deltas.items()},
+                    value=Account.id
+                ))
+                .execution_options(synchronize_session=False)
+            )
+            history_transactions = (await session.scalars(
+                insert(Transaction).returning(Transaction, sort_by_parameter_order=True),
+                [
+                    {
+                        "from_account_id": account.id,
+                        "to_account_id": transfer_account.id,
+                        "amount": transfer.amount,
+                        "from_balance_after": from_balance_after,
+                        "to_balance_after": to_balance_after,
+                        "description": f"Перевод со счета {account.name} на {transfer_account.name}",
+                        "user_id": user_id
+                    }
+                    for transfer, account, transfer_account, from_balance_after, to_balance_after in applied
+                ]
+            )).all()
+            for history_transaction, (_, account, transfer_account, _, _) in zip(history_transactions, applied):
+                for acc in (account, transfer_account):
+                    queue_transaction_history(session, redis, history_transaction, user_id=acc.user_id, acc_name=acc.name, account_id=acc.id)
+        return BatchTransferResult(mode=mode, succeeded=len(applied), failed=failed, results=results)
+
+    result = await _run_transaction(session, batch_transfer)
+    logger.info("Пакетный перевод завершен: выполнено %d, отклонено %d", result.succeeded, result.failed)
+    return result
+
+def encode_history_cursor(history: TransactionHistory) -> str | None:
+    if history.id is None or history.timestamp is None:
+        return None
+    return base64.urlsafe_b64encode(f"{history.timestamp.isoformat()}|{history.id}".encode()).decode()
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(transaction_id)
+    except (ValueError, UnicodeDecodeError):
+        logger.warning("Некорректный курсор истории транзакций: '%s'", cursor)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="There are insufficient funds in the account"
+            detail="Invalid cursor"
         )
-    logger.debug("Перевод между своими счетами или другому пользователю")
-    if transfer_username is None:
-        transfer_account = await get_account(acc_name=transfer_account_name, session=session, user_id=user_id)
+
+def _history_filter(account_id: int):
+    return or_(Transaction.to_account_id == account_id, Transaction.from_account_id == account_id)
+
+def _history_query(
+    account_id: int,
+    limit: int,
+    before: Tuple[datetime, int] | None = None,
+    after: Tuple[datetime, int] | None = None
+) -> Select:
+    history_query = select(Transaction).where(_history_filter(account_id))
+    if before is not None:
+        history_query = history_query.where(tuple_(Transaction.timestamp, Transaction.id) < before)
+    if after is not None:
+        history_query = history_query.where(tuple_(Transaction.timestamp, Transaction.id) > after)
+    if after is not None and before is None:
+        history_query = history_query.order_by(Transaction.timestamp, Transaction.id)
     else:
-        to_user = await get_user_from_db(username=transfer_username, session=session)
-        transfer_account = await get_account(acc_name=transfer_account_name, session=session, user_id=to_user.id)
-
-    history_transaction = Transaction(
-        from_account=account,
-        to_account=transfer_account,
-        amount=amount,
-        description=f"Перевод со счета {account_name} на {transfer_account_name}",
-        user_id=user_id
+        history_query = history_query.order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+    return history_query.limit(limit)
+
+async def _load_history(
+    session: AsyncSession,
+    user_id: int,
+    account_name: str,
+    limit: int,
+    before: str | None,
+    after: str | None
+) -> Tuple[int, List[Transaction]]:
+    logger.debug("Получение страницы транзакций счета '%s' из БД", account_name)
+    account = await get_account(acc_name=account_name, session=session, user_id=user_id)
+    history_query = _history_query(
+        account_id=account.id,
+        limit=limit,
+        before=decode_history_cursor(before) if before is not None else None,
+        after=decode_history_cursor(after) if after is not None else None
     )
-    logger.debug("Сохранение транзакции в кеш и БД")
-    save_transaction(history_transaction=history_transaction, acc_name=account_name)
-    session.add(history_transaction)
-    account.balance -= amount
-    transfer_account.balance += amount
-    logger.info("Успешный перевод %.2f со счета '%s' на '%s'", amount, account_name, transfer_account_name)
-    await session.commit()
+    history = (await session.execute(history_query)).scalars().all()
+    if after is not None and before is None:
+        return account.id, list(history)
+    return account.id, list(reversed(history))
 
-async def get_transaction_hisotry_service(user_data: UserOut, account_name: str, session: AsyncSession):
-    user = await get_user_from_db(username=user_data.username, session=session)
-    if check_user_cache_transaction(user_id=user.id, acc_name=account_name):
+async def get_transaction_hisotry_service(
+    user_data: Principal,
+    account_name: str,
+    session: AsyncSession,
+    redis: Redis,
+    limit: int = HISTORY_CACHE_SIZE,
+    before: str | None = None,
+    after: str | None = None
+) -> List[TransactionHistory]:
+    is_latest_page = before is None and after is None and limit <= HISTORY_CACHE_SIZE
+    result = None
+    if is_latest_page and await check_user_cache_transaction(user_id=user_data.id, acc_name=account_name, redis=redis):
         logger.debug("Получение списка транзакций счета '%s' из кеша редис", account_name)
-        result = get_transaction_history_redis(user_id=user.id, acc_name=account_name)
-    else:
-        logger.debug("Получение списка транзакций счета '%s' из БД", account_name)
-        account = await get_account(acc_name=account_name, session=session, user_id=user.id)
-        history_query = await session.execute(select(Transaction).where(
-            or_(and_(Transaction.from_account_id == None, Transaction.to_account_id == account.id),
-                (Transaction.from_account_id == account.id))
-        ))
-        history = history_query.scalars().all()
-        result = []
-        logger.debug("Формирование списка из %d транзакций и запись в кеш", len(history))
-        for h in history:
-            save_transaction(history_transaction=h, acc_name=account_name)
-            result.append(
-                TransactionHistory(
-                    description=h.description,
-                    amount=f"{"+" if h.from_account_id is None else "-"}{h.amount}"
-                )
+        result = await get_transaction_history_redis(user_id=user_data.id, acc_name=account_name, redis=redis)
+        result = result[-limit:]
+
+    rebuild_token = None
+    version = None
+    if result is None and is_latest_page:
+        rebuild_token = await acquire_history_rebuild_lock(user_id=user_data.id, acc_name=account_name, redis=redis)
+        if rebuild_token is not None:
+            version = await get_history_version(user_id=user_data.id, acc_name=account_name, redis=redis)
+        else:
+            cached = await wait_for_transaction_history(user_id=user_data.id, acc_name=account_name, redis=redis)
+            if cached is not None:
+                result = cached[-limit:]
+
+    if is_latest_page:
+        record_cache("transaction_history", hit=result is not None)
+    if result is None:
+        try:
+            account_id, history = await _load_history(
+                session=session,
+                user_id=user_data.id,
+                account_name=account_name,
+                limit=HISTORY_CACHE_SIZE if is_latest_page else limit,
+                before=before,
+                after=after
             )
+            if rebuild_token is not None:
+                await save_transactions_bulk(
+                    user_id=user_data.id,
+                    acc_name=account_name,
+                    account_id=account_id,
+                    transactions=history,
+                    version=version,
+                    redis=redis
+                )
+        finally:
+            if rebuild_token is not None:
+                await release_history_rebuild_lock(user_id=user_data.id, acc_name=account_name, token=rebuild_token, redis=redis)
+        result = [to_transaction_history(h, account_id) for h in history[-limit:]]
     logger.info("Возврат %d транзакций счета '%s' пользователю '%s'", len(result), account_name, user_data.username)
     return result
 
-async def delete_account_service(account_name: str, session: AsyncSession, user_id: int):
+async def stream_transaction_history_service(account_id: int, batch_size: int = HISTORY_EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    logger.info("Потоковая выгрузка истории транзакций счета %d", account_id)
+    async with async_session_maker() as session:
+        history = await session.stream_scalars(
+            select(Transaction)
+            .where(_history_filter(account_id))
+            .order_by(Transaction.timestamp, Transaction.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in history.partitions():
+            yield "".join(to_transaction_history(h, account_id).model_dump_json() + "\n" for h in partition)
+
+async def delete_account_service(account_name: str, session: AsyncSession, user_id: int, redis: Redis):
     account = await get_account(acc_name=account_name, session=session, user_id=user_id)
-    logger.info("Удаление счета '%s' для пользователя '%s'", account_name, account.user.username)
+    logger.info("Удаление счета '%s' для пользователя '%s'", account_name, user_id)
     await session.delete(account)
-    await session.commit()
\ No newline at end of file
+    await session.commit()
+    # a new account with the same name must not inherit the cached history
+    await invalidate_transaction_history(user_id=user_id, acc_name=account_name, redis=redis)
\ No newline at end of file
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from app.tasks.email_task import send_email
 from app.db.models import User
 from app.core.logging import logger
+from app.services.outbox import enqueue_task
 
 def generate_verification_code() -> int:
     logger.debug("Формирование случайного кода верификации")
@@ -21,9 +22,9 @@ async def send_email_verification_code(user: User, session: AsyncSession):
     user.email_verification_code = verification_code
     user.email_verification_code_expires = verification_code_expire
 
+    logger.debug("Сохранение задачи Celery для отправки письма в outbox")
+    enqueue_task(session, send_email, user.email, verification_code)
     await session.commit()
-    logger.debug("Формирование задачи Celery для отправки письма")
-    send_email.delay(user.email, verification_code)
 
 async def verify_user_code(user_code: int, email: str, session: AsyncSession):
     logger.info("Верификация пользователя '%s'", email)
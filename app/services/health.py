@@ -0,0 +1,79 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy import text
+
+from app.core.celery import celery_app
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.redis import get_redis
+from app.db.database import engine
+
+HEALTH_CHECK_TIMEOUT = settings.HEALTH_CHECK_TIMEOUT
+HEALTH_CACHE_TTL = settings.HEALTH_CACHE_TTL
+
+async def check_database() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def check_redis() -> None:
+    redis = await get_redis()
+    await redis.ping()
+
+def _connect_broker() -> None:
+    with celery_app.connection_for_write(connect_timeout=HEALTH_CHECK_TIMEOUT) as conn:
+        conn.ensure_connection(max_retries=0)
+
+async def check_broker() -> None:
+    # kombu is blocking, the connection attempt itself is bounded by connect_timeout
+    await asyncio.get_running_loop().run_in_executor(None, _connect_broker)
+
+READINESS_CHECKS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "database": check_database,
+    "redis": check_redis,
+    "broker": check_broker
+}
+
+async def _run_check(name: str, check: Callable[[], Awaitable[None]], timeout: float) -> dict:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), timeout)
+    except Exception as e:
+        logger.warning("Проверка готовности '%s' не пройдена: %s", name, repr(e))
+        return {"status": "error", "latency_ms": round((time.perf_counter() - start) * 1000, 2), "error": type(e).__name__}
+    return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+class ReadinessProbe:
+    def __init__(self, checks: Dict[str, Callable[[], Awaitable[None]]], timeout: float, ttl: float):
+        self.checks = checks
+        self.timeout = timeout
+        self.ttl = ttl
+        self._result: dict | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _cached(self) -> dict | None:
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+        return None
+
+    async def check(self) -> dict:
+        cached = self._cached()
+        if cached is not None:
+            return cached
+        # concurrent probes wait for the check already in flight instead of starting their own
+        async with self._lock:
+            cached = self._cached()
+            if cached is not None:
+                return cached
+            results = await asyncio.gather(*(_run_check(name, check, self.timeout) for name, check in self.checks.items()))
+            checks = dict(zip(self.checks, results))
+            self._result = {
+                "status": "ok" if all(r["status"] == "ok" for r in results) else "error",
+                "checks": checks
+            }
+            self._checked_at = time.monotonic()
+            return self._result
+
+readiness_probe = ReadinessProbe(checks=READINESS_CHECKS, timeout=HEALTH_CHECK_TIMEOUT, ttl=HEALTH_CACHE_TTL)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL = settings.IDEMPOTENCY_KEY_TTL
+IDEMPOTENCY_LOCK_TTL_MS = 30000
+IDEMPOTENCY_PROCESSING = b"processing"
+PENDING_IDEMPOTENCY_KEY = "idempotency_record"
+
+def _get_idempotency_key(user_id: int, key: str):
+    return f"idempotency:{user_id}:{key}"
+
+def request_fingerprint(operation: str, payload: BaseModel) -> str:
+    return hashlib.sha256(f"{operation}:{payload.model_dump_json()}".encode()).hexdigest()
+
+def _replay(fingerprint: str, stored_fingerprint: str, status_code: int, body: dict) -> JSONResponse:
+    if stored_fingerprint != fingerprint:
+        logger.warning("Ключ идемпотентности повторно использован с другим запросом")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key has already been used with a different request"
+        )
+    logger.info("Повторный запрос с ключом идемпотентности, возврат сохраненного ответа")
+    return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+async def _load_record(session: AsyncSession, user_id: int, key: str) -> IdempotencyKey | None:
+    query_record = await session.execute(select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key))
+    return query_record.scalar_one_or_none()
+
+async def _cache_record(redis: Redis, record: IdempotencyKey) -> None:
+    try:
+        await redis.set(
+            _get_idempotency_key(user_id=record.user_id, key=record.key),
+            json.dumps({"fingerprint": record.fingerprint, "status": record.response_status, "body": record.response_body}),
+            ex=IDEMPOTENCY_KEY_TTL
+        )
+    except RedisError as e:
+        logger.warning("Не удалось сохранить ответ по ключу идемпотентности в Redis: %s", e)
+
+async def _release(redis: Redis, redis_key: str) -> None:
+    try:
+        await redis.delete(redis_key)
+    except RedisError as e:
+        logger.warning("Не удалось снять отметку ключа идемпотентности в Redis: %s", e)
+
+async def run_idempotent(
+    key: str | None,
+    user_id: int,
+    fingerprint: str,
+    response_body: dict,
+    session: AsyncSession,
+    redis: Redis,
+    operation: Callable[[], Awaitable[None]]
+) -> dict | JSONResponse:
+    if key is None:
+        await operation()
+        return response_body
+
+    redis_key = _get_idempotency_key(user_id=user_id, key=key)
+    acquired = False
+    try:
+        cached = await redis.get(redis_key)
+        if cached is not None and cached != IDEMPOTENCY_PROCESSING:
+            stored = json.loads(cached)
+            return _replay(fingerprint, stored["fingerprint"], stored["status"], stored["body"])
+        if cached is None:
+            acquired = bool(await redis.set(redis_key, IDEMPOTENCY_PROCESSING, nx=True, px=IDEMPOTENCY_LOCK_TTL_MS))
+        if not acquired:
+            logger.warning("Запрос с ключом идемпотентности пользователя '%s' уже выполняется", user_id)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is already in progress",
+                headers={"Retry-After": "1"}
+            )
+    except RedisError as e:
+        logger.warning("Redis недоступен, проверка ключа идемпотентности только по БД: %s", e)
+
+    record = await _load_record(session, user_id=user_id, key=key)
+    if record is not None:
+        await _cache_record(redis, record)
+        return _replay(fingerprint, record.fingerprint, record.response_status, record.response_body)
+
+    pending = IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        fingerprint=fingerprint,
+        response_status=status.HTTP_200_OK,
+        response_body=response_body
+    )
+    session.info[PENDING_IDEMPOTENCY_KEY] = pending
+    try:
+        await operation()
+    except IntegrityError:
+        record = None
+        try:
+            record = await _load_record(session, user_id=user_id, key=key)
+        finally:
+            # a conflict unrelated to the key must not leave retries locked out until the marker expires
+            if record is None and acquired:
+                await _release(redis, redis_key)
+        if record is None:
+            raise
+        logger.info("Ключ идемпотентности уже сохранен параллельным запросом")
+        await _cache_record(redis, record)
+        return _replay(fingerprint, record.fingerprint, record.response_status, record.response_body)
+    except BaseException:
+        if acquired:
+            await _release(redis, redis_key)
+        raise
+    finally:
+        session.info.pop(PENDING_IDEMPOTENCY_KEY, None)
+
+    await _cache_record(redis, pending)
+    return response_body
+
+@event.listens_for(Session, "before_commit")
+def _add_pending_idempotency_record(session: Session) -> None:
+    record = session.info.get(PENDING_IDEMPOTENCY_KEY)
+    if record is not None and record not in session:
+        session.add(record)
+
+@event.listens_for(Session, "after_commit")
+def _forget_idempotency_record(session: Session) -> None:
+    session.info.pop(PENDING_IDEMPOTENCY_KEY, None)
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import Select, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import logger
+from app.db.models import Transaction
+
+def to_naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def balance_at_query(account_id: int, at: datetime) -> Select:
+    # one backward index probe per side instead of summing the whole history
+    latest_from = (
+        select(Transaction.from_balance_after.label("balance_after"), Transaction.timestamp, Transaction.id)
+        .where(Transaction.from_account_id == account_id, Transaction.timestamp <= at)
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .limit(1)
+    )
+    latest_to = (
+        select(Transaction.to_balance_after.label("balance_after"), Transaction.timestamp, Transaction.id)
+        .where(Transaction.to_account_id == account_id, Transaction.timestamp <= at)
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .limit(1)
+    )
+    latest = union_all(latest_from, latest_to).subquery()
+    return select(latest.c.balance_after).order_by(latest.c.timestamp.desc(), latest.c.id.desc()).limit(1)
+
+async def get_balance_at(session: AsyncSession, account_id: int, at: datetime) -> Decimal:
+    at = to_naive_utc(at)
+    logger.debug("Поиск баланса счета %d на момент %s", account_id, at.isoformat())
+    balance = (await session.execute(balance_at_query(account_id=account_id, at=at))).scalar_one_or_none()
+    return balance if balance is not None else Decimal(0)
@@ -0,0 +1,89 @@
+import asyncio
+from collections import defaultdict
+from typing import List, Sequence
+
+from celery import Task, group
+from celery.canvas import Signature
+from sqlalchemy import Row, delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.celery import celery_app
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import observe_operation
+from app.db.models import OutboxMessage
+
+OUTBOX_BATCH_SIZE = settings.OUTBOX_BATCH_SIZE
+OUTBOX_RELAY_TASK = "app.tasks.outbox_task.relay_outbox"
+PENDING_OUTBOX_KEY = "pending_outbox"
+# messages for these tasks are merged into one call of the batch task per chunk of the given size
+OUTBOX_BATCH_TASKS = {
+    "app.tasks.email_task.send_email": ("app.tasks.email_task.send_emails", settings.SMTP_BATCH_SIZE),
+}
+
+def enqueue_task(session: Session | AsyncSession, task: Task, *args) -> None:
+    logger.debug("Задача '%s' будет отправлена в брокер после коммита", task.name)
+    session.add(OutboxMessage(task=task.name, args=list(args)))
+    session.info[PENDING_OUTBOX_KEY] = True
+
+def claim_outbox_statement(batch_size: int):
+    # SKIP LOCKED lets several relays drain the table in parallel without handing out a message twice
+    claimed = select(OutboxMessage.id).order_by(OutboxMessage.id).limit(batch_size).with_for_update(skip_locked=True)
+    return (
+        delete(OutboxMessage)
+        .where(OutboxMessage.id.in_(claimed.scalar_subquery()))
+        .returning(OutboxMessage.id, OutboxMessage.task, OutboxMessage.args)
+    )
+
+def outbox_signatures(messages: Sequence[Row]) -> List[Signature]:
+    signatures = []
+    batches = defaultdict(list)
+    for message in messages:
+        if message.task in OUTBOX_BATCH_TASKS:
+            batches[message.task].append(message.args)
+        else:
+            signatures.append(celery_app.signature(message.task, args=message.args))
+    for task, args in batches.items():
+        batch_task, batch_size = OUTBOX_BATCH_TASKS[task]
+        signatures.extend(
+            celery_app.signature(batch_task, args=[args[i:i + batch_size]])
+            for i in range(0, len(args), batch_size)
+        )
+    return signatures
+
+async def relay_outbox_service(session: AsyncSession, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    relayed = 0
+    while True:
+        claimed = (await session.execute(claim_outbox_statement(batch_size))).all()
+        if claimed:
+            logger.debug("Отправка %d сообщений outbox в брокер", len(claimed))
+            group(outbox_signatures(claimed)).apply_async()
+        # rows are deleted only once the broker has accepted the whole batch
+        await session.commit()
+        relayed += len(claimed)
+        if len(claimed) < batch_size:
+            break
+    logger.info("Отправлено %d сообщений outbox", relayed)
+    return relayed
+
+def _start_relay() -> None:
+    try:
+        with observe_operation("celery_publish"):
+            celery_app.send_task(OUTBOX_RELAY_TASK)
+    except Exception as e:
+        logger.warning("Не удалось запустить отправку outbox, сообщения будут отправлены по расписанию: %s", e)
+
+@event.listens_for(Session, "after_commit")
+def _kick_outbox_relay(session: Session) -> None:
+    if not session.info.pop(PENDING_OUTBOX_KEY, False):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.run_in_executor(None, _start_relay)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_outbox(session: Session) -> None:
+    session.info.pop(PENDING_OUTBOX_KEY, None)
@@ -1,47 +1,243 @@
+import asyncio
 import json
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Sequence, Tuple
 
-from app.core.redis import get_redis
-from app.api.schemas.banking import TransactionHistory
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.schemas.banking import TransactionHistory, AccountAnalytics
 from app.db.models import Transaction
 
+from app.core.config import settings
 from app.core.logging import logger
 
+HISTORY_CACHE_SIZE = 10
+HISTORY_CACHE_TTL = settings.HISTORY_CACHE_TTL
+HISTORY_LOCK_TTL_MS = 5000
+HISTORY_LOCK_WAIT_ATTEMPTS = 5
+HISTORY_LOCK_WAIT_INTERVAL = 0.02
+ANALYTICS_CACHE_TTL = settings.ANALYTICS_CACHE_TTL
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_FILL_HISTORY_SCRIPT = """
+if (redis.call("get", KEYS[2]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("del", KEYS[1])
+if #ARGV > 2 then
+    redis.call("rpush", KEYS[1], unpack(ARGV, 3))
+    redis.call("expire", KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# a reader that fetched from the DB after the commit may already have filled the window with this transaction
+_PUSH_HISTORY_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 1 then
+    local present = false
+    for _, entry in ipairs(redis.call("lrange", KEYS[1], 0, -1)) do
+        if cjson.decode(entry)["id"] == tonumber(ARGV[3]) then
+            present = true
+            break
+        end
+    end
+    if not present then
+        redis.call("rpush", KEYS[1], ARGV[4])
+        redis.call("ltrim", KEYS[1], -tonumber(ARGV[1]), -1)
+    end
+    redis.call("expire", KEYS[1], ARGV[2])
+end
+redis.call("incr", KEYS[2])
+redis.call("expire", KEYS[2], ARGV[2])
+"""
+
+PENDING_HISTORY_KEY = "pending_history"
+
+_background_tasks: set[asyncio.Task] = set()
+
 def _get_history_key(user_id: int, acc_name: str):
     logger.debug("Получение ключа для кеша транзакций счета '%s'", acc_name)
     return f"user:{user_id}:history:{acc_name}"
 
-def save_transaction(history_transaction: Transaction, acc_name: str):
-    try:
-        logger.info("Сохранение транзакций счета '%s' в кеш", acc_name)
-        history_pydantic = TransactionHistory(
-            description=history_transaction.description,
-            amount=f"{"+" if history_transaction.from_account_id is None else "-"}{history_transaction.amount}"
+def _get_history_lock_key(user_id: int, acc_name: str):
+    return f"lock:{_get_history_key(user_id=user_id, acc_name=acc_name)}"
+
+def _get_history_version_key(user_id: int, acc_name: str):
+    return f"{_get_history_key(user_id=user_id, acc_name=acc_name)}:version"
+
+def _get_analytics_key(account_id: int, version: bytes | None, granularity: str, start: datetime, end: datetime):
+    # the history version changes after every committed transaction, so stale results are simply never read again
+    return f"analytics:{account_id}:{(version or b"0").decode()}:{granularity}:{start.isoformat()}:{end.isoformat()}"
+
+def to_transaction_history(transaction: Transaction, account_id: int) -> TransactionHistory:
+    return TransactionHistory(
+        description=transaction.description,
+        amount=f"{"-" if transaction.from_account_id == account_id else "+"}{transaction.amount:.2f}",
+        id=transaction.id,
+        timestamp=transaction.timestamp
+    )
+
+def queue_transaction_history(
+    session: Session | AsyncSession,
+    redis: Redis,
+    transaction: Transaction,
+    user_id: int,
+    acc_name: str,
+    account_id: int
+) -> None:
+    logger.debug("Транзакция счета '%s' будет добавлена в кеш после коммита", acc_name)
+    session.info.setdefault(PENDING_HISTORY_KEY, []).append((redis, transaction, user_id, acc_name, account_id))
+
+async def push_transaction_history(redis: Redis, entries: Sequence[Tuple[int, str, int, str]]):
+    pipe = redis.pipeline(transaction=True)
+    for user_id, acc_name, transaction_id, payload in entries:
+        pipe.eval(
+            _PUSH_HISTORY_SCRIPT,
+            2,
+            _get_history_key(user_id=user_id, acc_name=acc_name),
+            _get_history_version_key(user_id=user_id, acc_name=acc_name),
+            HISTORY_CACHE_SIZE,
+            HISTORY_CACHE_TTL,
+            transaction_id,
+            payload
         )
-        redis = get_redis()
-        key = _get_history_key(user_id=history_transaction.user_id, acc_name=acc_name)
-        logger.debug("Добавление транзакции счета '%s' в очередь", acc_name)
-        redis.rpush(key, history_pydantic.model_dump_json())
-        redis.ltrim(key, start=-10, end=-1)
-        redis.expire(name=key, time=60*60)
-    except json.JSONDecodeError as e:
-        logger.error("Ошибка сериализации транзакции для счета '%s': %s", acc_name, e)
-
-def check_user_cache_transaction(user_id: int, acc_name: str):
+    try:
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("Не удалось обновить кеш транзакций после коммита: %s", e)
+
+async def invalidate_transaction_history(user_id: int, acc_name: str, redis: Redis):
+    # the version is bumped rather than deleted so that a fill still reading the old account is rejected
+    version_key = _get_history_version_key(user_id=user_id, acc_name=acc_name)
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(_get_history_key(user_id=user_id, acc_name=acc_name))
+    pipe.incr(version_key)
+    pipe.expire(name=version_key, time=HISTORY_CACHE_TTL)
+    try:
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("Не удалось сбросить кеш транзакций счета '%s': %s", acc_name, e)
+
+async def get_history_version(user_id: int, acc_name: str, redis: Redis) -> bytes | None:
+    return await redis.get(_get_history_version_key(user_id=user_id, acc_name=acc_name))
+
+async def save_transactions_bulk(
+    user_id: int,
+    acc_name: str,
+    account_id: int,
+    transactions: Sequence[Transaction],
+    version: bytes | None,
+    redis: Redis
+) -> bool:
+    logger.info("Заполнение кеша транзакций счета '%s' (%d записей)", acc_name, len(transactions))
+    window = [to_transaction_history(t, account_id).model_dump_json() for t in transactions[-HISTORY_CACHE_SIZE:]]
+    saved = await redis.eval(
+        _FILL_HISTORY_SCRIPT,
+        2,
+        _get_history_key(user_id=user_id, acc_name=acc_name),
+        _get_history_version_key(user_id=user_id, acc_name=acc_name),
+        version or b"",
+        HISTORY_CACHE_TTL,
+        *window
+    )
+    if not saved:
+        logger.debug("История счета '%s' изменилась во время чтения из БД, кеш не заполнен", acc_name)
+    return bool(saved)
+
+async def acquire_history_rebuild_lock(user_id: int, acc_name: str, redis: Redis) -> str | None:
+    token = uuid.uuid4().hex
+    key = _get_history_lock_key(user_id=user_id, acc_name=acc_name)
+    if await redis.set(key, token, nx=True, px=HISTORY_LOCK_TTL_MS):
+        logger.debug("Получена блокировка на заполнение кеша счета '%s'", acc_name)
+        return token
+    logger.debug("Кеш счета '%s' уже заполняется другим запросом", acc_name)
+    return None
+
+async def release_history_rebuild_lock(user_id: int, acc_name: str, token: str, redis: Redis):
+    key = _get_history_lock_key(user_id=user_id, acc_name=acc_name)
+    await redis.eval(_RELEASE_LOCK_SCRIPT, 1, key, token)
+
+async def wait_for_transaction_history(user_id: int, acc_name: str, redis: Redis) -> List[TransactionHistory] | None:
+    for _ in range(HISTORY_LOCK_WAIT_ATTEMPTS):
+        await asyncio.sleep(HISTORY_LOCK_WAIT_INTERVAL)
+        history = await get_transaction_history_redis(user_id=user_id, acc_name=acc_name, redis=redis)
+        if history:
+            return history
+    logger.debug("Кеш счета '%s' не появился за время ожидания", acc_name)
+    return None
+
+async def get_account_analytics_redis(
+    account_id: int,
+    version: bytes | None,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    redis: Redis
+) -> AccountAnalytics | None:
+    cached = await redis.get(_get_analytics_key(account_id, version, granularity, start, end))
+    if cached is None:
+        logger.debug("Аналитика счета %d не найдена в кеше", account_id)
+        return None
+    return AccountAnalytics.model_validate_json(cached)
+
+async def save_account_analytics(
+    account_id: int,
+    version: bytes | None,
+    analytics: AccountAnalytics,
+    redis: Redis
+) -> None:
+    key = _get_analytics_key(account_id, version, analytics.granularity, analytics.start, analytics.end)
+    await redis.set(key, analytics.model_dump_json(), ex=ANALYTICS_CACHE_TTL)
+
+async def check_user_cache_transaction(user_id: int, acc_name: str, redis: Redis):
     logger.debug("Проверка кеша транзакций счета '%s' пользователя", acc_name)
-    redis = get_redis()
     key = _get_history_key(user_id=user_id, acc_name=acc_name)
-    exists = redis.exists(key)
+    exists = await redis.exists(key)
     logger.debug("Кеш для счета '%s' %s", acc_name, "существует" if exists else "не найден")
     return exists
 
-def get_transaction_history_redis(user_id: int, acc_name: str):
+async def get_transaction_history_redis(user_id: int, acc_name: str, redis: Redis):
     logger.info("Получение кеша транзакций со счета '%s'", acc_name)
     history = []
-    redis = get_redis()
     key = _get_history_key(user_id=user_id, acc_name=acc_name)
-    cache = redis.lrange(name=key, start=0, end=-1)
+    cache = await redis.lrange(name=key, start=0, end=-1)
     logger.debug("Формирование списка последних транзакций счета '%s'", acc_name)
     for h in cache:
         history.append(TransactionHistory(**json.loads(h.decode())))
     logger.info("Возврат %d транзакций из кеша для счета '%s' пользователю", len(history), acc_name)
     return history
+
+@event.listens_for(Session, "after_commit")
+def _push_pending_history(session: Session) -> None:
+    pending = session.info.pop(PENDING_HISTORY_KEY, None)
+    if not pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    entries = defaultdict(list)
+    clients = {}
+    for redis, transaction, user_id, acc_name, account_id in pending:
+        clients[id(redis)] = redis
+        entries[id(redis)].append((user_id, acc_name, transaction.id, to_transaction_history(transaction, account_id).model_dump_json()))
+    for client_id, client_entries in entries.items():
+        task = loop.create_task(push_transaction_history(clients[client_id], client_entries))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_history(session: Session) -> None:
+    session.info.pop(PENDING_HISTORY_KEY, None)
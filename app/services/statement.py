@@ -0,0 +1,147 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, List
+
+from fastapi import HTTPException, status
+from sqlalchemy import Row, Select, case, select
+
+from app.core.logging import logger
+from app.db.database import async_session_maker
+from app.db.models import Transaction
+from app.services.ledger import to_naive_utc
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+STATEMENT_BATCH_SIZE = 1000
+STATEMENT_COLUMNS = ["id", "timestamp", "description", "amount", "balance_after"]
+STATEMENT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+def statement_query(account_id: int, start: datetime | None, end: datetime | None) -> Select:
+    outgoing = Transaction.from_account_id == account_id
+    statement_query = (
+        select(
+            Transaction.id,
+            Transaction.timestamp,
+            Transaction.description,
+            case((outgoing, -Transaction.amount), else_=Transaction.amount).label("amount"),
+            case((outgoing, Transaction.from_balance_after), else_=Transaction.to_balance_after).label("balance_after")
+        )
+        .where(outgoing | (Transaction.to_account_id == account_id))
+        .order_by(Transaction.timestamp, Transaction.id)
+    )
+    if start is not None:
+        statement_query = statement_query.where(Transaction.timestamp >= start)
+    if end is not None:
+        statement_query = statement_query.where(Transaction.timestamp < end)
+    return statement_query
+
+async def _statement_partitions(
+    account_id: int,
+    start: datetime | None,
+    end: datetime | None,
+    batch_size: int
+) -> AsyncIterator[List[Row]]:
+    async with async_session_maker() as session:
+        # yield_per makes asyncpg fetch through a server-side cursor, one batch at a time
+        rows = await session.stream(statement_query(account_id, start, end).execution_options(yield_per=batch_size))
+        async for partition in rows.partitions():
+            yield partition
+
+async def _csv_statement(partitions: AsyncIterator[List[Row]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STATEMENT_COLUMNS)
+    async for partition in partitions:
+        writer.writerows((r.id, r.timestamp.isoformat(), r.description, r.amount, r.balance_after) for r in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _ChunkSink:
+    # write-only file object for pyarrow; tell() keeps counting so the parquet footer offsets stay valid after draining
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def _arrow_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("amount", pa.decimal128(18, 2)),
+        ("balance_after", pa.decimal128(18, 2)),
+    ])
+
+async def _columnar_statement(partitions: AsyncIterator[List[Row]], output_format: str) -> AsyncIterator[bytes]:
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if output_format == "parquet" else pa.ipc.new_stream(sink, schema)
+    try:
+        async for partition in partitions:
+            writer.write_batch(pa.record_batch(
+                [pa.array([getattr(r, column) for r in partition], type=schema.field(column).type) for column in STATEMENT_COLUMNS],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def stream_statement_service(
+    account_id: int,
+    output_format: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    batch_size: int = STATEMENT_BATCH_SIZE
+) -> AsyncIterator[str | bytes]:
+    if output_format != "csv" and pa is None:
+        logger.warning("Запрошена выписка в формате '%s', но pyarrow не установлен", output_format)
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Parquet and Arrow statements are not available on this server"
+        )
+    start = to_naive_utc(start) if start is not None else None
+    end = to_naive_utc(end) if end is not None else None
+    if start is not None and end is not None and start >= end:
+        logger.warning("Некорректный период выписки: %s - %s", start.isoformat(), end.isoformat())
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Statement start must be earlier than end"
+        )
+
+    logger.info("Потоковая выписка по счету %d в формате '%s'", account_id, output_format)
+    partitions = _statement_partitions(account_id, start, end, batch_size)
+    if output_format == "csv":
+        return _csv_statement(partitions)
+    return _columnar_statement(partitions, output_format)
@@ -45,7 +45,6 @@ def _is_valid_email(email: str):
 
 async def sign_up_user_services(user_data: SignUp, session: AsyncSession):
     logger.info("Начало регистрации пользователя '%s'", user_data.username)
-    hashed_password = get_hashed_password(user_data.password)
     user_query = await session.execute(select(User).where(or_(
         User.username == user_data.username,
         User.email == user_data.email
@@ -71,6 +70,7 @@ async def sign_up_user_services(user_data: SignUp, session: AsyncSession):
             detail="Invalid email"
         )
 
+    hashed_password = await get_hashed_password(user_data.password)
     user = User(
         username=user_data.username,
         hashed_password=hashed_password,
@@ -81,6 +81,5 @@ async def sign_up_user_services(user_data: SignUp, session: AsyncSession):
     logger.info("Сохранение нового пользователя '%s' в БД", user_data.username)
     new_account = Account(user=user)
     session.add_all([user, new_account])
-    await session.commit()
     logger.debug("Отправка подтверждения регистрации по электронной почте '%s'", user_data.email)
     await send_email_verification_code(user=user, session=session)
\ No newline at end of file
@@ -1,16 +1,15 @@
-import re
 import smtplib
 from email.mime.text import MIMEText
-from fastapi import HTTPException, status
+from typing import List
+
+from celery.signals import worker_process_shutdown
 
 from app.core.celery import celery_app
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.smtp import get_smtp_pool, close_smtp_pool
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def send_email(self, to_email: str, verification_code: int):
-    logger.info("Формирование сообщения с кодом верификации для %s", to_email)
-
+def _verification_message(to_email: str, verification_code: int) -> str:
     email_text = f"""Для подтвреждения авторизации введите код: {verification_code}
 
 Если вы не запрашивали этот код, проигнорируйте это письмо."""
@@ -18,15 +17,16 @@ def send_email(self, to_email: str, verification_code: int):
     msg["Subject"] = "Код подтверждения для авторизации"
     msg["From"] = settings.EMAIL_HOST
     msg["To"] = to_email
+    return msg.as_string()
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
+def send_email(self, to_email: str, verification_code: int):
+    logger.info("Формирование сообщения с кодом верификации для %s", to_email)
+    message = _verification_message(to_email, verification_code)
 
     try:
-        logger.debug("Подключение к SMTP серверу Яндекс: %s:%s", "smtp.yandex.ru", 587)
-        with smtplib.SMTP("smtp.yandex.ru", 587) as server:
-            server.starttls()
-            logger.debug("Аутентификация на SMTP сервере")
-            server.login(settings.EMAIL_HOST, settings.EMAIL_PASSWORD)
-            logger.debug("Отправка письма с кодом верификации на %s", to_email)
-            server.sendmail(settings.EMAIL_HOST, to_email, msg.as_string())
+        logger.debug("Отправка письма с кодом верификации на %s", to_email)
+        get_smtp_pool().send(settings.EMAIL_HOST, to_email, message)
         logger.info("Успешная отправка сообщения с кодом верификации на почту '%s'", to_email)
         return "Message successfully sent!"
     except smtplib.SMTPAuthenticationError as exc:
@@ -38,3 +38,32 @@ def send_email(self, to_email: str, verification_code: int):
     except Exception as exc:
         logger.warning("Неожиданная ошибка при отправке сообщения на %s: %s. Повторная попытка", to_email, exc)
         raise self.retry(exc=exc)
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
+def send_emails(self, messages: List[list]):
+    logger.info("Пакетная отправка %d писем с кодом верификации", len(messages))
+    pool = get_smtp_pool()
+    failed = []
+    error = None
+    for to_email, verification_code in messages:
+        try:
+            pool.send(settings.EMAIL_HOST, to_email, _verification_message(to_email, verification_code))
+        except smtplib.SMTPRecipientsRefused:
+            logger.error("SMTP сервер отклонил адрес '%s', письмо не будет отправлено повторно", to_email)
+        except (smtplib.SMTPException, OSError) as exc:
+            logger.warning("Ошибка SMTP при отправке сообщения на %s: %s", to_email, exc)
+            failed.append([to_email, verification_code])
+            error = exc
+        except Exception as exc:
+            logger.warning("Неожиданная ошибка при отправке сообщения на %s: %s", to_email, exc)
+            failed.append([to_email, verification_code])
+            error = exc
+    if failed:
+        logger.warning("Не отправлено %d из %d писем. Повторная попытка", len(failed), len(messages))
+        raise self.retry(exc=error, args=[failed])
+    logger.info("Успешная пакетная отправка %d писем", len(messages))
+    return len(messages)
+
+@worker_process_shutdown.connect
+def _close_smtp_pool(**kwargs):
+    close_smtp_pool()
@@ -0,0 +1,18 @@
+import asyncio
+
+from app.core.celery import celery_app
+from app.core.logging import logger
+from app.db.database import task_session
+from app.services.outbox import relay_outbox_service
+
+async def _relay() -> int:
+    async with task_session() as session:
+        return await relay_outbox_service(session)
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=10)
+def relay_outbox(self):
+    try:
+        return asyncio.run(_relay())
+    except Exception as exc:
+        logger.warning("Ошибка при отправке сообщений outbox: %s. Повторная попытка", exc)
+        raise self.retry(exc=exc)
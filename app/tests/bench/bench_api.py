@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+from app.tests.bench.harness import BenchUser, LatencyRecorder, git_revision, login, running_app, seed_users
+
+DEFAULT_MIX = "login=1,deposit=3,transfer=3,history=5,accounts=2"
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+        weights[name] = int(weight)
+    return weights
+
+async def op_login(client: httpx.AsyncClient, user: BenchUser, users: List[BenchUser], rng: random.Random) -> httpx.Response:
+    return await login(client, user)
+
+async def op_deposit(client: httpx.AsyncClient, user: BenchUser, users: List[BenchUser], rng: random.Random) -> httpx.Response:
+    return await client.post(
+        "/banking/change/deposit",
+        json={"account_name": user.account_name, "amount": rng.randint(1, 100)},
+        headers=user.headers
+    )
+
+async def op_transfer(client: httpx.AsyncClient, user: BenchUser, users: List[BenchUser], rng: random.Random) -> httpx.Response:
+    recipient = rng.choice([u for u in users if u is not user] or users)
+    return await client.post(
+        "/banking/change/transfer",
+        json={
+            "account_name": user.account_name,
+            "amount": rng.randint(1, 10),
+            "transfer_username": recipient.username,
+            "transfer_account_name": recipient.account_name
+        },
+        headers=user.headers
+    )
+
+async def op_history(client: httpx.AsyncClient, user: BenchUser, users: List[BenchUser], rng: random.Random) -> httpx.Response:
+    return await client.get(f"/banking/transaction/history/{user.account_name}", headers=user.headers)
+
+async def op_accounts(client: httpx.AsyncClient, user: BenchUser, users: List[BenchUser], rng: random.Random) -> httpx.Response:
+    return await client.get("/banking/accounts", headers=user.headers)
+
+OPERATIONS = {
+    "login": op_login,
+    "deposit": op_deposit,
+    "transfer": op_transfer,
+    "history": op_history,
+    "accounts": op_accounts,
+}
+
+async def run(args: argparse.Namespace) -> dict:
+    async with running_app() as client:
+        users = await seed_users(args.users, balance=args.balance)
+        await asyncio.gather(*(login(client, u) for u in users))
+        names = list(args.mix)
+        weights = [args.mix[name] for name in names]
+
+        warmup_deadline = time.perf_counter() + args.warmup
+        while time.perf_counter() < warmup_deadline:
+            await op_history(client, users[0], users, random.Random(args.seed))
+
+        recorder = LatencyRecorder()
+        deadline = time.perf_counter() + args.duration
+
+        async def worker(worker_id: int):
+            rng = random.Random(args.seed + worker_id)
+            while time.perf_counter() < deadline:
+                user = rng.choice(users)
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await OPERATIONS[name](client, user, users, rng)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                recorder.record(name, time.perf_counter() - start, ok)
+
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        recorder.stop()
+
+    return {
+        "revision": git_revision(),
+        "config": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        **recorder.report(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed-workload benchmark of the banking API running in-process against the configured Postgres and Redis")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--balance", type=float, default=1_000_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
@@ -0,0 +1,46 @@
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.core.jwt_keys import KeyRing
+
+def _key_ring(algorithm: str) -> tuple[KeyRing, str | bytes]:
+    if algorithm.startswith("HS"):
+        return KeyRing(algorithm=algorithm, secret="bench-secret-key-with-enough-bytes"), "bench-secret-key-with-enough-bytes"
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048) if algorithm.startswith("RS") else ed25519.Ed25519PrivateKey.generate()
+    private_pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return KeyRing(algorithm=algorithm, private_key_pem=private_pem), public_pem
+
+def _per_call_us(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return round((time.perf_counter() - start) / iterations * 1_000_000, 1)
+
+def main(algorithms: list[str], iterations: int) -> None:
+    payload = {"sub": "bench_user", "exp": datetime.now(timezone.utc) + timedelta(hours=1)}
+    results = {}
+    for algorithm in algorithms:
+        key_ring, verification_pem = _key_ring(algorithm)
+        token = key_ring.encode(payload)
+        results[algorithm] = {
+            "sign_us": _per_call_us(lambda: key_ring.encode(payload), iterations),
+            # what a verifier does when it hands PyJWT the PEM/secret and lets it parse the key on every call
+            "verify_pem_us": _per_call_us(lambda: jwt.decode(token, key=verification_pem, algorithms=[algorithm]), iterations),
+            "verify_cached_key_us": _per_call_us(lambda: key_ring.decode(token), iterations),
+            "token_bytes": len(token)
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call JWT signing and verification cost by algorithm")
+    parser.add_argument("--algorithms", default="HS256,RS256,EdDSA")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.algorithms.split(","), args.iterations)
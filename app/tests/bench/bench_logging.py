@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.core.logging import setup_logging, stop_logging
+from app.tests.bench.harness import BenchUser, login, running_app, seed_users
+
+MODES = {
+    "sync_debug": {"level": "DEBUG", "debug_sample_rate": 1.0, "use_queue": False},
+    "queue_debug_sampled": {"level": "DEBUG", "use_queue": True},
+    "queue_info": {"level": "INFO", "use_queue": True},
+}
+
+async def run_workload(client: httpx.AsyncClient, user: BenchUser, requests: int, concurrency: int) -> dict:
+    calls = [
+        lambda: client.post("/banking/change/deposit", json={"account_name": user.account_name, "amount": 1}, headers=user.headers),
+        lambda: client.get(f"/banking/transaction/history/{user.account_name}", headers=user.headers),
+        lambda: client.get("/banking/accounts", headers=user.headers),
+    ]
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            response = await calls[i % len(calls)]()
+        if response.status_code >= 400:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return {"requests": requests, "errors": errors, "seconds": time.perf_counter() - start}
+
+async def main(requests: int, concurrency: int, rounds: int, log_file: str | None) -> None:
+    totals = {mode: {"requests": 0, "errors": 0, "seconds": 0.0} for mode in MODES}
+    async with running_app() as client:
+        user, = await seed_users(1, balance=0, prefix="bench_logging")
+        await login(client, user)
+        await run_workload(client, user, requests=min(requests, 50), concurrency=concurrency)
+        # modes are interleaved so that table growth between rounds does not favour any of them
+        for _ in range(rounds):
+            for mode, options in MODES.items():
+                setup_logging(log_file=log_file, **options)
+                result = await run_workload(client, user, requests=requests // rounds, concurrency=concurrency)
+                for key in totals[mode]:
+                    totals[mode][key] += result[key]
+    stop_logging()
+    results = {
+        mode: {**total, "seconds": round(total["seconds"], 3), "rps": round(total["requests"] / total["seconds"], 1)}
+        for mode, total in totals.items()
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RPS of the banking endpoints with the synchronous and the queue-based logging setup")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--log-file", default="/tmp/bench_logging.log")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.rounds, args.log_file))
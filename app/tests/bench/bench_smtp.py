@@ -0,0 +1,53 @@
+import argparse
+import json
+import smtplib
+import time
+
+from app.core.smtp import SMTPPool
+from app.tasks.email_task import _verification_message
+
+SENDER = "bench@example.com"
+
+def connect_per_message(host: str, port: int, messages: int) -> None:
+    for i in range(messages):
+        with smtplib.SMTP(host, port, timeout=10) as server:
+            server.sendmail(SENDER, f"user_{i}@example.com", _verification_message(f"user_{i}@example.com", 123456))
+
+def pooled(host: str, port: int, messages: int) -> None:
+    pool = SMTPPool(host=host, port=port, use_tls=False, username=None, password=None, size=1, timeout=10, idle_timeout=30)
+    for i in range(messages):
+        pool.send(SENDER, f"user_{i}@example.com", _verification_message(f"user_{i}@example.com", 123456))
+    pool.close()
+
+MODES = {"connect_per_message": connect_per_message, "pooled": pooled}
+
+def main(host: str | None, port: int, messages: int) -> None:
+    controller = None
+    if host is None:
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.handlers import Sink
+        except ImportError:
+            raise SystemExit("aiosmtpd is required to run a local SMTP stand-in (pip install aiosmtpd), or pass --host")
+        controller = Controller(Sink(), hostname="127.0.0.1", port=port)
+        controller.start()
+        host = "127.0.0.1"
+    try:
+        results = {}
+        for mode, send in MODES.items():
+            start = time.perf_counter()
+            send(host, port, messages)
+            seconds = time.perf_counter() - start
+            results[mode] = {"messages": messages, "seconds": round(seconds, 3), "messages_per_second": round(messages / seconds, 1)}
+    finally:
+        if controller is not None:
+            controller.stop()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of one SMTP session per message against a pooled session")
+    parser.add_argument("--host", help="SMTP server to use; an in-process aiosmtpd sink is started when omitted")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+    main(args.host, args.port, args.messages)
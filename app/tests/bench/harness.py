@@ -0,0 +1,119 @@
+import math
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List
+
+import httpx
+from sqlalchemy import select
+
+from main import app
+from app.core.rate_limit import rate_limiters
+from app.core.security import get_hashed_password
+from app.db.database import async_session_maker
+from app.db.models import User, Account
+
+BENCH_PASSWORD = "bench_password"
+
+@dataclass
+class BenchUser:
+    username: str
+    account_name: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+def bench_user(i: int, prefix: str = "bench") -> BenchUser:
+    return BenchUser(username=f"{prefix}_{i}", account_name=f"{prefix}_{i}_main")
+
+async def seed_users(count: int, balance: float, prefix: str = "bench") -> List[BenchUser]:
+    users = [bench_user(i, prefix) for i in range(count)]
+    async with async_session_maker() as session:
+        existing = set((await session.execute(
+            select(User.username).where(User.username.in_([u.username for u in users]))
+        )).scalars().all())
+        hashed_password = await get_hashed_password(BENCH_PASSWORD)
+        for u in users:
+            if u.username in existing:
+                continue
+            user = User(
+                first_name="Bench",
+                last_name="User",
+                username=u.username,
+                hashed_password=hashed_password,
+                email=f"{u.username}@example.com",
+                is_email_verified=True
+            )
+            session.add_all([user, Account(name=u.account_name, user=user, balance=balance)])
+        await session.commit()
+    return users
+
+@asynccontextmanager
+async def running_app(rate_limited: bool = False) -> AsyncIterator[httpx.AsyncClient]:
+    # a handful of bench users would otherwise hit the per-user limits within seconds and measure 429s
+    enabled = {name: limiter.enabled for name, limiter in rate_limiters.items()}
+    for limiter in rate_limiters.values():
+        limiter.enabled = limiter.enabled and rate_limited
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+                yield client
+    finally:
+        for name, limiter in rate_limiters.items():
+            limiter.enabled = enabled[name]
+
+async def login(client: httpx.AsyncClient, user: BenchUser) -> httpx.Response:
+    response = await client.post("/users/login", data={"username": user.username, "password": BENCH_PASSWORD})
+    if response.status_code == 200:
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return response
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.errors.setdefault(endpoint, 0)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    @staticmethod
+    def _summary(latencies: List[float], errors: int, elapsed: float) -> dict:
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+
+    def report(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        all_latencies = [s for values in self.latencies.values() for s in values]
+        return {
+            "seconds": round(elapsed, 3),
+            "total": self._summary(all_latencies, sum(self.errors.values()), elapsed),
+            "endpoints": {
+                endpoint: self._summary(values, self.errors[endpoint], elapsed)
+                for endpoint, values in sorted(self.latencies.items())
+            },
+        }
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,50 @@
+import os
+
+import pytest_asyncio
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.models import Base
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "..", "alembic.ini")
+
+def _upgrade_head(connection) -> None:
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+async def _reset_schema(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+
+@pytest_asyncio.fixture
+async def db_engine():
+    engine = create_async_engine(os.environ["TEST_DATABASE_URL"], pool_size=20, max_overflow=20)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+@pytest_asyncio.fixture
+async def session_maker(db_engine):
+    return async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+@pytest_asyncio.fixture
+async def migrated_engine():
+    # the schema the migrations build, indexes included, rather than the ORM metadata
+    engine = create_async_engine(os.environ["TEST_DATABASE_URL"])
+    await _reset_schema(engine)
+    # no outer transaction: some revisions build indexes concurrently in autocommit blocks
+    async with engine.connect() as conn:
+        await conn.run_sync(_upgrade_head)
+        await conn.commit()
+    yield engine
+    await _reset_schema(engine)
+    await engine.dispose()
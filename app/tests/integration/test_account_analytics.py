@@ -0,0 +1,55 @@
+import os
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.db.models import User, Account, Transaction
+from app.services.analytics import get_account_analytics_service
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("TEST_DATABASE_URL") is None,
+    reason="TEST_DATABASE_URL is not set (postgresql+asyncpg://... of a disposable database)"
+)
+
+@pytest.mark.asyncio
+async def test_account_analytics_buckets(session_maker):
+    async with session_maker() as session:
+        user = User(
+            first_name="Analytics",
+            last_name="Test",
+            username="analytics",
+            hashed_password="hashed_password",
+            email="analytics@example.com",
+            is_email_verified=True
+        )
+        main, savings = Account(name="main", user=user), Account(name="savings", user=user)
+        session.add_all([user, main, savings])
+        await session.flush()
+        session.add_all([
+            Transaction(user_id=user.id, from_account_id=None, to_account_id=main.id, amount=Decimal("100.00"), timestamp=datetime(2025, 1, 1, 10), description="deposit"),
+            Transaction(user_id=user.id, from_account_id=None, to_account_id=main.id, amount=Decimal("0.10"), timestamp=datetime(2025, 1, 1, 11), description="deposit"),
+            Transaction(user_id=user.id, from_account_id=main.id, to_account_id=savings.id, amount=Decimal("30.25"), timestamp=datetime(2025, 1, 3, 9), description="transfer"),
+            Transaction(user_id=user.id, from_account_id=main.id, to_account_id=savings.id, amount=Decimal("5.00"), timestamp=datetime(2025, 2, 1), description="transfer"),
+        ])
+        await session.commit()
+        user_id = user.id
+
+    redis = AsyncMock(get=AsyncMock(return_value=None))
+    async with session_maker() as session:
+        daily = await get_account_analytics_service(
+            account_name="main", start=datetime(2025, 1, 1), end=datetime(2025, 2, 1), granularity="day",
+            session=session, user_id=user_id, redis=redis
+        )
+        monthly = await get_account_analytics_service(
+            account_name="main", start=datetime(2025, 1, 1), end=datetime(2025, 3, 1), granularity="month",
+            session=session, user_id=user_id, redis=redis
+        )
+
+    assert [(b.period, b.inflow, b.inflow_count, b.outflow, b.outflow_count) for b in daily.buckets] == [
+        (datetime(2025, 1, 1), Decimal("100.10"), 2, Decimal(0), 0),
+        (datetime(2025, 1, 3), Decimal(0), 0, Decimal("30.25"), 1)
+    ]
+    assert [(b.period, b.outflow) for b in monthly.buckets] == [(datetime(2025, 1, 1), Decimal("30.25")), (datetime(2025, 2, 1), Decimal("5.00"))]
+    assert (monthly.inflow, monthly.outflow, monthly.outflow_count) == (Decimal("100.10"), Decimal("35.25"), 2)
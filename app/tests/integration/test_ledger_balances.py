@@ -0,0 +1,57 @@
+import os
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select, update
+
+from app.db.models import User, Account, Transaction
+from app.services.banking import deposit_account_balance_service, transfer_money_service
+from app.services.ledger import get_balance_at
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("TEST_DATABASE_URL") is None,
+    reason="TEST_DATABASE_URL is not set (postgresql+asyncpg://... of a disposable database)"
+)
+
+@pytest.mark.asyncio
+async def test_balance_at(session_maker):
+    async with session_maker() as session:
+        user = User(
+            first_name="Ledger",
+            last_name="Test",
+            username="ledger",
+            hashed_password="hashed_password",
+            email="ledger@example.com",
+            is_email_verified=True
+        )
+        session.add_all([user, Account(name="main", user=user), Account(name="savings", user=user)])
+        await session.commit()
+        user_id = user.id
+
+    for amount in ("100.00", "50.50"):
+        async with session_maker() as session:
+            await deposit_account_balance_service(account_name="main", amount=Decimal(amount), session=session, user_id=user_id, redis=AsyncMock())
+    async with session_maker() as session:
+        await transfer_money_service(
+            account_name="main",
+            amount=Decimal("30.25"),
+            session=session,
+            user_id=user_id,
+            transfer_account_name="savings",
+            redis=AsyncMock()
+        )
+
+    async with session_maker() as session:
+        transactions = (await session.execute(select(Transaction).order_by(Transaction.id))).scalars().all()
+        for i, t in enumerate(transactions):
+            await session.execute(update(Transaction).where(Transaction.id == t.id).values(timestamp=datetime(2025, 1, 1, 10 + i)))
+        await session.commit()
+        main_id, savings_id = transactions[0].to_account_id, transactions[2].to_account_id
+
+        assert await get_balance_at(session, account_id=main_id, at=datetime(2025, 1, 1, 9)) == Decimal(0)
+        assert await get_balance_at(session, account_id=main_id, at=datetime(2025, 1, 1, 11, 30)) == Decimal("150.50")
+        assert await get_balance_at(session, account_id=main_id, at=datetime(2025, 1, 1, 12)) == Decimal("120.25")
+        assert await get_balance_at(session, account_id=savings_id, at=datetime(2025, 1, 2)) == Decimal("30.25")
+
@@ -0,0 +1,39 @@
+import asyncio
+import os
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db.models import OutboxMessage
+from app.services.outbox import relay_outbox_service
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("TEST_DATABASE_URL") is None,
+    reason="TEST_DATABASE_URL is not set (postgresql+asyncpg://... of a disposable database)"
+)
+
+MESSAGES = 1000
+
+@pytest.mark.asyncio
+async def test_parallel_relays_publish_every_message_once(session_maker):
+    async with session_maker() as session:
+        session.add_all([OutboxMessage(task="app.tasks.email_task.send_email", args=[f"user_{i}@example.com", i]) for i in range(MESSAGES)])
+        await session.commit()
+
+    published = []
+
+    async def relay() -> int:
+        async with session_maker() as session:
+            return await relay_outbox_service(session, batch_size=50)
+
+    with patch("app.services.outbox.group") as mock_group:
+        mock_group.side_effect = lambda signatures: published.extend(args[1] for s in signatures for args in s.args[0]) or mock_group.return_value
+        relayed = await asyncio.gather(*(relay() for _ in range(4)))
+
+    async with session_maker() as session:
+        remaining = (await session.execute(select(func.count(OutboxMessage.id)))).scalar_one()
+
+    assert sum(relayed) == MESSAGES
+    assert sorted(published) == list(range(MESSAGES))
+    assert remaining == 0
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import User, Account
+from app.services.banking import _history_query, transfer_accounts_query
+from app.services.ledger import balance_at_query
+from app.services.statement import statement_query
+from app.services.analytics import analytics_query
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("TEST_DATABASE_URL") is None,
+    reason="TEST_DATABASE_URL is not set (postgresql+asyncpg://... of a disposable database)"
+)
+
+USERS = 10_000
+ACCOUNTS_PER_USER = 2
+TRANSACTIONS = 300_000
+
+# large enough that the planner prefers a sequential scan whenever no index fits
+SEED_STATEMENTS = [
+    f"""
+    INSERT INTO users (id, first_name, last_name, username, hashed_password, email, is_email_verified)
+    SELECT i, 'Plan', 'Test', 'plan_' || i, 'hashed_password', 'plan_' || i || '@example.com', true
+    FROM generate_series(1, {USERS}) AS i
+    """,
+    f"""
+    INSERT INTO accounts (id, name, user_id, balance, created_at)
+    SELECT (u - 1) * {ACCOUNTS_PER_USER} + n, 'account_' || n, u, 1000, '2025-01-01'
+    FROM generate_series(1, {USERS}) AS u, generate_series(1, {ACCOUNTS_PER_USER}) AS n
+    """,
+    f"""
+    INSERT INTO transactions (user_id, from_account_id, to_account_id, amount, from_balance_after, to_balance_after, timestamp, description)
+    SELECT ((i * 7919) % {USERS * ACCOUNTS_PER_USER}) / {ACCOUNTS_PER_USER} + 1,
+           CASE WHEN i % 3 = 0 THEN NULL ELSE (i * 7919) % {USERS * ACCOUNTS_PER_USER} + 1 END,
+           (i * 104729) % {USERS * ACCOUNTS_PER_USER} + 1,
+           1, 1000, 1000,
+           timestamp '2025-01-01' + (i * interval '100 seconds'),
+           'Plan test'
+    FROM generate_series(1::bigint, {TRANSACTIONS}) AS i
+    """,
+    "SELECT setval('users_id_seq', (SELECT max(id) FROM users))",
+    "SELECT setval('accounts_id_seq', (SELECT max(id) FROM accounts))",
+]
+
+async def _explain(session, statement) -> str:
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = await session.execute(text(f"EXPLAIN {sql}"))
+    return "\n".join(row[0] for row in plan)
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes(migrated_engine):
+    session_maker = async_sessionmaker(migrated_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        for statement in SEED_STATEMENTS:
+            await session.execute(text(statement))
+        await session.commit()
+        await session.execute(text("ANALYZE"))
+
+    queries = {
+        "history latest page": _history_query(account_id=1, limit=10),
+        "history before cursor": _history_query(account_id=1, limit=10, before=(datetime(2025, 6, 1), 150_000)),
+        "history after cursor": _history_query(account_id=1, limit=10, after=(datetime(2025, 6, 1), 150_000)),
+        "balance at moment": balance_at_query(account_id=1, at=datetime(2025, 6, 1)),
+        "statement period": statement_query(account_id=1, start=datetime(2025, 3, 1), end=datetime(2025, 4, 1)),
+        "daily analytics": analytics_query(account_id=1, start=datetime(2025, 3, 1), end=datetime(2025, 4, 1), granularity="day"),
+        "transfer accounts": transfer_accounts_query(1, "account_1", "account_1", "plan_2"),
+        "account by name": select(Account).where(Account.name == "account_1", Account.user_id == 1),
+        "accounts of user": select(Account).where(Account.user_id == 1),
+        "user by email": select(User).where(User.email == "plan_1@example.com"),
+        "user by username": select(User).where(User.username == "plan_1"),
+    }
+
+    async with session_maker() as session:
+        for name, statement in queries.items():
+            plan = await _explain(session, statement)
+            assert "Seq Scan" not in plan, f"{name} fell back to a sequential scan:\n{plan}"
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from app.db.models import User, Account, Transaction
+from app.api.schemas.banking import TransferDataBalance
+from app.services.banking import transfer_money_service, deposit_account_balance_service, batch_transfer_service
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("TEST_DATABASE_URL") is None,
+    reason="TEST_DATABASE_URL is not set (postgresql+asyncpg://... of a disposable database)"
+)
+
+HOT_BALANCE = Decimal("1000.00")
+TRANSFER_AMOUNT = Decimal("30.00")
+RECIPIENTS = 10
+TRANSFERS = int(os.getenv("STRESS_TRANSFERS", "200"))
+
+async def _seed(session_maker):
+    async with session_maker() as session:
+        users = [
+            User(
+                first_name="Stress",
+                last_name="Test",
+                username=f"stress_{i}",
+                hashed_password="hashed_password",
+                email=f"stress_{i}@example.com",
+                is_email_verified=True
+            )
+            for i in range(RECIPIENTS + 1)
+        ]
+        accounts = [
+            Account(name=f"account_{i}", user=user, balance=HOT_BALANCE if i == 0 else 0)
+            for i, user in enumerate(users)
+        ]
+        session.add_all([*users, *accounts])
+        await session.commit()
+        return [user.id for user in users]
+
+async def _assert_ledger_consistent(session_maker):
+    async with session_maker() as session:
+        accounts = (await session.execute(select(Account.id, Account.balance))).all()
+        transactions = (await session.execute(select(Transaction).order_by(Transaction.timestamp, Transaction.id))).scalars().all()
+
+    running = {account_id: None for account_id, _ in accounts}
+    for t in transactions:
+        if t.from_account_id is not None:
+            if running[t.from_account_id] is not None:
+                assert t.from_balance_after == running[t.from_account_id] - t.amount
+            running[t.from_account_id] = t.from_balance_after
+        if running[t.to_account_id] is not None and t.to_account_id != t.from_account_id:
+            assert t.to_balance_after == running[t.to_account_id] + t.amount
+        running[t.to_account_id] = t.to_balance_after
+    for account_id, balance in accounts:
+        assert running[account_id] in (None, balance)
+
+async def _transfer(session_maker, user_id: int, account_name: str, to_username: str, to_account_name: str) -> bool:
+    async with session_maker() as session:
+        try:
+            await transfer_money_service(
+                account_name=account_name,
+                amount=TRANSFER_AMOUNT,
+                session=session,
+                user_id=user_id,
+                transfer_account_name=to_account_name,
+                transfer_username=to_username,
+                redis=AsyncMock()
+            )
+            return True
+        except HTTPException:
+            return False
+
+@pytest.mark.asyncio
+async def test_hot_account_is_never_overdrawn(session_maker):
+    user_ids = await _seed(session_maker)
+    hot_user_id = user_ids[0]
+
+    jobs = []
+    for i in range(TRANSFERS):
+        recipient = i % RECIPIENTS + 1
+        if i % 4 == 3:
+            jobs.append(_transfer(session_maker, user_ids[recipient], f"account_{recipient}", "stress_0", "account_0"))
+        else:
+            jobs.append(_transfer(session_maker, hot_user_id, "account_0", f"stress_{recipient}", f"account_{recipient}"))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(jobs)} transfers in {elapsed:.2f}s ({len(jobs) / elapsed:.0f} transfers/s), {sum(results)} succeeded")
+
+    async with session_maker() as session:
+        balances = (await session.execute(select(Account.name, Account.balance))).all()
+        transaction_count = (await session.execute(select(func.count(Transaction.id)))).scalar_one()
+
+    assert all(balance >= 0 for _, balance in balances)
+    assert sum(balance for _, balance in balances) == HOT_BALANCE
+    assert transaction_count == sum(results)
+    await _assert_ledger_consistent(session_maker)
+
+@pytest.mark.asyncio
+async def test_concurrent_deposits_do_not_lose_updates(session_maker):
+    user_ids = await _seed(session_maker)
+
+    async def deposit():
+        async with session_maker() as session:
+            await deposit_account_balance_service(
+                account_name="account_1",
+                amount=Decimal("1.00"),
+                session=session,
+                user_id=user_ids[1],
+                redis=AsyncMock()
+            )
+
+    await asyncio.gather(*(deposit() for _ in range(TRANSFERS)))
+
+    async with session_maker() as session:
+        balance = (await session.execute(select(Account.balance).where(Account.name == "account_1"))).scalar_one()
+
+    assert balance == TRANSFERS
+    await _assert_ledger_consistent(session_maker)
+
+@pytest.mark.asyncio
+async def test_batch_transfers_race_with_single_transfers(session_maker):
+    user_ids = await _seed(session_maker)
+    hot_user_id = user_ids[0]
+
+    async def batch(mode: str) -> int:
+        transfers = [
+            TransferDataBalance(
+                account_name="account_0",
+                amount=TRANSFER_AMOUNT,
+                transfer_username=f"stress_{recipient}",
+                transfer_account_name=f"account_{recipient}"
+            )
+            for recipient in range(1, RECIPIENTS + 1)
+        ]
+        async with session_maker() as session:
+            try:
+                result = await batch_transfer_service(transfers=transfers, mode=mode, session=session, user_id=hot_user_id, redis=AsyncMock())
+            except HTTPException:
+                return 0
+            return result.succeeded
+
+    jobs = []
+    for i in range(TRANSFERS // RECIPIENTS):
+        jobs.append(batch("atomic" if i % 2 else "best_effort"))
+        recipient = i % RECIPIENTS + 1
+        jobs.append(_transfer(session_maker, hot_user_id, "account_0", f"stress_{recipient}", f"account_{recipient}"))
+    results = await asyncio.gather(*jobs)
+
+    async with session_maker() as session:
+        balances = (await session.execute(select(Account.name, Account.balance))).all()
+        transaction_count = (await session.execute(select(func.count(Transaction.id)))).scalar_one()
+
+    assert all(balance >= 0 for _, balance in balances)
+    assert sum(balance for _, balance in balances) == HOT_BALANCE
+    assert transaction_count == sum(results)
+    await _assert_ledger_consistent(session_maker)
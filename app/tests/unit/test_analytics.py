@@ -0,0 +1,155 @@
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from sqlalchemy.dialects import postgresql
+
+from app.api.schemas.banking import AccountAnalytics
+from app.db.models import Account
+from app.services.analytics import analytics_query, get_account_analytics_service
+from app.services.redis_service import _get_analytics_key
+
+START = datetime(2025, 8, 1)
+END = datetime(2025, 9, 1)
+
+def _analytics_session(rows):
+    mock_session = AsyncMock()
+    query_rows = MagicMock()
+    query_rows.all.return_value = rows
+    mock_session.execute.return_value = query_rows
+    return mock_session
+
+@pytest.mark.asyncio
+async def test_get_account_analytics_service_computes_and_caches():
+    mock_session = _analytics_session([
+        MagicMock(period=datetime(2025, 8, 1), inflow=Decimal("100.00"), inflow_count=2, outflow=Decimal("0"), outflow_count=0),
+        MagicMock(period=datetime(2025, 8, 3), inflow=Decimal("20.50"), inflow_count=1, outflow=Decimal("35.25"), outflow_count=3)
+    ])
+
+    with patch("app.services.analytics.get_account", new_callable=AsyncMock) as mock_get_account, \
+        patch("app.services.analytics.get_history_version", new_callable=AsyncMock) as mock_version, \
+        patch("app.services.analytics.get_account_analytics_redis", new_callable=AsyncMock) as mock_cached, \
+        patch("app.services.analytics.save_account_analytics", new_callable=AsyncMock) as mock_save:
+        mock_get_account.return_value = Account(id=7, name="account_name", user_id=1)
+        mock_version.return_value = b"3"
+        mock_cached.return_value = None
+        result = await get_account_analytics_service(
+            account_name="account_name",
+            start=START,
+            end=END,
+            granularity="day",
+            session=mock_session,
+            user_id=1,
+            redis=AsyncMock()
+        )
+
+    assert (result.inflow, result.inflow_count, result.outflow, result.outflow_count) == (Decimal("120.50"), 3, Decimal("35.25"), 3)
+    assert [b.period for b in result.buckets] == [datetime(2025, 8, 1), datetime(2025, 8, 3)]
+    mock_cached.assert_awaited_once()
+    assert mock_cached.await_args[0] == (7, b"3", "day", START, END)
+    mock_save.assert_awaited_once()
+    assert mock_save.await_args[0] == (7, b"3", result)
+
+@pytest.mark.asyncio
+async def test_get_account_analytics_service_returns_cached():
+    mock_session = AsyncMock()
+    cached = AccountAnalytics(
+        account_name="account_name", start=START, end=END, granularity="month",
+        inflow=Decimal("1"), inflow_count=1, outflow=Decimal("0"), outflow_count=0, buckets=[]
+    )
+
+    with patch("app.services.analytics.get_account", new_callable=AsyncMock) as mock_get_account, \
+        patch("app.services.analytics.get_history_version", new_callable=AsyncMock), \
+        patch("app.services.analytics.get_account_analytics_redis", new_callable=AsyncMock) as mock_cached, \
+        patch("app.services.analytics.save_account_analytics", new_callable=AsyncMock) as mock_save:
+        mock_get_account.return_value = Account(id=7, name="account_name", user_id=1)
+        mock_cached.return_value = cached
+        result = await get_account_analytics_service(
+            account_name="account_name",
+            start=START.replace(tzinfo=timezone.utc),
+            end=END.replace(tzinfo=timezone.utc),
+            granularity="month",
+            session=mock_session,
+            user_id=1,
+            redis=AsyncMock()
+        )
+
+    assert result is cached
+    assert mock_cached.await_args[0][3:] == (START, END)
+    mock_session.execute.assert_not_awaited()
+    mock_save.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_get_account_analytics_service_without_redis():
+    mock_session = _analytics_session([])
+
+    with patch("app.services.analytics.get_account", new_callable=AsyncMock) as mock_get_account, \
+        patch("app.services.analytics.get_history_version", new_callable=AsyncMock) as mock_version, \
+        patch("app.services.analytics.save_account_analytics", new_callable=AsyncMock) as mock_save:
+        mock_get_account.return_value = Account(id=7, name="account_name", user_id=1)
+        mock_version.side_effect = RedisError("down")
+        mock_save.side_effect = RedisError("down")
+        result = await get_account_analytics_service(
+            account_name="account_name",
+            start=START,
+            end=END,
+            granularity="month",
+            session=mock_session,
+            user_id=1,
+            redis=AsyncMock()
+        )
+
+    assert result.buckets == []
+    assert result.inflow == Decimal(0)
+    mock_session.execute.assert_awaited_once()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("start, end, granularity", [
+    (END, START, "day"),
+    (datetime(2024, 1, 1), datetime(2025, 6, 1), "day"),
+    (START, END, "week")
+])
+async def test_get_account_analytics_service_invalid_request(start, end, granularity):
+    with pytest.raises(HTTPException) as exc:
+        await get_account_analytics_service(
+            account_name="account_name",
+            start=start,
+            end=end,
+            granularity=granularity,
+            session=AsyncMock(),
+            user_id=1,
+            redis=AsyncMock()
+        )
+
+    assert exc.value.status_code == 400
+
+def test_analytics_query_groups_by_truncated_timestamp():
+    sql = str(analytics_query(account_id=1, start=START, end=END, granularity="month").compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("SELECT date_trunc('month', anon_1.timestamp) AS period")
+    assert sql.endswith("GROUP BY date_trunc('month', anon_1.timestamp) ORDER BY period")
+
+def test_analytics_key_changes_with_history_version():
+    assert _get_analytics_key(7, None, "day", START, END) == "analytics:7:0:day:2025-08-01T00:00:00:2025-09-01T00:00:00"
+    assert _get_analytics_key(7, b"4", "day", START, END) != _get_analytics_key(7, b"5", "day", START, END)
+
+def test_analytics_money_serialized_as_exact_strings():
+    analytics = AccountAnalytics(
+        account_name="account_name",
+        start=START,
+        end=END,
+        granularity="month",
+        inflow=Decimal("0.1") + Decimal("0.2"),
+        inflow_count=2,
+        outflow=Decimal("9999999999999999.99"),
+        outflow_count=1,
+        buckets=[]
+    )
+
+    payload = analytics.model_dump(mode="json")
+
+    assert (payload["inflow"], payload["outflow"]) == ("0.30", "9999999999999999.99")
+    assert AccountAnalytics.model_validate_json(analytics.model_dump_json()) == analytics
@@ -1,22 +1,32 @@
 import pytest
+from collections import namedtuple
 from datetime import datetime, timezone
+from decimal import Decimal
 from unittest.mock import MagicMock, AsyncMock, patch
 
 from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
 
-from app.api.schemas.users import UserOut
+from app.api.schemas.users import Principal
 from app.services.banking import (
     add_account_service,
     get_account,
     get_certain_account_service,
+    get_balance_at_service,
     get_all_accounts_service,
     deposit_account_balance_service,
     transfer_money_service,
+    transfer_accounts_query,
+    batch_transfer_service,
     get_transaction_hisotry_service,
+    stream_transaction_history_service,
+    encode_history_cursor,
+    decode_history_cursor,
     delete_account_service
 )
-from app.db.models import Account, Transaction, User
-from app.api.schemas.banking import TransactionHistory, UserAccount
+from app.db.models import Account, Transaction
+from app.api.schemas.banking import TransactionHistory, UserAccount, AccountBalanceAt, TransferDataBalance
 
 @pytest.mark.asyncio
 async def test_add_account_service_account_exists():
@@ -97,6 +107,21 @@ async def test_get_certain_account_service():
     assert account.balance == 2500.0
     assert account.created_at == time
 
+@pytest.mark.asyncio
+async def test_get_balance_at_service():
+    mock_session = AsyncMock()
+    fake_account = Account(id=3, name="account_name", user_id=2, balance=Decimal("2500.00"))
+    at = datetime(2025, 8, 24, tzinfo=timezone.utc)
+
+    with patch("app.services.banking.get_account", new_callable=AsyncMock) as mock_get_account, \
+        patch("app.services.banking.get_balance_at", new_callable=AsyncMock) as mock_balance_at:
+        mock_get_account.return_value = fake_account
+        mock_balance_at.return_value = Decimal("1200.50")
+        result = await get_balance_at_service(account_name="account_name", at=at, session=mock_session, user_id=2)
+
+    assert result == AccountBalanceAt(account_name="account_name", balance=Decimal("1200.50"), at=at)
+    mock_balance_at.assert_awaited_once_with(mock_session, account_id=3, at=at)
+
 @pytest.mark.asyncio
 async def test_get_all_accounts_service_more_then_zero_accounts():
     mock_session = AsyncMock()
@@ -104,22 +129,13 @@ async def test_get_all_accounts_service_more_then_zero_accounts():
         Account(name="first_test_name", user_id=1, balance=2500.0, created_at=datetime(2025, 8, 22, tzinfo=timezone.utc)),
         Account(name="second_test_name", user_id=1, balance=2500.0, created_at=datetime(2025, 8, 23, tzinfo=timezone.utc))
     ]
-    fake_user = User(
-        first_name="First_test",
-        last_name="Last_test",
-        username="test",
-        hashed_password="hashed_password",
-        email="test@gmail.com",
-        is_email_verified=True,
-        accounts=fake_accounts
-    )
 
-    query_user = MagicMock()
-    query_user.scalar.return_value = fake_user
+    query_accounts = MagicMock()
+    query_accounts.scalars.return_value.all.return_value = fake_accounts
 
-    mock_session.execute.return_value = query_user
+    mock_session.execute.return_value = query_accounts
 
-    accounts = await get_all_accounts_service(username="test", session=mock_session)
+    accounts = await get_all_accounts_service(user_id=1, session=mock_session)
 
     assert type(accounts[0]) == UserAccount
     assert type(accounts[1]) == UserAccount
@@ -128,37 +144,52 @@ async def test_get_all_accounts_service_more_then_zero_accounts():
 @pytest.mark.asyncio
 async def test_get_all_accounts_service_zero_accoutns():
     mock_session = AsyncMock()
-    fake_user = User(
-        first_name="First_test",
-        last_name="Last_test",
-        username="test",
-        hashed_password="hashed_password",
-        email="test@gmail.com",
-        is_email_verified=True,
-        accounts=[]
-    )
 
-    query_user = MagicMock()
-    query_user.scalar.return_value = fake_user
+    query_accounts = MagicMock()
+    query_accounts.scalars.return_value.all.return_value = []
 
-    mock_session.execute.return_value = query_user
+    mock_session.execute.return_value = query_accounts
 
-    accounts = await get_all_accounts_service(username="test", session=mock_session)
+    accounts = await get_all_accounts_service(user_id=1, session=mock_session)
 
     assert len(accounts) == 0
 
 @pytest.mark.asyncio
 async def test_deposit_account_balance_service_greater_than_zero():
     mock_session = AsyncMock()
-    fake_account = Account(name="account_name", user_id=1, balance=5000.0, created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
+    mock_session.add = MagicMock()
+    query_account = MagicMock()
+    query_account.one_or_none.return_value = MagicMock(id=1, balance=Decimal("6000.00"))
+    mock_session.execute.return_value = query_account
 
-    with patch("app.services.banking.get_account", AsyncMock(return_value=fake_account)):
-        with patch("app.services.banking.save_transaction") as mock_save:
+    with patch("app.services.banking.queue_transaction_history") as mock_queue:
 
-            await deposit_account_balance_service(account_name="account_name", amount=1000.0, session=mock_session, user_id=1)
+        await deposit_account_balance_service(account_name="account_name", amount=Decimal("1000.00"), session=mock_session, user_id=1, redis=AsyncMock())
 
-            assert fake_account.balance == 6000.0
-            mock_save.assert_called_once()
+        statement = str(mock_session.execute.await_args[0][0])
+        assert statement.startswith("UPDATE accounts SET balance=(accounts.balance +")
+        assert "RETURNING accounts.id, accounts.balance" in statement
+        history_transaction = mock_session.add.call_args[0][0]
+        assert history_transaction.to_account_id == 1
+        assert history_transaction.from_account_id is None
+        assert history_transaction.to_balance_after == Decimal("6000.00")
+        mock_queue.assert_called_once()
+        assert mock_queue.call_args.kwargs == {"user_id": 1, "acc_name": "account_name", "account_id": 1}
+        mock_session.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_deposit_account_balance_service_account_not_exists():
+    mock_session = AsyncMock()
+    query_account = MagicMock()
+    query_account.one_or_none.return_value = None
+    mock_session.execute.return_value = query_account
+
+    with pytest.raises(HTTPException) as exc:
+        await deposit_account_balance_service(account_name="account_name", amount=1000.0, session=mock_session, user_id=1, redis=AsyncMock())
+
+    assert exc.value.status_code == 400
+    mock_session.rollback.assert_awaited_once()
+    mock_session.commit.assert_not_awaited()
 
 @pytest.mark.asyncio
 async def test_deposit_account_balance_service_less_or_equal_zero():
@@ -167,7 +198,7 @@ async def test_deposit_account_balance_service_less_or_equal_zero():
 
     with patch("app.services.banking.get_account", AsyncMock(return_value=fake_account)):
             with pytest.raises(HTTPException) as exc:
-                await deposit_account_balance_service(account_name="account_name", amount=-5000.0, session=mock_session, user_id=1)
+                await deposit_account_balance_service(account_name="account_name", amount=-5000.0, session=mock_session, user_id=1, redis=AsyncMock())
 
             assert exc.value.status_code == 400
             assert exc.value.detail == "Amount must be greater than zero"
@@ -181,128 +212,333 @@ async def test_transfer_money_service_amount_less_or_equal_than_zero():
             amount=-1500.0,
             session=mock_session,
             user_id=1,
-            transfer_account_name=None
+            transfer_account_name=None,
+            redis=AsyncMock()
         )
     assert exc.value.status_code == 400
 
+TransferRow = namedtuple("TransferRow", ["Account", "transfer_owner_id"])
+
+def _transfer_session(rows):
+    mock_session = AsyncMock()
+    query_accounts = MagicMock()
+    query_accounts.all.return_value = [TransferRow(acc, owner) for acc, owner in rows]
+    mock_session.execute.return_value = query_accounts
+    return mock_session
+
 @pytest.mark.asyncio
 async def test_transfer_money_service_amount_less_than_balance():
-    mock_session = AsyncMock()
-    fake_account = Account(name="first_account", user_id=1, balance=5000.0, created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    from_fake_account = Account(id=1, name="first_account", user_id=1, balance=Decimal("5000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    to_fake_account = Account(id=2, name="second_account", user_id=1, balance=Decimal("2000.00"), created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
+    mock_session = _transfer_session([(from_fake_account, 1), (to_fake_account, 1)])
 
-    with patch("app.services.banking.get_account", AsyncMock(return_value=fake_account)), \
+    with patch("app.services.banking.queue_transaction_history") as mock_queue, \
         pytest.raises(HTTPException) as exc:
         await transfer_money_service(
-            account_name="account_name",
-            amount=6000.0,
+            account_name="first_account",
+            amount=Decimal("6000.00"),
             session=mock_session,
             user_id=1,
-            transfer_account_name=None
+            transfer_account_name="second_account",
+            redis=AsyncMock()
         )
 
-        assert exc.value.status_code == 400
-        assert exc.value.detail == "There are insufficient funds in the account"
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "There are insufficient funds in the account"
+    assert from_fake_account.balance == Decimal("5000.00")
+    mock_queue.assert_not_called()
+    mock_session.rollback.assert_awaited_once()
 
 @pytest.mark.asyncio
 async def test_transfer_money_service_transfer_to_another_acc():
-    mock_session = AsyncMock()
-    from_fake_account = Account(name="first_account", user_id=1, balance=5000.0, created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
-    to_fake_account = Account(name="second_account", user_id=1, balance=2000.0, created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
-
-    with patch("app.services.banking.get_account", new_callable=AsyncMock) as mock_get_account:
-        mock_get_account.side_effect = [from_fake_account, to_fake_account]
-        with patch("app.services.banking.save_transaction") as mock_save:
-            await transfer_money_service(
-                account_name="first_account",
-                amount=1000.0,
-                session=mock_session,
-                user_id=1,
-                transfer_account_name="second_account"
-            )
-
-            assert from_fake_account.balance == 4000.0
-            assert to_fake_account.balance == 3000.0
-            mock_save.assert_called_once()
+    from_fake_account = Account(id=1, name="first_account", user_id=1, balance=Decimal("5000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    to_fake_account = Account(id=2, name="second_account", user_id=1, balance=Decimal("2000.00"), created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
+    mock_session = _transfer_session([(from_fake_account, 1), (to_fake_account, 1)])
+
+    with patch("app.services.banking.queue_transaction_history") as mock_queue:
+        await transfer_money_service(
+            account_name="first_account",
+            amount=Decimal("1000.00"),
+            session=mock_session,
+            user_id=1,
+            transfer_account_name="second_account",
+            redis=AsyncMock()
+        )
+
+    assert from_fake_account.balance == Decimal("4000.00")
+    assert to_fake_account.balance == Decimal("3000.00")
+    history_transaction = mock_session.add.call_args[0][0]
+    assert (history_transaction.from_balance_after, history_transaction.to_balance_after) == (Decimal("4000.00"), Decimal("3000.00"))
+    mock_session.execute.assert_awaited_once()
+    assert [c.kwargs["acc_name"] for c in mock_queue.call_args_list] == ["first_account", "second_account"]
+    mock_session.commit.assert_awaited_once()
 
 @pytest.mark.asyncio
 async def test_transfer_money_service_transfer_to_another_user():
-    mock_session = AsyncMock()
-    from_fake_account = Account(name="first_account", user_id=1, balance=13000.0, created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
-    to_fake_account = Account(name="second_account", user_id=1, balance=7000.0, created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
-    to_user = User(
-        first_name="to_First_test",
-        last_name="to_Last_test",
-        username="to_test",
-        hashed_password="hashed_password",
-        email="test@gmail.com",
-        is_email_verified=True,
-        accounts=[to_fake_account]
-    )
+    from_fake_account = Account(id=1, name="first_account", user_id=1, balance=Decimal("13000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    to_fake_account = Account(id=2, name="second_account", user_id=2, balance=Decimal("7000.00"), created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
+    mock_session = _transfer_session([(from_fake_account, 2), (to_fake_account, 2)])
 
-    with patch("app.services.banking.get_account", new_callable=AsyncMock) as mock_get_account, \
-    patch("app.services.banking.get_user_from_db", new_callable=AsyncMock) as mock_user, \
-    patch("app.services.banking.save_transaction") as mock_save:
-        mock_get_account.side_effect = [from_fake_account, to_fake_account]
-        mock_user.return_value = to_user
+    with patch("app.services.banking.queue_transaction_history") as mock_queue:
+        await transfer_money_service(
+            account_name="first_account",
+            amount=Decimal("5000.00"),
+            session=mock_session,
+            user_id=1,
+            transfer_account_name="second_account",
+            transfer_username="to_test",
+            redis=AsyncMock()
+        )
+
+    assert from_fake_account.balance == Decimal("8000.00")
+    assert to_fake_account.balance == Decimal("12000.00")
+    mock_session.execute.assert_awaited_once()
+    assert [c.kwargs for c in mock_queue.call_args_list] == [
+        {"user_id": 1, "acc_name": "first_account", "account_id": 1},
+        {"user_id": 2, "acc_name": "second_account", "account_id": 2}
+    ]
+
+@pytest.mark.asyncio
+async def test_transfer_money_service_recipient_not_found():
+    from_fake_account = Account(id=1, name="first_account", user_id=1, balance=Decimal("5000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    mock_session = _transfer_session([(from_fake_account, None)])
+
+    with pytest.raises(HTTPException) as exc:
+        await transfer_money_service(
+            account_name="first_account",
+            amount=Decimal("1000.00"),
+            session=mock_session,
+            user_id=1,
+            transfer_account_name="second_account",
+            transfer_username="missing",
+            redis=AsyncMock()
+        )
+
+    assert exc.value.status_code == 404
+    mock_session.execute.assert_awaited_once()
 
+@pytest.mark.asyncio
+async def test_transfer_money_service_source_account_not_found():
+    mock_session = _transfer_session([])
+
+    with pytest.raises(HTTPException) as exc:
         await transfer_money_service(
             account_name="first_account",
-            amount=5000.0,
+            amount=Decimal("1000.00"),
             session=mock_session,
             user_id=1,
             transfer_account_name="second_account",
-            transfer_username="to_test"
+            transfer_username="to_test",
+            redis=AsyncMock()
         )
 
-        assert from_fake_account.balance == 8000.0
-        assert to_fake_account.balance == 12000.0
-        mock_save.assert_called_once()
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Invalid account name"
+
+@pytest.mark.asyncio
+async def test_transfer_money_service_target_account_not_found():
+    from_fake_account = Account(id=1, name="first_account", user_id=1, balance=Decimal("5000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    mock_session = _transfer_session([(from_fake_account, 2)])
+
+    with pytest.raises(HTTPException) as exc:
+        await transfer_money_service(
+            account_name="first_account",
+            amount=Decimal("1000.00"),
+            session=mock_session,
+            user_id=1,
+            transfer_account_name="second_account",
+            transfer_username="to_test",
+            redis=AsyncMock()
+        )
+
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Invalid account name"
+    assert from_fake_account.balance == Decimal("5000.00")
+
+def test_transfer_accounts_query_locks_accounts_only():
+    sql = str(transfer_accounts_query(1, "first_account", "second_account", "to_test").compile(dialect=postgresql.dialect()))
+
+    assert sql.endswith("FOR UPDATE OF accounts")
+    assert sql.count("WHERE users.username = %(username_1)s") == 2
+
+@pytest.mark.asyncio
+async def test_transfer_money_service_retries_on_deadlock():
+    deadlock = DBAPIError("UPDATE accounts", {}, MagicMock(sqlstate="40P01"))
+
+    def fresh_accounts():
+        return (
+            Account(id=1, name="first_account", user_id=1, balance=Decimal("5000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc)),
+            Account(id=2, name="second_account", user_id=1, balance=Decimal("2000.00"), created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
+        )
+
+    first_attempt, second_attempt = fresh_accounts(), fresh_accounts()
+
+    with patch("app.services.banking._lock_transfer_accounts", new_callable=AsyncMock) as mock_lock, \
+        patch("app.services.banking.queue_transaction_history"), \
+        patch("app.services.banking.asyncio.sleep", new_callable=AsyncMock):
+        mock_session = AsyncMock()
+        mock_session.commit.side_effect = [deadlock, None]
+        mock_lock.side_effect = [first_attempt, second_attempt]
+
+        await transfer_money_service(
+            account_name="first_account",
+            amount=Decimal("1000.00"),
+            session=mock_session,
+            user_id=1,
+            transfer_account_name="second_account",
+            redis=AsyncMock()
+        )
+
+    assert mock_session.commit.await_count == 2
+    mock_session.rollback.assert_awaited_once()
+    assert second_attempt[0].balance == Decimal("4000.00")
+    assert second_attempt[1].balance == Decimal("3000.00")
+
+@pytest.mark.asyncio
+async def test_transfer_money_service_does_not_retry_other_errors():
+    from_fake_account = Account(id=1, name="first_account", user_id=1, balance=Decimal("5000.00"), created_at=datetime(2025, 8, 24, tzinfo=timezone.utc))
+    to_fake_account = Account(id=2, name="second_account", user_id=1, balance=Decimal("2000.00"), created_at=datetime(2025, 8, 26, tzinfo=timezone.utc))
+    mock_session = _transfer_session([(from_fake_account, 1), (to_fake_account, 1)])
+    mock_session.commit.side_effect = DBAPIError("INSERT INTO transactions", {}, MagicMock(sqlstate="23503"))
+
+    with patch("app.services.banking.queue_transaction_history"), \
+        pytest.raises(DBAPIError):
+        await transfer_money_service(
+            account_name="first_account",
+            amount=Decimal("1000.00"),
+            session=mock_session,
+            user_id=1,
+            transfer_account_name="second_account",
+            redis=AsyncMock()
+        )
+
+    mock_session.commit.assert_awaited_once()
+    mock_session.rollback.assert_awaited_once()
+
+def _batch_session(accounts, recipients=()):
+    mock_session = AsyncMock()
+    query_users = MagicMock()
+    query_users.all.return_value = [MagicMock(id=user_id, username=username) for user_id, username in recipients]
+    query_accounts = MagicMock()
+    query_accounts.all.return_value = accounts
+    mock_session.execute.side_effect = ([query_users] if recipients else []) + [query_accounts, MagicMock()]
+    mock_session.scalars.side_effect = lambda statement, rows: MagicMock(all=MagicMock(return_value=[Transaction(id=i, **row) for i, row in enumerate(rows)]))
+    return mock_session
+
+def _batch_account(id, user_id, name, balance):
+    account = MagicMock(id=id, user_id=user_id, balance=balance)
+    account.name = name
+    return account
+
+@pytest.mark.asyncio
+async def test_batch_transfer_service_best_effort():
+    mock_session = _batch_session([
+        _batch_account(1, 1, "first_account", Decimal("500.00")),
+        _batch_account(2, 1, "second_account", Decimal("0.00")),
+        _batch_account(3, 2, "to_account", Decimal("0.00"))
+    ], recipients=[(2, "to_test")])
+    transfers = [
+        TransferDataBalance(account_name="first_account", amount=300.0, transfer_account_name="second_account"),
+        TransferDataBalance(account_name="first_account", amount=300.0, transfer_username="to_test", transfer_account_name="to_account"),
+        TransferDataBalance(account_name="first_account", amount=150.0, transfer_username="to_test", transfer_account_name="to_account"),
+        TransferDataBalance(account_name="first_account", amount=10.0, transfer_username="unknown", transfer_account_name="to_account"),
+        TransferDataBalance(account_name="missing_account", amount=10.0, transfer_account_name="second_account")
+    ]
+
+    with patch("app.services.banking.queue_transaction_history") as mock_queue:
+        result = await batch_transfer_service(transfers=transfers, mode="best_effort", session=mock_session, user_id=1, redis=AsyncMock())
+
+    assert result.succeeded == 2
+    assert [(r.status, r.detail) for r in result.results] == [
+        ("ok", None),
+        ("failed", "There are insufficient funds in the account"),
+        ("ok", None),
+        ("failed", "User wasn't found."),
+        ("failed", "Invalid account name")
+    ]
+    assert mock_session.execute.await_count == 3
+    lock_statement = str(mock_session.execute.await_args_list[1][0][0])
+    assert "FOR UPDATE" in lock_statement
+    update_statement = mock_session.execute.await_args_list[2][0][0]
+    assert str(update_statement).startswith("UPDATE accounts SET balance=(accounts.balance + CASE accounts.id WHEN :param_1 THEN CAST(")
+    params = update_statement.compile().params
+    assert params["id_1"] == [1, 2, 3]
+    assert sorted(v for k, v in params.items() if k != "id_1" and isinstance(v, Decimal)) == [Decimal("-450"), Decimal("150"), Decimal("300")]
+    rows = mock_session.scalars.await_args[0][1]
+    assert [(r["from_account_id"], r["to_account_id"], r["amount"]) for r in rows] == [(1, 2, Decimal("300")), (1, 3, Decimal("150"))]
+    assert [(r["from_balance_after"], r["to_balance_after"]) for r in rows] == [(Decimal("200"), Decimal("300")), (Decimal("50"), Decimal("150"))]
+    assert mock_queue.call_count == 4
+    mock_session.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_batch_transfer_service_atomic_rolls_back_on_failure():
+    mock_session = _batch_session([
+        _batch_account(1, 1, "first_account", Decimal("100.00")),
+        _batch_account(2, 1, "second_account", Decimal("0.00"))
+    ])
+    transfers = [
+        TransferDataBalance(account_name="first_account", amount=50.0, transfer_account_name="second_account"),
+        TransferDataBalance(account_name="first_account", amount=80.0, transfer_account_name="second_account")
+    ]
+
+    with patch("app.services.banking.queue_transaction_history") as mock_queue, \
+        pytest.raises(HTTPException) as exc:
+        await batch_transfer_service(transfers=transfers, mode="atomic", session=mock_session, user_id=1, redis=AsyncMock())
+
+    assert exc.value.status_code == 400
+    assert [r["status"] for r in exc.value.detail["results"]] == ["skipped", "failed"]
+    assert mock_session.execute.await_count == 1
+    mock_session.scalars.assert_not_awaited()
+    mock_queue.assert_not_called()
+    mock_session.rollback.assert_awaited_once()
+    mock_session.commit.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_batch_transfer_service_too_many_items():
+    transfers = [TransferDataBalance(account_name="first_account", amount=1.0, transfer_account_name="second_account")] * 501
+
+    with pytest.raises(HTTPException) as exc:
+        await batch_transfer_service(transfers=transfers, mode="atomic", session=AsyncMock(), user_id=1, redis=AsyncMock())
+
+    assert exc.value.status_code == 400
 
 @pytest.mark.asyncio
 async def test_get_transaction_history_service_from_cache():
     mock_session = AsyncMock()
-    fake_user = User(
-        first_name="Test",
-        last_name="Test",
-        username="test",
-        hashed_password="hashed_password",
-        email="test@gmail.com",
-        is_email_verified=True
-    )
     fake_transactions = [
         TransactionHistory(
             description="Пополнение счета",
-            amount="+1000.0"
+            amount="+1000.00"
         ),
         TransactionHistory(
             description="Перевод со счета first_account на second_account",
-            amount="+1000.0"
+            amount="+1000.00"
         )
     ]
 
-    with patch("app.services.banking.get_user_from_db") as mock_user, \
-    patch("app.services.banking.check_user_cache_transaction") as mock_check_cache, \
+    with patch("app.services.banking.check_user_cache_transaction") as mock_check_cache, \
     patch("app.services.banking.get_transaction_history_redis") as mock_cache:
-        mock_user.return_value = fake_user
         mock_check_cache.return_value = True
         mock_cache.return_value = fake_transactions
 
         result = await get_transaction_hisotry_service(
-            user_data=UserOut(first_name="Test", last_name="Test", username="test"),
+            user_data=Principal(id=1, first_name="Test", last_name="Test", username="test"),
             account_name="first_account",
-            session=mock_session
+            session=mock_session,
+            redis=AsyncMock()
         )
 
         assert len(result) == 2
         assert type(result[0]) == TransactionHistory
         assert type(result[1]) == TransactionHistory
         assert result[0].description == "Пополнение счета"
-        assert result[0].amount == "+1000.0"
+        assert result[0].amount == "+1000.00"
 
 @pytest.mark.asyncio
 async def test_get_transaction_history_service_from_db():
     mock_session = AsyncMock()
     fake_account = Account(
+        id=1,
         name="first_account",
         user_id=1,
         balance=55000.0,
@@ -326,58 +562,172 @@ async def test_get_transaction_history_service_from_db():
             description="Перевод со счета first_account на fourth_account"
         )
     ]
-    fake_user = User(
-        first_name="Test",
-        last_name="Test",
-        username="test",
-        hashed_password="hashed_password",
-        email="test@gmail.com",
-        is_email_verified=True,
-    )
 
-    with patch("app.services.banking.get_user_from_db") as mock_user, \
-        patch("app.services.banking.check_user_cache_transaction") as mock_cache_check, \
+    with patch("app.services.banking.check_user_cache_transaction") as mock_cache_check, \
         patch("app.services.banking.get_account") as mock_account, \
-        patch("app.services.banking.save_transaction") as mock_save:
+        patch("app.services.banking.acquire_history_rebuild_lock", return_value="token"), \
+        patch("app.services.banking.get_history_version", return_value=b"3"), \
+        patch("app.services.banking.release_history_rebuild_lock") as mock_release, \
+        patch("app.services.banking.save_transactions_bulk") as mock_save:
 
-        mock_user.return_value = fake_user
         mock_cache_check.return_value = False
         mock_account.return_value = fake_account
         mock_history_query = MagicMock()
-        mock_history_query.scalars.return_value.all.return_value = fake_transactions
+        mock_history_query.scalars.return_value.all.return_value = list(reversed(fake_transactions))
         mock_session.execute.return_value = mock_history_query
 
 
         result = await get_transaction_hisotry_service(
-            user_data=UserOut(first_name="Test", last_name="Test", username="test"),
+            user_data=Principal(id=1, first_name="Test", last_name="Test", username="test"),
             account_name="first_account",
-            session=mock_session
+            session=mock_session,
+            redis=AsyncMock()
         )
 
         assert len(result) == len(fake_transactions)
-        assert mock_save.call_count == len(fake_transactions)
+        mock_save.assert_awaited_once()
+        assert mock_save.await_args.kwargs["transactions"] == fake_transactions
+        assert mock_save.await_args.kwargs["account_id"] == 1
+        assert mock_save.await_args.kwargs["version"] == b"3"
+        mock_release.assert_awaited_once()
         assert type(result[0]) == TransactionHistory
         assert result[0].description == "Пополнение счета"
+        assert result[0].amount == "+1000.00"
         assert result[1].description == "Перевод со счета first_account на fourth_account"
+        assert result[1].amount == "-51000.00"
+
+@pytest.mark.asyncio
+async def test_get_transaction_history_service_waits_for_concurrent_rebuild():
+    mock_session = AsyncMock()
+    cached = [TransactionHistory(description="Пополнение счета", amount="+1000.00")]
+
+    with patch("app.services.banking.check_user_cache_transaction", return_value=False), \
+        patch("app.services.banking.acquire_history_rebuild_lock", return_value=None), \
+        patch("app.services.banking.wait_for_transaction_history", return_value=cached), \
+        patch("app.services.banking.save_transactions_bulk") as mock_save:
+
+        result = await get_transaction_hisotry_service(
+            user_data=Principal(id=1, first_name="Test", last_name="Test", username="test"),
+            account_name="first_account",
+            session=mock_session,
+            redis=AsyncMock()
+        )
+
+    assert result == cached
+    mock_session.execute.assert_not_awaited()
+    mock_save.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_get_transaction_history_service_releases_lock_on_error():
+    with patch("app.services.banking.check_user_cache_transaction", return_value=False), \
+        patch("app.services.banking.acquire_history_rebuild_lock", return_value="token"), \
+        patch("app.services.banking.release_history_rebuild_lock") as mock_release, \
+        patch("app.services.banking.get_account", side_effect=HTTPException(status_code=400, detail="Invalid account name")), \
+        pytest.raises(HTTPException):
+
+        await get_transaction_hisotry_service(
+            user_data=Principal(id=1, first_name="Test", last_name="Test", username="test"),
+            account_name="missing_account",
+            session=AsyncMock(),
+            redis=AsyncMock()
+        )
+
+    mock_release.assert_awaited_once()
+
+def test_history_cursor_roundtrip():
+    history = TransactionHistory(description="Пополнение счета", amount="+1000.00", id=42, timestamp=datetime(2025, 8, 12, 10, 30))
+
+    cursor = encode_history_cursor(history)
+
+    assert decode_history_cursor(cursor) == (datetime(2025, 8, 12, 10, 30), 42)
+    assert encode_history_cursor(TransactionHistory(description="Пополнение счета", amount="+1000.00")) is None
+
+def test_decode_history_cursor_invalid():
+    with pytest.raises(HTTPException) as exc:
+        decode_history_cursor("not-a-cursor")
+
+    assert exc.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_get_transaction_history_service_page_before_cursor():
+    mock_session = AsyncMock()
+    fake_account = Account(id=1, name="first_account", user_id=1, balance=55000.0, created_at=datetime(2025, 8, 11, tzinfo=timezone.utc))
+    older_transactions = [
+        Transaction(id=3, user_id=1, from_account_id=1, to_account_id=4, amount=10.0, timestamp=datetime(2025, 8, 3), description="Перевод"),
+        Transaction(id=2, user_id=1, from_account_id=None, to_account_id=1, amount=20.0, timestamp=datetime(2025, 8, 2), description="Пополнение счета")
+    ]
+    cursor = encode_history_cursor(TransactionHistory(description="Перевод", amount="-5.00", id=4, timestamp=datetime(2025, 8, 4)))
+
+    with patch("app.services.banking.check_user_cache_transaction") as mock_cache_check, \
+        patch("app.services.banking.get_account") as mock_account, \
+        patch("app.services.banking.queue_transaction_history") as mock_queue:
+        mock_account.return_value = fake_account
+        mock_history_query = MagicMock()
+        mock_history_query.scalars.return_value.all.return_value = older_transactions
+        mock_session.execute.return_value = mock_history_query
+
+        result = await get_transaction_hisotry_service(
+            user_data=Principal(id=1, first_name="Test", last_name="Test", username="test"),
+            account_name="first_account",
+            session=mock_session,
+            redis=AsyncMock(),
+            limit=2,
+            before=cursor
+        )
+
+        statement = mock_session.execute.await_args[0][0]
+        compiled = str(statement)
+        assert "(transactions.timestamp, transactions.id) < (" in compiled
+        assert "ORDER BY transactions.timestamp DESC, transactions.id DESC" in compiled
+        assert statement._limit == 2
+        mock_cache_check.assert_not_called()
+        mock_queue.assert_not_called()
+        assert [h.id for h in result] == [2, 3]
+        assert result[0].amount == "+20.00"
+        assert result[1].amount == "-10.00"
+
+@pytest.mark.asyncio
+async def test_stream_transaction_history_service():
+    transactions = [
+        Transaction(id=1, user_id=1, from_account_id=None, to_account_id=1, amount=20.0, timestamp=datetime(2025, 8, 2), description="Пополнение счета"),
+        Transaction(id=2, user_id=1, from_account_id=1, to_account_id=4, amount=10.0, timestamp=datetime(2025, 8, 3), description="Перевод")
+    ]
+
+    async def partitions():
+        yield transactions[:1]
+        yield transactions[1:]
+
+    mock_session = AsyncMock()
+    mock_session.stream_scalars.return_value.partitions = MagicMock(return_value=partitions())
+    mock_session_maker = MagicMock()
+    mock_session_maker.return_value.__aenter__.return_value = mock_session
+
+    with patch("app.services.banking.async_session_maker", mock_session_maker):
+        chunks = [chunk async for chunk in stream_transaction_history_service(account_id=1, batch_size=1)]
+
+    lines = "".join(chunks).splitlines()
+    assert len(chunks) == 2
+    assert [TransactionHistory.model_validate_json(line).id for line in lines] == [1, 2]
+    assert mock_session.stream_scalars.await_args[0][0].get_execution_options()["yield_per"] == 1
 
 @pytest.mark.asyncio
 async def test_delete_account_service():
     mock_session = AsyncMock()
-    mock_user = MagicMock()
-    mock_user.username = "test_user"
     fake_account = Account(
         name="first_account",
         user_id=1,
         balance=55000.0,
         created_at=datetime(2025,8, 11, tzinfo=timezone.utc)
     )
-    fake_account.user = mock_user
+    mock_redis = AsyncMock()
 
-    with patch("app.services.banking.get_account", new_callable=AsyncMock) as mock_get_account:
+    with patch("app.services.banking.get_account", new_callable=AsyncMock) as mock_get_account, \
+         patch("app.services.banking.invalidate_transaction_history", new_callable=AsyncMock) as mock_invalidate:
         mock_get_account.return_value = fake_account
 
-        await delete_account_service(account_name="first_account", session=mock_session, user_id=1)
+        await delete_account_service(account_name="first_account", session=mock_session, user_id=1, redis=mock_redis)
 
         mock_get_account.assert_awaited_once_with(acc_name="first_account", session=mock_session, user_id=1)
         mock_session.delete.assert_awaited_once_with(fake_account)
-        mock_session.commit.assert_awaited_once()
\ No newline at end of file
+        mock_session.commit.assert_awaited_once()
+        mock_invalidate.assert_awaited_once_with(user_id=1, acc_name="first_account", redis=mock_redis)
\ No newline at end of file
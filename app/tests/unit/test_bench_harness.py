@@ -0,0 +1,23 @@
+from app.tests.bench.harness import LatencyRecorder, percentile
+
+def test_percentile_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 95) == 0.095
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 99) == 0.0
+
+def test_latency_recorder_report():
+    recorder = LatencyRecorder()
+    recorder.record("deposit", 0.010, ok=True)
+    recorder.record("deposit", 0.030, ok=False)
+    recorder.record("history", 0.002, ok=True)
+    recorder.stop()
+
+    report = recorder.report()
+
+    assert report["total"]["requests"] == 3
+    assert report["total"]["errors"] == 1
+    assert report["endpoints"]["deposit"]["p99_ms"] == 30.0
+    assert report["endpoints"]["history"]["errors"] == 0
@@ -0,0 +1,51 @@
+import pytest
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool import InstrumentedAsyncPool
+
+@pytest.mark.asyncio
+async def test_pool_counts_checkouts_overflow_and_timeouts():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=InstrumentedAsyncPool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05
+    )
+    try:
+        first = await engine.connect()
+        second = await engine.connect()
+        await second.execute(text("SELECT 1"))
+
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+        assert stats["overflow_connections"] == 1
+
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+
+        await first.close()
+        await second.close()
+        assert engine.pool.stats()["checked_out"] == 0
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_pool_stats_after_timeout():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=InstrumentedAsyncPool, pool_size=1, max_overflow=0, pool_timeout=0.01)
+    try:
+        connection = await engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+        stats = engine.pool.stats()
+        await connection.close()
+    finally:
+        await engine.dispose()
+
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["max_checked_out"] == 1
+    assert stats["max_wait_seconds"] >= 0.0
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime,timedelta
 
-from app.db.models import User
+from app.db.models import User, OutboxMessage
 from app.services.email import (
     send_email_verification_code,
     verify_user_code
@@ -11,6 +11,8 @@ from app.services.email import (
 @pytest.mark.asyncio
 async def test_send_email_verification_code():
     mock_session = AsyncMock()
+    mock_session.add = MagicMock()
+    mock_session.info = {}
     fake_user = User(
         first_name="Test",
         last_name="Test",
@@ -24,11 +26,14 @@ async def test_send_email_verification_code():
         await send_email_verification_code(user=fake_user, session=mock_session)
 
         mock_session.commit.assert_awaited_once()
+        mock_send_email.assert_not_called()
 
-        mock_send_email.assert_called_once()
-        args = mock_send_email.call_args[0]
-        assert args[0] == "test@gmail.com"
-        assert 100000 <= args[1] <= 999999
+        message = mock_session.add.call_args[0][0]
+        assert isinstance(message, OutboxMessage)
+        assert message.task == "app.tasks.email_task.send_email"
+        assert message.args == ["test@gmail.com", fake_user.email_verification_code]
+        assert 100000 <= message.args[1] <= 999999
+        assert mock_session.info["pending_outbox"] is True
 
         assert isinstance(fake_user.email_verification_code, int)
 
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+
+from fastapi import HTTPException
+
+from app.core.hashing import PasswordHashingPool
+
+@pytest.mark.asyncio
+async def test_password_pool_hash_and_verify():
+    pool = PasswordHashingPool(max_workers=1, max_queue=1)
+    try:
+        hashed = await pool.hash("secret")
+        assert await pool.verify("secret", hashed) is True
+        assert await pool.verify("wrong", hashed) is False
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["completed"] == 3
+    assert stats["rejected"] == 0
+    assert stats["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_when_queue_full():
+    pool = PasswordHashingPool(max_workers=1, max_queue=0)
+    try:
+        first = asyncio.create_task(pool.hash("secret"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await pool.hash("secret")
+        await first
+    finally:
+        pool.shutdown()
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+    assert pool.stats()["rejected"] == 1
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints.health import health_router
+from app.services.health import ReadinessProbe
+
+@pytest.mark.asyncio
+async def test_readiness_probe_all_checks_pass():
+    probe = ReadinessProbe(checks={"database": AsyncMock(), "redis": AsyncMock()}, timeout=1.0, ttl=5.0)
+
+    result = await probe.check()
+
+    assert result["status"] == "ok"
+    assert {name: check["status"] for name, check in result["checks"].items()} == {"database": "ok", "redis": "ok"}
+
+@pytest.mark.asyncio
+async def test_readiness_probe_reports_failed_and_slow_checks():
+    async def slow():
+        await asyncio.sleep(1)
+
+    probe = ReadinessProbe(
+        checks={"database": AsyncMock(), "redis": AsyncMock(side_effect=ConnectionError("refused")), "broker": slow},
+        timeout=0.05,
+        ttl=5.0
+    )
+
+    result = await probe.check()
+
+    assert result["status"] == "error"
+    assert result["checks"]["database"]["status"] == "ok"
+    assert result["checks"]["redis"]["error"] == "ConnectionError"
+    assert result["checks"]["broker"]["error"] == "TimeoutError"
+
+@pytest.mark.asyncio
+async def test_readiness_probe_caches_result():
+    check = AsyncMock()
+    probe = ReadinessProbe(checks={"database": check}, timeout=1.0, ttl=5.0)
+
+    await asyncio.gather(*(probe.check() for _ in range(5)))
+    await probe.check()
+
+    check.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_readiness_probe_rechecks_after_ttl():
+    check = AsyncMock()
+    probe = ReadinessProbe(checks={"database": check}, timeout=1.0, ttl=0.0)
+
+    await probe.check()
+    await probe.check()
+
+    assert check.await_count == 2
+
+@pytest.mark.asyncio
+async def test_health_endpoints():
+    app = FastAPI()
+    app.include_router(health_router)
+    probe = ReadinessProbe(checks={"database": AsyncMock(side_effect=OSError())}, timeout=1.0, ttl=5.0)
+
+    with patch("app.api.endpoints.health.readiness_probe", probe):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            health = await client.get("/health")
+            ready = await client.get("/ready")
+
+    assert health.status_code == 200
+    assert health.json() == {"status": "ok"}
+    assert ready.status_code == 503
+    assert ready.json()["checks"]["database"]["error"] == "OSError"
@@ -0,0 +1,166 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+from sqlalchemy.exc import IntegrityError
+
+from app.api.schemas.banking import DepositeAccountBalance
+from app.db.models import IdempotencyKey
+from app.services.idempotency import (
+    PENDING_IDEMPOTENCY_KEY,
+    _add_pending_idempotency_record,
+    request_fingerprint,
+    run_idempotent
+)
+
+BODY = {"message": "Account has been successfully replenished"}
+FINGERPRINT = request_fingerprint("deposit", DepositeAccountBalance(account_name="first_account", amount=10.0))
+
+def _session(record=None):
+    session = AsyncMock()
+    session.info = {}
+    query_record = MagicMock()
+    query_record.scalar_one_or_none.return_value = record
+    session.execute.return_value = query_record
+    return session
+
+def _record(fingerprint=FINGERPRINT):
+    return IdempotencyKey(user_id=1, key="key", fingerprint=fingerprint, response_status=200, response_body=BODY)
+
+def test_request_fingerprint_depends_on_payload():
+    other = request_fingerprint("deposit", DepositeAccountBalance(account_name="first_account", amount=11.0))
+
+    assert FINGERPRINT != other
+    assert FINGERPRINT != request_fingerprint("transfer", DepositeAccountBalance(account_name="first_account", amount=10.0))
+
+@pytest.mark.asyncio
+async def test_run_idempotent_without_key():
+    operation = AsyncMock()
+    mock_redis = AsyncMock()
+
+    result = await run_idempotent(None, 1, FINGERPRINT, BODY, _session(), mock_redis, operation)
+
+    assert result == BODY
+    operation.assert_awaited_once()
+    mock_redis.get.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_run_idempotent_first_request():
+    session = _session()
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = None
+    mock_redis.set.return_value = True
+
+    async def operation():
+        assert session.info[PENDING_IDEMPOTENCY_KEY].fingerprint == FINGERPRINT
+
+    result = await run_idempotent("key", 1, FINGERPRINT, BODY, session, mock_redis, operation)
+
+    assert result == BODY
+    assert mock_redis.set.await_args_list[0].kwargs == {"nx": True, "px": 30000}
+    stored = json.loads(mock_redis.set.await_args_list[1].args[1])
+    assert stored == {"fingerprint": FINGERPRINT, "status": 200, "body": BODY}
+    assert PENDING_IDEMPOTENCY_KEY not in session.info
+
+@pytest.mark.asyncio
+async def test_run_idempotent_replays_from_redis():
+    operation = AsyncMock()
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = json.dumps({"fingerprint": FINGERPRINT, "status": 200, "body": BODY}).encode()
+
+    result = await run_idempotent("key", 1, FINGERPRINT, BODY, _session(), mock_redis, operation)
+
+    assert isinstance(result, JSONResponse)
+    assert result.headers["Idempotent-Replayed"] == "true"
+    assert json.loads(result.body) == BODY
+    operation.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_run_idempotent_rejects_different_payload():
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = json.dumps({"fingerprint": "other", "status": 200, "body": BODY}).encode()
+
+    with pytest.raises(HTTPException) as exc:
+        await run_idempotent("key", 1, FINGERPRINT, BODY, _session(), mock_redis, AsyncMock())
+
+    assert exc.value.status_code == 422
+
+@pytest.mark.asyncio
+async def test_run_idempotent_in_progress():
+    operation = AsyncMock()
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = b"processing"
+
+    with pytest.raises(HTTPException) as exc:
+        await run_idempotent("key", 1, FINGERPRINT, BODY, _session(), mock_redis, operation)
+
+    assert exc.value.status_code == 409
+    assert exc.value.headers["Retry-After"] == "1"
+    operation.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_run_idempotent_falls_back_to_db_when_redis_is_down():
+    operation = AsyncMock()
+    mock_redis = AsyncMock()
+    mock_redis.get.side_effect = RedisError("connection refused")
+    mock_redis.set.side_effect = RedisError("connection refused")
+
+    result = await run_idempotent("key", 1, FINGERPRINT, BODY, _session(record=_record()), mock_redis, operation)
+
+    assert isinstance(result, JSONResponse)
+    operation.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_run_idempotent_replays_after_unique_violation():
+    session = _session()
+    first_lookup = MagicMock()
+    first_lookup.scalar_one_or_none.return_value = None
+    second_lookup = MagicMock()
+    second_lookup.scalar_one_or_none.return_value = _record()
+    session.execute.side_effect = [first_lookup, second_lookup]
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = None
+    mock_redis.set.return_value = True
+    operation = AsyncMock(side_effect=IntegrityError("INSERT", {}, Exception("duplicate key")))
+
+    result = await run_idempotent("key", 1, FINGERPRINT, BODY, session, mock_redis, operation)
+
+    assert isinstance(result, JSONResponse)
+    assert result.headers["Idempotent-Replayed"] == "true"
+
+@pytest.mark.asyncio
+async def test_run_idempotent_releases_marker_on_unrelated_integrity_error():
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = None
+    mock_redis.set.return_value = True
+    operation = AsyncMock(side_effect=IntegrityError("INSERT", {}, Exception("foreign key violation")))
+
+    with pytest.raises(IntegrityError):
+        await run_idempotent("key", 1, FINGERPRINT, BODY, _session(), mock_redis, operation)
+
+    mock_redis.delete.assert_awaited_once_with("idempotency:1:key")
+
+@pytest.mark.asyncio
+async def test_run_idempotent_releases_marker_on_failure():
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = None
+    mock_redis.set.return_value = True
+    operation = AsyncMock(side_effect=HTTPException(status_code=400, detail="There are insufficient funds in the account"))
+
+    with pytest.raises(HTTPException):
+        await run_idempotent("key", 1, FINGERPRINT, BODY, _session(), mock_redis, operation)
+
+    mock_redis.delete.assert_awaited_once_with("idempotency:1:key")
+
+def test_pending_record_added_before_commit():
+    record = _record()
+    session = MagicMock()
+    session.info = {PENDING_IDEMPOTENCY_KEY: record}
+    session.__contains__.return_value = False
+
+    _add_pending_idempotency_record(session)
+
+    session.add.assert_called_once_with(record)
@@ -0,0 +1,83 @@
+import pytest
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.core.jwt_keys import KeyRing, jwk_thumbprint
+
+def _private_pem(key) -> bytes:
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+def _public_pem(key) -> bytes:
+    return key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+@pytest.fixture(scope="module")
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+def test_jwk_thumbprint_rfc7638_example():
+    jwk = {
+        "kty": "RSA",
+        "e": "AQAB",
+        "alg": "RS256",
+        "kid": "2011-04-29",
+        "n": "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECPebWKRXjBZCiFV4n3oknjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQFh6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw"
+    }
+
+    assert jwk_thumbprint(jwk) == "NzbLsXh8uDCcd-6MNwXF4W_7noWXFZAfHkxZsRGC9Xs"
+
+@pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+def test_key_ring_asymmetric_roundtrip(algorithm, rsa_key):
+    private_key = rsa_key if algorithm == "RS256" else ed25519.Ed25519PrivateKey.generate()
+    key_ring = KeyRing(algorithm=algorithm, private_key_pem=_private_pem(private_key))
+
+    token = key_ring.encode({"sub": "test"})
+
+    assert jwt.get_unverified_header(token) == {"alg": algorithm, "kid": key_ring.kid, "typ": "JWT"}
+    assert key_ring.decode(token) == {"sub": "test"}
+
+def test_key_ring_jwks_verifies_tokens_without_private_key(rsa_key):
+    key_ring = KeyRing(algorithm="RS256", private_key_pem=_private_pem(rsa_key))
+    token = key_ring.encode({"sub": "test"})
+
+    jwks = key_ring.jwks()
+    verifier = jwt.PyJWKSet.from_dict(jwks)[jwt.get_unverified_header(token)["kid"]]
+
+    assert [(k["kty"], k["alg"], k["use"]) for k in jwks["keys"]] == [("RSA", "RS256", "sig")]
+    assert "d" not in jwks["keys"][0]
+    assert jwt.decode(token, key=verifier.key, algorithms=["RS256"]) == {"sub": "test"}
+
+def test_key_ring_accepts_previous_public_keys(rsa_key):
+    previous = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    old_token = KeyRing(algorithm="RS256", private_key_pem=_private_pem(previous)).encode({"sub": "test"})
+
+    key_ring = KeyRing(algorithm="RS256", private_key_pem=_private_pem(rsa_key), public_key_pems=[_public_pem(previous)])
+
+    assert key_ring.decode(old_token) == {"sub": "test"}
+    assert len(key_ring.jwks()["keys"]) == 2
+
+def test_key_ring_rejects_unknown_kid(rsa_key):
+    token = KeyRing(algorithm="RS256", private_key_pem=_private_pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))).encode({"sub": "test"})
+    key_ring = KeyRing(algorithm="RS256", private_key_pem=_private_pem(rsa_key))
+
+    with pytest.raises(jwt.InvalidTokenError):
+        key_ring.decode(token)
+
+def test_key_ring_symmetric():
+    key_ring = KeyRing(algorithm="HS256", secret="secret")
+
+    token = key_ring.encode({"sub": "test"})
+
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert key_ring.decode(token) == {"sub": "test"}
+    assert key_ring.jwks() == {"keys": []}
+
+@pytest.mark.parametrize("algorithm", ["none", "XS256"])
+def test_key_ring_rejects_unsupported_algorithm(algorithm):
+    with pytest.raises(ValueError):
+        KeyRing(algorithm=algorithm, secret="secret")
+
+def test_key_ring_asymmetric_requires_private_key():
+    with pytest.raises(ValueError):
+        KeyRing(algorithm="RS256", secret="secret")
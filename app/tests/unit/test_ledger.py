@@ -0,0 +1,25 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.ledger import get_balance_at
+
+@pytest.mark.asyncio
+async def test_get_balance_at_returns_balance_after_of_latest_entry():
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=Decimal("250.00")))
+
+    balance = await get_balance_at(mock_session, account_id=1, at=datetime(2025, 8, 24, 15, tzinfo=timezone(timedelta(hours=3))))
+
+    assert balance == Decimal("250.00")
+    params = mock_session.execute.await_args[0][0].compile().params
+    assert params["timestamp_1"] == params["timestamp_2"] == datetime(2025, 8, 24, 12)
+    assert params["from_account_id_1"] == params["to_account_id_1"] == 1
+
+@pytest.mark.asyncio
+async def test_get_balance_at_before_first_transaction():
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=None))
+
+    assert await get_balance_at(mock_session, account_id=1, at=datetime(2025, 8, 24)) == Decimal(0)
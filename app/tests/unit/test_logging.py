@@ -0,0 +1,50 @@
+import json
+import logging
+
+import pytest
+
+from app.core.logging import JsonFormatter, DebugSampler, setup_logging, stop_logging
+
+def _record(level: int, msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("app.test", level, "/app/services/banking.py", 42, msg, args, None)
+
+def test_json_formatter():
+    entry = json.loads(JsonFormatter().format(_record(logging.INFO, "Пополнение счета '%s'", "first_account")))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["file"] == "banking.py"
+    assert entry["line"] == 42
+    assert entry["message"] == "Пополнение счета 'first_account'"
+
+def test_debug_sampler_only_drops_debug():
+    sampler = DebugSampler(rate=0.0)
+
+    assert sampler.filter(_record(logging.DEBUG, "debug")) is False
+    assert sampler.filter(_record(logging.INFO, "info")) is True
+    assert DebugSampler(rate=1.0).filter(_record(logging.DEBUG, "debug")) is True
+
+@pytest.fixture
+def restore_logging():
+    yield
+    setup_logging()
+
+def test_queue_logging_writes_from_listener(tmp_path, restore_logging):
+    log_file = tmp_path / "app.log"
+    setup_logging(level="DEBUG", json_output=True, log_file=str(log_file), debug_sample_rate=0.0)
+    logger = logging.getLogger("app.test")
+    payload = {"account": "first_account"}
+
+    logger.debug("Отброшенная строка")
+    logger.info("Счет %s", payload)
+    payload["account"] = "changed"
+    stop_logging()
+
+    lines = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert [line["message"] for line in lines] == ["Счет {'account': 'first_account'}"]
+
+def test_setup_logging_level(restore_logging):
+    setup_logging(level="WARNING", log_file=None)
+
+    assert logging.getLogger().level == logging.WARNING
+    assert not logging.getLogger("app.test").isEnabledFor(logging.INFO)
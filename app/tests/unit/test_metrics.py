@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import MetricsMiddleware, StatsCollector, instrument_engine, record_cache, statement_label
+from app.core.redis import InstrumentedRedis
+
+def _sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_statement_label():
+    assert statement_label("SELECT accounts.id FROM accounts WHERE accounts.id = $1") == "SELECT accounts"
+    assert statement_label('INSERT INTO "transactions" (amount) VALUES ($1)') == "INSERT transactions"
+    assert statement_label("UPDATE accounts SET balance=$1") == "UPDATE accounts"
+    assert statement_label("SELECT x FROM (SELECT id FROM users) AS anon_1") == "SELECT users"
+    assert statement_label("BEGIN") == "BEGIN"
+
+def test_instrument_engine_observes_statements():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = _sample("db_query_duration_seconds_count", {"statement": "SELECT sqlite_master"})
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT name FROM sqlite_master"))
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["query_started"] == []
+
+    assert _sample("db_query_duration_seconds_count", {"statement": "SELECT sqlite_master"}) == before + 1
+
+@pytest.mark.asyncio
+async def test_instrumented_redis_observes_commands():
+    before = _sample("redis_command_duration_seconds_count", {"command": "GET"})
+
+    with patch("redis.asyncio.Redis.execute_command", AsyncMock(return_value=b"1")):
+        assert await InstrumentedRedis().execute_command("GET", "key") == b"1"
+
+    assert _sample("redis_command_duration_seconds_count", {"command": "GET"}) == before + 1
+
+def test_record_cache():
+    before = _sample("cache_requests_total", {"cache": "transaction_history", "result": "miss"})
+
+    record_cache("transaction_history", hit=False)
+
+    assert _sample("cache_requests_total", {"cache": "transaction_history", "result": "miss"}) == before + 1
+
+def test_stats_collector_exposes_numeric_stats():
+    collector = StatsCollector()
+    collector.register("rate_limit", lambda: {"blocked": 3, "enabled": True, "name": "login"}, limiter="login")
+    collector.register("rate_limit", lambda: {"blocked": 1, "enabled": False, "name": "deposit"}, limiter="deposit")
+
+    families = {family.name: family for family in collector.collect()}
+
+    assert set(families) == {"rate_limit_blocked", "rate_limit_enabled"}
+    assert [(s.labels, s.value) for s in families["rate_limit_blocked"].samples] == [({"limiter": "login"}, 3.0), ({"limiter": "deposit"}, 1.0)]
+
+@pytest.mark.asyncio
+async def test_metrics_middleware_labels_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict:
+        return {"id": item_id}
+
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before, before_unmatched = _sample("http_request_duration_seconds_count", labels), _sample("http_request_duration_seconds_count", unmatched)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/missing")
+
+    assert _sample("http_request_duration_seconds_count", labels) == before + 2
+    assert _sample("http_request_duration_seconds_count", unmatched) == before_unmatched + 1
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints.monitoring import monitoring_router
+from app.core.rate_limit import parse_trusted_proxies
+
+def _client(client_host: str) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(monitoring_router)
+    transport = httpx.ASGITransport(app=app, client=(client_host, 12345))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+@pytest.mark.asyncio
+async def test_monitoring_allows_loopback():
+    async with _client("127.0.0.1") as client:
+        response = await client.get("/monitoring/rate-limits")
+
+    assert response.status_code == 200
+    assert "transfer" in response.json()
+
+@pytest.mark.asyncio
+async def test_monitoring_rejects_public_clients():
+    async with _client("203.0.113.7") as client:
+        metrics = await client.get("/metrics")
+        pool = await client.get("/monitoring/db-pool")
+
+    assert metrics.status_code == pool.status_code == 403
+
+@pytest.mark.asyncio
+async def test_monitoring_accepts_token():
+    with patch("app.api.endpoints.monitoring.MONITORING_TOKEN", b"scrape-token"):
+        async with _client("203.0.113.7") as client:
+            allowed = await client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+            denied = await client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+
+    assert allowed.status_code == 200
+    assert denied.status_code == 403
+
+@pytest.mark.asyncio
+async def test_monitoring_judges_forwarded_client_behind_proxy():
+    with patch("app.api.endpoints.monitoring.MONITORING_ALLOWED_NETWORKS", parse_trusted_proxies("172.18.0.0/16")), \
+        patch("app.core.rate_limit.TRUSTED_PROXIES", parse_trusted_proxies("172.18.0.2")):
+        async with _client("172.18.0.2") as client:
+            public = await client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.7"})
+            internal = await client.get("/metrics", headers={"X-Forwarded-For": "172.18.0.9"})
+
+    assert public.status_code == 403
+    assert internal.status_code == 200
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from kombu.exceptions import OperationalError
+from sqlalchemy.dialects import postgresql
+
+from app.services.outbox import (
+    claim_outbox_statement,
+    outbox_signatures,
+    relay_outbox_service,
+    _kick_outbox_relay,
+    _forget_pending_outbox,
+    _start_relay
+)
+
+def _claimed(*batches):
+    results = []
+    for batch in batches:
+        query = MagicMock()
+        query.all.return_value = [MagicMock(id=i, task="app.tasks.email_task.send_email", args=[f"user_{i}@example.com", 123456]) for i in batch]
+        results.append(query)
+    return results
+
+@pytest.mark.asyncio
+async def test_relay_outbox_service_drains_in_batches():
+    mock_session = AsyncMock()
+    mock_session.execute.side_effect = _claimed([1, 2], [3, 4], [5])
+
+    with patch("app.services.outbox.group") as mock_group:
+        relayed = await relay_outbox_service(mock_session, batch_size=2)
+
+    assert relayed == 5
+    assert mock_group.call_count == 3
+    assert mock_group.return_value.apply_async.call_count == 3
+    signatures = mock_group.call_args_list[0][0][0]
+    assert [s.task for s in signatures] == ["app.tasks.email_task.send_emails"]
+    assert signatures[0].args == ([["user_1@example.com", 123456], ["user_2@example.com", 123456]],)
+    assert mock_session.commit.await_count == 3
+
+@pytest.mark.asyncio
+async def test_relay_outbox_service_empty():
+    mock_session = AsyncMock()
+    mock_session.execute.side_effect = _claimed([])
+
+    with patch("app.services.outbox.group") as mock_group:
+        assert await relay_outbox_service(mock_session, batch_size=2) == 0
+
+    mock_group.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_relay_outbox_service_keeps_messages_when_broker_fails():
+    mock_session = AsyncMock()
+    mock_session.execute.side_effect = _claimed([1, 2])
+
+    with patch("app.services.outbox.group") as mock_group, pytest.raises(OperationalError):
+        mock_group.return_value.apply_async.side_effect = OperationalError("broker is down")
+        await relay_outbox_service(mock_session, batch_size=2)
+
+    mock_session.commit.assert_not_awaited()
+
+def test_outbox_signatures_merge_batchable_tasks():
+    messages = [MagicMock(task="app.tasks.email_task.send_email", args=[f"user_{i}@example.com", i]) for i in range(5)]
+    messages.insert(2, MagicMock(task="app.tasks.email_task.send_email_report", args=["2025-08-24"]))
+
+    with patch.dict("app.services.outbox.OUTBOX_BATCH_TASKS", {"app.tasks.email_task.send_email": ("app.tasks.email_task.send_emails", 2)}):
+        signatures = outbox_signatures(messages)
+
+    assert [(s.task, s.args) for s in signatures] == [
+        ("app.tasks.email_task.send_email_report", ("2025-08-24",)),
+        ("app.tasks.email_task.send_emails", ([["user_0@example.com", 0], ["user_1@example.com", 1]],)),
+        ("app.tasks.email_task.send_emails", ([["user_2@example.com", 2], ["user_3@example.com", 3]],)),
+        ("app.tasks.email_task.send_emails", ([["user_4@example.com", 4]],))
+    ]
+
+def test_claim_outbox_statement_skips_locked_rows():
+    sql = str(claim_outbox_statement(100).compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("DELETE FROM outbox_messages WHERE outbox_messages.id IN (SELECT outbox_messages.id")
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert sql.endswith("RETURNING outbox_messages.id, outbox_messages.task, outbox_messages.args")
+
+@pytest.mark.asyncio
+async def test_kick_outbox_relay_after_commit():
+    session = MagicMock(info={"pending_outbox": True})
+
+    with patch("app.services.outbox._start_relay") as mock_start_relay:
+        _kick_outbox_relay(session)
+        await asyncio.sleep(0.05)
+        _kick_outbox_relay(session)
+        await asyncio.sleep(0.05)
+
+    mock_start_relay.assert_called_once()
+    assert session.info == {}
+
+def test_forget_pending_outbox_on_rollback():
+    session = MagicMock(info={"pending_outbox": True})
+
+    with patch("app.services.outbox._start_relay") as mock_start_relay:
+        _forget_pending_outbox(session)
+        _kick_outbox_relay(session)
+
+    mock_start_relay.assert_not_called()
+
+def test_start_relay_ignores_broker_errors():
+    with patch("app.services.outbox.celery_app.send_task", side_effect=OperationalError("broker is down")) as mock_send_task:
+        _start_relay()
+
+    mock_send_task.assert_called_once_with("app.tasks.outbox_task.relay_outbox")
@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from app.api.schemas.users import Principal
+from app.core.principal_cache import PrincipalCache
+from app.core.security import get_current_user
+from app.db.models import User
+
+def _principal(username: str = "test", user_id: int = 1) -> Principal:
+    return Principal(id=user_id, first_name="Test", last_name="Test", username=username)
+
+@pytest.mark.asyncio
+async def test_principal_cache_local_hit():
+    cache = PrincipalCache(ttl=30, maxsize=10, use_redis=False, redis_ttl=300)
+    mock_redis = AsyncMock()
+
+    await cache.set(_principal(), mock_redis)
+    principal = await cache.get("test", mock_redis)
+
+    assert principal.id == 1
+    mock_redis.get.assert_not_awaited()
+    mock_redis.set.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_principal_cache_expired_entry():
+    cache = PrincipalCache(ttl=0, maxsize=10, use_redis=False, redis_ttl=300)
+
+    await cache.set(_principal(), AsyncMock())
+
+    assert await cache.get("test", AsyncMock()) is None
+
+@pytest.mark.asyncio
+async def test_principal_cache_evicts_least_recently_used():
+    cache = PrincipalCache(ttl=30, maxsize=2, use_redis=False, redis_ttl=300)
+    mock_redis = AsyncMock()
+
+    await cache.set(_principal("first", 1), mock_redis)
+    await cache.set(_principal("second", 2), mock_redis)
+    await cache.get("first", mock_redis)
+    await cache.set(_principal("third", 3), mock_redis)
+
+    assert await cache.get("first", mock_redis) is not None
+    assert await cache.get("second", mock_redis) is None
+    assert await cache.get("third", mock_redis) is not None
+
+@pytest.mark.asyncio
+async def test_principal_cache_redis_tier():
+    cache = PrincipalCache(ttl=30, maxsize=10, use_redis=True, redis_ttl=300)
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = _principal().model_dump_json().encode()
+
+    principal = await cache.get("test", mock_redis)
+
+    assert principal == _principal()
+    mock_redis.get.assert_awaited_once_with("principal:test")
+
+    await cache.invalidate("test", mock_redis)
+    mock_redis.delete.assert_awaited_once_with("principal:test")
+
+@pytest.mark.asyncio
+async def test_principal_cache_redis_error_is_a_miss():
+    cache = PrincipalCache(ttl=30, maxsize=10, use_redis=True, redis_ttl=300)
+    mock_redis = AsyncMock()
+    mock_redis.get.side_effect = RedisError("down")
+
+    assert await cache.get("test", mock_redis) is None
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_cache():
+    cache = PrincipalCache(ttl=30, maxsize=10, use_redis=False, redis_ttl=300)
+    fake_user = User(
+        id=7,
+        first_name="Test",
+        last_name="Test",
+        username="test",
+        hashed_password="hashed_password",
+        email="test@gmail.com",
+        is_email_verified=True
+    )
+
+    with patch("app.core.security.principal_cache", cache), \
+        patch("app.core.security.jwt.decode", return_value={"sub": "test"}), \
+        patch("app.core.security.get_user_from_db", new_callable=AsyncMock) as mock_get_user:
+        mock_get_user.return_value = fake_user
+
+        first = await get_current_user(token="token", db=AsyncMock(), redis=AsyncMock())
+        second = await get_current_user(token="token", db=AsyncMock(), redis=AsyncMock())
+
+        assert first.id == 7
+        assert second == first
+        mock_get_user.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_get_current_user_without_sub():
+    with patch("app.core.security.jwt.decode", return_value={}), \
+        pytest.raises(HTTPException) as exc:
+        await get_current_user(token="token", db=AsyncMock(), redis=AsyncMock())
+
+    assert exc.value.status_code == 401
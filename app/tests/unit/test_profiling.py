@@ -0,0 +1,56 @@
+import json
+import pytest
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.metrics import observe_operation
+from app.core.profiling import ProfilingMiddleware, add_span, server_timing
+
+def _app(tmp_path, sample_rate: float = 0.0, token: str | None = "secret") -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), sample_rate=sample_rate, header="X-Profile", token=token, interval=0.001)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict:
+        with observe_operation("jwt_decode"):
+            pass
+        return {"id": item_id}
+
+    return app
+
+async def _get(app: FastAPI, headers: dict | None = None) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/items/1", headers=headers)
+
+def test_add_span_outside_profiled_request():
+    add_span("db", 1.0)
+
+def test_server_timing():
+    assert server_timing({"db": 0.0015, "redis": 0.0002}, 0.01) == "db;dur=1.50, redis;dur=0.20, total;dur=10.00"
+
+@pytest.mark.asyncio
+async def test_profiling_middleware_profiles_with_token(tmp_path):
+    response = await _get(_app(tmp_path), headers={"X-Profile": "secret"})
+
+    assert response.json() == {"id": 1}
+    assert response.headers["Server-Timing"].startswith("jwt_decode;dur=")
+    profiles = list(tmp_path.iterdir())
+    assert [p.name.endswith("-GET-items_item_id.speedscope.json") for p in profiles] == [True]
+    assert json.loads(profiles[0].read_text())["exporter"] == "pyinstrument"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers", [None, {"X-Profile": "wrong"}])
+async def test_profiling_middleware_skips_unprofiled_requests(tmp_path, headers):
+    response = await _get(_app(tmp_path), headers=headers)
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_profiling_middleware_samples_without_token(tmp_path):
+    response = await _get(_app(tmp_path, sample_rate=1.0, token=None), headers={"X-Profile": "anything"})
+
+    assert "Server-Timing" in response.headers
+    assert len(list(tmp_path.iterdir())) == 1
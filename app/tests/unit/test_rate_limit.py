@@ -0,0 +1,140 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from redis.exceptions import NoScriptError, RedisError
+
+from app.core.rate_limit import RateLimiter, client_address, parse_rate, parse_trusted_proxies, SLIDING_WINDOW_SCRIPT
+
+def test_parse_rate():
+    assert parse_rate("10/60") == (10, 60.0)
+    assert parse_rate("5/0.5") == (5, 0.5)
+    for rate in ("10", "ten/60", "0/60", "10/0"):
+        with pytest.raises(ValueError):
+            parse_rate(rate)
+
+@pytest.mark.asyncio
+async def test_rate_limiter_allows_under_limit():
+    limiter = RateLimiter(name="login", rate="10/60", fallback_size=10)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.return_value = 0
+
+    await limiter.check("ip:127.0.0.1", mock_redis)
+
+    args = mock_redis.evalsha.await_args.args
+    assert args[1:5] == (1, "ratelimit:login:ip:127.0.0.1", 10, 60000)
+    assert args[6] == 1
+    assert limiter.allowed == 1
+    assert limiter.blocked == 0
+
+@pytest.mark.asyncio
+async def test_rate_limiter_blocks_with_retry_after():
+    limiter = RateLimiter(name="transfer", rate="30/60", fallback_size=10)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.return_value = 1200
+
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter.check("user:1", mock_redis)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "2"}
+    assert limiter.blocked == 1
+
+@pytest.mark.asyncio
+async def test_rate_limiter_loads_script_once_missing():
+    limiter = RateLimiter(name="login", rate="10/60", fallback_size=10)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = NoScriptError("NOSCRIPT")
+    mock_redis.eval.return_value = 0
+
+    await limiter.check("ip:127.0.0.1", mock_redis)
+
+    assert mock_redis.eval.await_args.args[0] == SLIDING_WINDOW_SCRIPT
+    assert limiter.allowed == 1
+
+@pytest.mark.asyncio
+async def test_rate_limiter_falls_back_to_memory_without_redis():
+    limiter = RateLimiter(name="register", rate="2/60", fallback_size=10)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = RedisError("down")
+
+    await limiter.check("ip:127.0.0.1", mock_redis)
+    await limiter.check("ip:127.0.0.1", mock_redis)
+    await limiter.check("ip:10.0.0.1", mock_redis)
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter.check("ip:127.0.0.1", mock_redis)
+
+    assert int(exc_info.value.headers["Retry-After"]) == 60
+    assert limiter.stats()["fallback_checks"] == 4
+    assert limiter.stats()["blocked"] == 1
+
+@pytest.mark.asyncio
+async def test_rate_limiter_fallback_is_bounded():
+    limiter = RateLimiter(name="login", rate="1/60", fallback_size=2)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = RedisError("down")
+
+    for identity in ("a", "b", "c"):
+        await limiter.check(identity, mock_redis)
+
+    assert list(limiter._local) == ["b", "c"]
+
+@pytest.mark.asyncio
+async def test_rate_limiter_disabled():
+    limiter = RateLimiter(name="login", rate="1/60", fallback_size=10, enabled=False)
+    mock_redis = AsyncMock()
+
+    await limiter.check("ip:127.0.0.1", mock_redis)
+
+    mock_redis.evalsha.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_rate_limiter_charges_cost():
+    limiter = RateLimiter(name="transfer", rate="30/60", fallback_size=10)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.return_value = 0
+
+    await limiter.check("user:1", mock_redis, cost=20)
+
+    assert mock_redis.evalsha.await_args.args[6] == 20
+
+@pytest.mark.asyncio
+async def test_rate_limiter_rejects_cost_above_limit():
+    limiter = RateLimiter(name="transfer", rate="30/60", fallback_size=10)
+    mock_redis = AsyncMock()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter.check("user:1", mock_redis, cost=31)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers is None
+    mock_redis.evalsha.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_rate_limiter_fallback_charges_cost():
+    limiter = RateLimiter(name="transfer", rate="5/60", fallback_size=10)
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = RedisError("down")
+
+    await limiter.check("user:1", mock_redis, cost=3)
+    await limiter.check("user:1", mock_redis, cost=2)
+    with pytest.raises(HTTPException):
+        await limiter.check("user:1", mock_redis)
+
+    assert len(limiter._local["user:1"]) == 5
+
+def _request(host: str, forwarded_for: str | None = None) -> MagicMock:
+    request = MagicMock()
+    request.client.host = host
+    request.headers = {"x-forwarded-for": forwarded_for} if forwarded_for else {}
+    return request
+
+def test_client_address_uses_forwarded_for_only_from_trusted_proxies():
+    with patch("app.core.rate_limit.TRUSTED_PROXIES", parse_trusted_proxies("10.0.0.0/8, 172.18.0.2")):
+        assert client_address(_request("172.18.0.2", "203.0.113.7")) == "203.0.113.7"
+        assert client_address(_request("172.18.0.2", "198.51.100.1, 203.0.113.7, 10.0.0.5")) == "203.0.113.7"
+        assert client_address(_request("172.18.0.2")) == "172.18.0.2"
+        assert client_address(_request("203.0.113.9", "198.51.100.1")) == "203.0.113.9"
+
+def test_client_address_without_trusted_proxies():
+    assert client_address(_request("172.18.0.2", "203.0.113.7")) == "172.18.0.2"
@@ -1,12 +1,32 @@
+import asyncio
 import json
 import pytest
-from unittest.mock import Mock, patch
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import Mock, MagicMock, AsyncMock, patch
+
+import fakeredis
+from redis.exceptions import RedisError
 
 from app.services.redis_service import (
     _get_history_key,
-    save_transaction,
+    _background_tasks,
+    _push_pending_history,
+    _forget_pending_history,
+    HISTORY_CACHE_SIZE,
+    HISTORY_CACHE_TTL,
+    PENDING_HISTORY_KEY,
+    to_transaction_history,
+    queue_transaction_history,
+    push_transaction_history,
+    invalidate_transaction_history,
+    get_history_version,
     check_user_cache_transaction,
-    get_transaction_history_redis
+    get_transaction_history_redis,
+    save_transactions_bulk,
+    acquire_history_rebuild_lock,
+    release_history_rebuild_lock,
+    wait_for_transaction_history
 )
 from app.db.models import Transaction
 from app.api.schemas.banking import  TransactionHistory
@@ -30,74 +50,214 @@ async def test_get_history_key_same_user_diff_account():
     key2 = _get_history_key(1, "second_account")
     assert key1 != key2
 
+def test_to_transaction_history_signs_amount_per_account():
+    transfer = Transaction(id=1, user_id=1, from_account_id=1, to_account_id=2, amount=100.0, timestamp=datetime(2025, 8, 12), description="Перевод")
+
+    assert to_transaction_history(transfer, account_id=1).amount == "-100.00"
+    assert to_transaction_history(transfer, account_id=2).amount == "+100.00"
+
+def test_to_transaction_history_formats_request_and_db_amounts_alike():
+    # the after-commit push sees the request value, a cache rebuild sees Numeric(18, 2) from the database
+    from_request = Transaction(id=1, user_id=1, to_account_id=1, amount=Decimal("1"), timestamp=datetime(2025, 8, 12), description="Пополнение счета")
+    from_db = Transaction(id=1, user_id=1, to_account_id=1, amount=Decimal("1.00"), timestamp=datetime(2025, 8, 12), description="Пополнение счета")
+
+    assert to_transaction_history(from_request, account_id=1) == to_transaction_history(from_db, account_id=1)
+    assert to_transaction_history(from_request, account_id=1).amount == "+1.00"
+
+def test_queue_transaction_history():
+    session = Mock()
+    session.info = {}
+    mock_redis = AsyncMock()
+    transaction = Transaction(id=1, user_id=1, from_account_id=None, to_account_id=1, amount=100.0, description="Пополнение счета")
+
+    queue_transaction_history(session, mock_redis, transaction, user_id=1, acc_name="first_account", account_id=1)
+
+    assert session.info[PENDING_HISTORY_KEY] == [(mock_redis, transaction, 1, "first_account", 1)]
+
+@pytest.mark.asyncio
+async def test_push_transaction_history_appends_only_to_warm_cache():
+    redis = fakeredis.FakeAsyncRedis()
+    await redis.rpush("user:1:history:first_account", json.dumps({"id": 1}))
+
+    await push_transaction_history(redis, [(1, "first_account", 2, json.dumps({"id": 2})), (2, "second_account", 3, json.dumps({"id": 3}))])
+
+    assert [json.loads(e)["id"] for e in await redis.lrange("user:1:history:first_account", 0, -1)] == [1, 2]
+    assert not await redis.exists("user:2:history:second_account")
+    assert await redis.get("user:1:history:first_account:version") == b"1"
+    assert await redis.get("user:2:history:second_account:version") == b"1"
+    assert 0 < await redis.ttl("user:1:history:first_account") <= HISTORY_CACHE_TTL
+
+@pytest.mark.asyncio
+async def test_push_transaction_history_skips_transaction_already_filled():
+    redis = fakeredis.FakeAsyncRedis()
+    # a reader whose DB snapshot already contained the transaction filled the window before the push ran
+    await redis.rpush("user:1:history:first_account", json.dumps({"id": 1}), json.dumps({"id": 2}))
+
+    await push_transaction_history(redis, [(1, "first_account", 2, json.dumps({"id": 2}))])
+
+    assert [json.loads(e)["id"] for e in await redis.lrange("user:1:history:first_account", 0, -1)] == [1, 2]
+
+@pytest.mark.asyncio
+async def test_push_transaction_history_trims_window():
+    redis = fakeredis.FakeAsyncRedis()
+    await redis.rpush("user:1:history:first_account", *(json.dumps({"id": i}) for i in range(HISTORY_CACHE_SIZE)))
+
+    await push_transaction_history(redis, [(1, "first_account", 100, json.dumps({"id": 100}))])
+
+    ids = [json.loads(e)["id"] for e in await redis.lrange("user:1:history:first_account", 0, -1)]
+    assert ids == [*range(1, HISTORY_CACHE_SIZE), 100]
+
 @pytest.mark.asyncio
-async def test_save_transaction_success():
-    history_mock = Mock(spec=Transaction)
-    history_mock.description = "Пополнение счета"
-    history_mock.amount = 100
-    history_mock.from_account_id = None
-    history_mock.user_id = 1
-
-    mock_redis = Mock()
-    mock_redis.rpush = Mock()
-    mock_redis.ltrim = Mock()
-    mock_redis.expire = Mock()
-
-    with patch("app.services.redis_service.get_redis", return_value=mock_redis), \
-    patch("app.services.redis_service._get_history_key", return_value="user:1:history:first_account"):
-        save_transaction(history_mock, "first_account")
-        mock_redis.rpush.assert_called_once()
-        mock_redis.ltrim.assert_called_once_with("user:1:history:first_account", start=-10, end=-1)
-        mock_redis.expire.assert_called_once_with(name="user:1:history:first_account", time=3600)
-
-@pytest.mark.asyncio
-async def test_save_transaction_execption():
-    history_mock = Mock(spec=Transaction)
-    history_mock.description = "Пополнение счета"
-    history_mock.amount = 100
-    history_mock.from_account_id = None
-    history_mock.user_id = 1
-
-    mock_redis = Mock()
-    json_error = json.JSONDecodeError("Error", "doc", 0)
-    mock_redis.rpush.side_effect = json_error
-    with patch("app.services.redis_service.get_redis", return_value=mock_redis), \
-    patch("app.services.redis_service._get_history_key", return_value="user:1:history:first_account"), \
-    patch("app.services.redis_service.logger") as mock_logger:
-        save_transaction(history_mock, "first_account")
-        mock_logger.error.assert_called_once_with(
-            "Ошибка сериализации транзакции для счета '%s': %s",
-            "first_account",
-            json_error
-        )
+async def test_invalidate_transaction_history_rejects_inflight_fill():
+    redis = fakeredis.FakeAsyncRedis()
+    await redis.rpush("user:1:history:first_account", json.dumps({"id": 1}))
+    version = await get_history_version(1, "first_account", redis)
+
+    await invalidate_transaction_history(1, "first_account", redis)
+
+    assert not await redis.exists("user:1:history:first_account")
+    assert await redis.get("user:1:history:first_account:version") == b"1"
+    transaction = Transaction(id=1, user_id=1, to_account_id=1, amount=Decimal("1"), timestamp=datetime(2025, 8, 12), description="Пополнение счета")
+    assert not await save_transactions_bulk(1, "first_account", 1, [transaction], version, redis)
+
+@pytest.mark.asyncio
+async def test_push_transaction_history_redis_error():
+    mock_redis = MagicMock()
+    redis_error = RedisError("connection lost")
+    mock_redis.pipeline.return_value.execute = AsyncMock(side_effect=redis_error)
+
+    with patch("app.services.redis_service.logger") as mock_logger:
+        await push_transaction_history(mock_redis, [(1, "first_account", 1, "{}")])
+
+    mock_logger.warning.assert_called_once_with("Не удалось обновить кеш транзакций после коммита: %s", redis_error)
+
+@pytest.mark.asyncio
+async def test_pending_history_pushed_after_commit():
+    session = Mock()
+    mock_redis = AsyncMock()
+    transaction = Transaction(id=5, user_id=1, from_account_id=1, to_account_id=2, amount=100.0, timestamp=datetime(2025, 8, 12), description="Перевод")
+    session.info = {PENDING_HISTORY_KEY: [
+        (mock_redis, transaction, 1, "first_account", 1),
+        (mock_redis, transaction, 2, "second_account", 2)
+    ]}
+
+    with patch("app.services.redis_service.push_transaction_history", new_callable=AsyncMock) as mock_push:
+        _push_pending_history(session)
+        await asyncio.gather(*_background_tasks)
+
+    assert PENDING_HISTORY_KEY not in session.info
+    redis, entries = mock_push.await_args.args
+    assert redis is mock_redis
+    assert [entry[:3] for entry in entries] == [(1, "first_account", 5), (2, "second_account", 5)]
+    assert json.loads(entries[0][3])["amount"] == "-100.00"
+    assert json.loads(entries[1][3])["amount"] == "+100.00"
+
+def test_pending_history_dropped_on_rollback():
+    session = Mock()
+    session.info = {PENDING_HISTORY_KEY: [(AsyncMock(), Mock(), 1, "first_account", 1)]}
+
+    _forget_pending_history(session)
+
+    assert PENDING_HISTORY_KEY not in session.info
 
 @pytest.mark.asyncio
 async def test_check_user_cache_transaction_key_exist():
-    mock_redis = Mock()
+    mock_redis = AsyncMock()
     mock_redis.exists.return_value = True
-    with patch("app.services.redis_service.get_redis", return_value=mock_redis), \
-    patch("app.services.redis_service._get_history_key"):
-        result = check_user_cache_transaction(1, "first_account")
+    with patch("app.services.redis_service._get_history_key"):
+        result = await check_user_cache_transaction(1, "first_account", mock_redis)
         assert result == True
 
 @pytest.mark.asyncio
 async def test_check_user_cache_transaction_key_not_exist():
-    mock_redis = Mock()
+    mock_redis = AsyncMock()
     mock_redis.exists.return_value = False
-    with patch("app.services.redis_service.get_redis", return_value=mock_redis), \
-    patch("app.services.redis_service._get_history_key"):
-        result = check_user_cache_transaction(1, "first_account")
+    with patch("app.services.redis_service._get_history_key"):
+        result = await check_user_cache_transaction(1, "first_account", mock_redis)
         assert result == False
 
 @pytest.mark.asyncio
 async def test_get_transaction_history_redis():
-    mock_redis = Mock()
+    mock_redis = AsyncMock()
     history_data = [
         {"description": "Пополнение счета", "amount": "+500"}, {"description": "Перевод со счета f на s", "amount": "-15500"}
     ]
     mock_redis.lrange.return_value = [json.dumps(x).encode() for x in history_data]
-    with patch("app.services.redis_service.get_redis", return_value=mock_redis), \
-        patch("app.services.redis_service._get_history_key"):
-        result = get_transaction_history_redis(1, "first_account")
+    with patch("app.services.redis_service._get_history_key"):
+        result = await get_transaction_history_redis(1, "first_account", mock_redis)
         assert len(result) == 2
-        assert type(result[0]) == TransactionHistory
\ No newline at end of file
+        assert type(result[0]) == TransactionHistory
+
+@pytest.mark.asyncio
+async def test_save_transactions_bulk_single_round_trip():
+    transactions = [
+        Transaction(id=i, user_id=1, from_account_id=None, to_account_id=1, amount=i, timestamp=datetime(2025, 8, 1 + i), description="Пополнение счета")
+        for i in range(15)
+    ]
+    mock_redis = AsyncMock()
+    mock_redis.eval.return_value = 1
+
+    saved = await save_transactions_bulk(1, "first_account", 1, transactions, b"3", mock_redis)
+
+    assert saved is True
+    mock_redis.eval.assert_awaited_once()
+    args = mock_redis.eval.await_args.args
+    assert args[1:6] == (2, "user:1:history:first_account", "user:1:history:first_account:version", b"3", HISTORY_CACHE_TTL)
+    window = args[6:]
+    assert len(window) == 10
+    assert json.loads(window[0])["id"] == 5
+    assert json.loads(window[-1])["id"] == 14
+
+@pytest.mark.asyncio
+async def test_save_transactions_bulk_skips_when_version_changed():
+    mock_redis = AsyncMock()
+    mock_redis.eval.return_value = 0
+
+    saved = await save_transactions_bulk(1, "first_account", 1, [], None, mock_redis)
+
+    assert saved is False
+    assert mock_redis.eval.await_args.args[4] == b""
+
+@pytest.mark.asyncio
+async def test_acquire_history_rebuild_lock():
+    mock_redis = AsyncMock()
+    mock_redis.set.return_value = True
+
+    token = await acquire_history_rebuild_lock(1, "first_account", mock_redis)
+
+    assert token is not None
+    mock_redis.set.assert_awaited_once_with("lock:user:1:history:first_account", token, nx=True, px=5000)
+
+    mock_redis.set.return_value = None
+    assert await acquire_history_rebuild_lock(1, "first_account", mock_redis) is None
+
+@pytest.mark.asyncio
+async def test_release_history_rebuild_lock_checks_token():
+    mock_redis = AsyncMock()
+
+    await release_history_rebuild_lock(1, "first_account", "token", mock_redis)
+
+    args = mock_redis.eval.await_args[0]
+    assert args[1:] == (1, "lock:user:1:history:first_account", "token")
+
+@pytest.mark.asyncio
+async def test_wait_for_transaction_history():
+    mock_redis = AsyncMock()
+    mock_redis.lrange.side_effect = [[], [json.dumps({"description": "Пополнение счета", "amount": "+500"}).encode()]]
+
+    with patch("app.services.redis_service.asyncio.sleep", new_callable=AsyncMock):
+        result = await wait_for_transaction_history(1, "first_account", mock_redis)
+
+    assert len(result) == 1
+    assert mock_redis.lrange.await_count == 2
+
+@pytest.mark.asyncio
+async def test_wait_for_transaction_history_timeout():
+    mock_redis = AsyncMock()
+    mock_redis.lrange.return_value = []
+
+    with patch("app.services.redis_service.asyncio.sleep", new_callable=AsyncMock):
+        result = await wait_for_transaction_history(1, "first_account", mock_redis)
+
+    assert result is None
+    assert mock_redis.lrange.await_count == 5
@@ -0,0 +1,126 @@
+import smtplib
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.smtp import SMTPPool
+from app.tasks.email_task import send_emails
+
+def _pool(size=2, idle_timeout=30.0):
+    return SMTPPool(
+        host="localhost",
+        port=8025,
+        use_tls=True,
+        username="sender@example.com",
+        password="password",
+        size=size,
+        timeout=5.0,
+        idle_timeout=idle_timeout
+    )
+
+def test_smtp_pool_reuses_connection():
+    pool = _pool()
+
+    with patch("app.core.smtp.smtplib.SMTP") as mock_smtp:
+        for i in range(3):
+            pool.send("sender@example.com", f"user_{i}@example.com", "message")
+
+    mock_smtp.assert_called_once_with("localhost", 8025, timeout=5.0)
+    server = mock_smtp.return_value
+    server.starttls.assert_called_once()
+    server.login.assert_called_once_with("sender@example.com", "password")
+    assert server.sendmail.call_count == 3
+    assert pool.connects == 1
+
+def test_smtp_pool_reconnects_after_disconnect():
+    pool = _pool()
+    broken, fresh = MagicMock(), MagicMock()
+    broken.sendmail.side_effect = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+    with patch("app.core.smtp.smtplib.SMTP", side_effect=[broken, fresh]):
+        pool.send("sender@example.com", "user@example.com", "message")
+
+    broken.close.assert_called_once()
+    fresh.sendmail.assert_called_once_with("sender@example.com", "user@example.com", "message")
+    assert pool.connects == 2
+
+def test_smtp_pool_gives_up_after_second_disconnect():
+    pool = _pool()
+
+    with patch("app.core.smtp.smtplib.SMTP") as mock_smtp, pytest.raises(smtplib.SMTPServerDisconnected):
+        mock_smtp.return_value.sendmail.side_effect = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        pool.send("sender@example.com", "user@example.com", "message")
+
+    assert mock_smtp.call_count == 2
+
+def test_smtp_pool_checks_idle_connection():
+    pool = _pool(idle_timeout=0)
+    stale, fresh = MagicMock(), MagicMock()
+    stale.noop.side_effect = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+    with patch("app.core.smtp.smtplib.SMTP", side_effect=[stale, fresh]):
+        pool.send("sender@example.com", "user_1@example.com", "message")
+        pool.send("sender@example.com", "user_2@example.com", "message")
+
+    stale.close.assert_called_once()
+    fresh.sendmail.assert_called_once_with("sender@example.com", "user_2@example.com", "message")
+
+def test_smtp_pool_keeps_connection_after_refused_recipient():
+    pool = _pool()
+
+    with patch("app.core.smtp.smtplib.SMTP") as mock_smtp:
+        mock_smtp.return_value.sendmail.side_effect = [smtplib.SMTPRecipientsRefused({}), None]
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send("sender@example.com", "unknown@example.com", "message")
+        pool.send("sender@example.com", "user@example.com", "message")
+
+    assert pool.connects == 1
+
+def test_smtp_pool_close_quits_idle_connections():
+    pool = _pool(size=1)
+
+    with patch("app.core.smtp.smtplib.SMTP", side_effect=[MagicMock(), MagicMock()]):
+        with pool.connection() as first, pool.connection() as second:
+            pass
+        pool.close()
+
+    second.quit.assert_called_once()
+    first.quit.assert_called_once()
+
+def test_send_emails_retries_only_failed_messages():
+    mock_pool = MagicMock()
+    mock_pool.send.side_effect = [None, smtplib.SMTPDataError(451, "Try again later"), smtplib.SMTPRecipientsRefused({})]
+    messages = [["user_1@example.com", 111111], ["user_2@example.com", 222222], ["unknown@example.com", 333333]]
+
+    with patch("app.tasks.email_task.get_smtp_pool", return_value=mock_pool), \
+        patch.object(send_emails, "retry", side_effect=RuntimeError("retry")) as mock_retry, \
+        pytest.raises(RuntimeError):
+        send_emails.run(messages)
+
+    assert mock_pool.send.call_count == 3
+    assert mock_retry.call_args.kwargs["args"] == [[["user_2@example.com", 222222]]]
+
+def test_send_emails_unexpected_error_does_not_abort_batch():
+    messages = [["user_1@example.com", 111111], ["broken@example.com", 222222], ["user_3@example.com", 333333]]
+
+    def build_message(to_email, verification_code):
+        if to_email == "broken@example.com":
+            raise UnicodeEncodeError("ascii", to_email, 0, 1, "ordinal not in range(128)")
+        return "message"
+
+    mock_pool = MagicMock()
+    with patch("app.tasks.email_task.get_smtp_pool", return_value=mock_pool), \
+        patch("app.tasks.email_task._verification_message", side_effect=build_message), \
+        patch.object(send_emails, "retry", side_effect=RuntimeError("retry")) as mock_retry, \
+        pytest.raises(RuntimeError):
+        send_emails.run(messages)
+
+    assert [c.args[1] for c in mock_pool.send.call_args_list] == ["user_1@example.com", "user_3@example.com"]
+    assert mock_retry.call_args.kwargs["args"] == [[["broken@example.com", 222222]]]
+
+def test_send_emails_success():
+    mock_pool = MagicMock()
+
+    with patch("app.tasks.email_task.get_smtp_pool", return_value=mock_pool):
+        assert send_emails.run([["user_1@example.com", 111111], ["user_2@example.com", 222222]]) == 2
+
+    assert mock_pool.send.call_args_list[1][0][1] == "user_2@example.com"
@@ -0,0 +1,108 @@
+import io
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.services.statement import statement_query, stream_statement_service
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+requires_pyarrow = pytest.mark.skipif(pa is None, reason="pyarrow is not installed")
+
+ROWS = [
+    MagicMock(id=1, timestamp=datetime(2025, 8, 2), description="Пополнение счета", amount=Decimal("20.00"), balance_after=Decimal("20.00")),
+    MagicMock(id=2, timestamp=datetime(2025, 8, 3), description="Перевод", amount=Decimal("-10.50"), balance_after=Decimal("9.50"))
+]
+
+def _session_maker(*partitions):
+    async def stream_partitions():
+        for partition in partitions:
+            yield partition
+
+    mock_session = AsyncMock()
+    mock_session.stream.return_value.partitions = MagicMock(return_value=stream_partitions())
+    mock_session_maker = MagicMock()
+    mock_session_maker.return_value.__aenter__.return_value = mock_session
+    return mock_session, mock_session_maker
+
+@pytest.mark.asyncio
+async def test_stream_statement_service_csv():
+    mock_session, mock_session_maker = _session_maker(ROWS[:1], ROWS[1:])
+
+    with patch("app.services.statement.async_session_maker", mock_session_maker):
+        chunks = [chunk async for chunk in stream_statement_service(account_id=1, output_format="csv", batch_size=1)]
+
+    assert len(chunks) == 2
+    assert "".join(chunks).splitlines() == [
+        "id,timestamp,description,amount,balance_after",
+        "1,2025-08-02T00:00:00,Пополнение счета,20.00,20.00",
+        "2,2025-08-03T00:00:00,Перевод,-10.50,9.50"
+    ]
+    assert mock_session.stream.await_args[0][0].get_execution_options()["yield_per"] == 1
+
+@pytest.mark.asyncio
+async def test_stream_statement_service_csv_empty():
+    _, mock_session_maker = _session_maker()
+
+    with patch("app.services.statement.async_session_maker", mock_session_maker):
+        chunks = [chunk async for chunk in stream_statement_service(account_id=1, output_format="csv")]
+
+    assert chunks == ["id,timestamp,description,amount,balance_after\r\n"]
+
+@requires_pyarrow
+@pytest.mark.asyncio
+async def test_stream_statement_service_parquet_writes_row_group_per_batch():
+    _, mock_session_maker = _session_maker(ROWS[:1], ROWS[1:])
+
+    with patch("app.services.statement.async_session_maker", mock_session_maker):
+        chunks = [chunk async for chunk in stream_statement_service(account_id=1, output_format="parquet")]
+
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column("amount").to_pylist() == [Decimal("20.00"), Decimal("-10.50")]
+    assert table.column("balance_after").to_pylist() == [Decimal("20.00"), Decimal("9.50")]
+
+@requires_pyarrow
+@pytest.mark.asyncio
+async def test_stream_statement_service_arrow():
+    _, mock_session_maker = _session_maker(ROWS)
+
+    with patch("app.services.statement.async_session_maker", mock_session_maker):
+        chunks = [chunk async for chunk in stream_statement_service(account_id=1, output_format="arrow")]
+
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+    assert table.column("id").to_pylist() == [1, 2]
+
+def test_stream_statement_service_without_pyarrow():
+    with patch("app.services.statement.pa", None), pytest.raises(HTTPException) as exc:
+        stream_statement_service(account_id=1, output_format="parquet")
+
+    assert exc.value.status_code == 406
+
+def test_stream_statement_service_invalid_period():
+    with pytest.raises(HTTPException) as exc:
+        stream_statement_service(
+            account_id=1,
+            output_format="csv",
+            start=datetime(2025, 8, 2, 3, tzinfo=timezone.utc),
+            end=datetime(2025, 8, 2, 5, tzinfo=timezone(timedelta(hours=2)))
+        )
+
+    assert exc.value.status_code == 400
+
+def test_statement_query_signs_outgoing_amounts():
+    statement = statement_query(account_id=1, start=datetime(2025, 8, 1), end=None).compile(dialect=postgresql.dialect())
+    sql = str(statement)
+
+    assert "CASE WHEN (transactions.from_account_id = %(from_account_id_1)s) THEN -transactions.amount ELSE transactions.amount END AS amount" in sql
+    assert "transactions.timestamp >= %(timestamp_1)s" in sql
+    assert "transactions.timestamp <" not in sql
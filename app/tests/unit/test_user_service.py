@@ -32,8 +32,8 @@ async def test_sign_up_user_services_unique_user():
         assert len(args) == 2
         assert isinstance(args[0], User)
         assert isinstance(args[1], Account)
-        mock_session.commit.assert_awaited_once()
-        mock_send_email.assert_awaited_once()
+        mock_session.commit.assert_not_awaited()
+        mock_send_email.assert_awaited_once_with(user=args[0], session=mock_session)
 
 
 @pytest.mark.asyncio
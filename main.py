@@ -1,16 +1,48 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 import uvicorn
 
 from app.api.endpoints.users import user_router
 from app.api.endpoints.banking import banking_router
+from app.api.endpoints.monitoring import monitoring_router
+from app.api.endpoints.health import health_router
+from app.api.endpoints.keys import keys_router
+from app.core.hashing import password_pool
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware, instrument_serialization
+from app.core.redis import init_redis_pool, close_redis_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_redis_pool()
+    password_pool.start()
+    yield
+    password_pool.shutdown()
+    await close_redis_pool()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+if settings.PROFILING_ENABLED:
+    instrument_serialization()
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILING_DIR,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        header=settings.PROFILING_HEADER,
+        token=settings.PROFILING_TOKEN,
+        interval=settings.PROFILING_INTERVAL
+    )
 app.include_router(user_router)
 app.include_router(banking_router)
+app.include_router(monitoring_router)
+app.include_router(health_router)
+app.include_router(keys_router)
 
 @app.get('/test')
 async def home() -> dict:
     return {"message": "Welcome to my API!"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host='127.0.0.1', port=8000)
\ No newline at end of file
+    uvicorn.run(app, host='127.0.0.1', port=8000)